@@ -0,0 +1,169 @@
+from typing import Callable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backtest.metrics import compute_metrics
+from data.timeframes import timeframe_to_ms
+from utils import instrumentation
+
+# loader(timeframe, since_ms, until_ms) -> DataFrame OHLCV (índice datetime) em [since, until)
+WindowLoader = Callable[[str, int, int], pd.DataFrame]
+
+
+def market_loader(market, symbol: str) -> WindowLoader:
+    """Loader a partir de um MarketData (store local primeiro, exchange só se faltar)."""
+    return lambda timeframe, since, until: market.get_window(symbol, timeframe, since, until)
+
+
+def ambiguous_trades(trades: pd.DataFrame, df_15m: pd.DataFrame) -> np.ndarray:
+    """
+    Posições (em `trades`) dos trades fechados como loss num candle que TAMBÉM bateu o TP.
+    Os motores assumem STOP primeiro nesses candles; são os únicos que podem mudar.
+    """
+    if trades.empty:
+        return np.empty(0, dtype="int64")
+
+    k = df_15m.index.get_indexer(pd.to_datetime(trades["exit_time"]))
+    found = k >= 0
+    h = df_15m["high"].to_numpy(dtype="float64")[np.where(found, k, 0)]
+    l = df_15m["low"].to_numpy(dtype="float64")[np.where(found, k, 0)]
+
+    is_long = trades["side"].to_numpy() == "long"
+    tp = trades["tp"].to_numpy(dtype="float64")
+    tp_hit = np.where(is_long, h >= tp, l <= tp)
+
+    loss = trades["result"].to_numpy() == "loss"
+    return np.flatnonzero(found & loss & tp_hit)
+
+
+def _batches(starts: np.ndarray, bar_ms: int, max_span_ms: int) -> list[tuple[int, int, np.ndarray]]:
+    """
+    Agrupa janelas [start, start + bar_ms) próximas em UMA busca de até max_span_ms.
+    Retorna (since, until, posições das janelas) por lote.
+    """
+    order = np.argsort(starts, kind="stable")
+    batches = []
+    group = [order[0]]
+    since = starts[order[0]]
+    for pos in order[1:]:
+        if starts[pos] + bar_ms - since > max_span_ms:
+            batches.append((int(since), int(starts[group[-1]] + bar_ms), np.asarray(group)))
+            group, since = [], starts[pos]
+        group.append(pos)
+    batches.append((int(since), int(starts[group[-1]] + bar_ms), np.asarray(group)))
+    return batches
+
+
+def _first_hit(h: np.ndarray, l: np.ndarray, stop: float, tp: float, is_long: bool) -> str:
+    """Quem foi batido primeiro na janela: "tp", "stop", "both" (mesmo candle) ou "none"."""
+    if is_long:
+        stop_hits, tp_hits = l <= stop, h >= tp
+    else:
+        stop_hits, tp_hits = h >= stop, l <= tp
+
+    hits = stop_hits | tp_hits
+    if not hits.any():
+        return "none"
+    k = int(np.argmax(hits))
+    if stop_hits[k] and tp_hits[k]:
+        return "both"
+    return "stop" if stop_hits[k] else "tp"
+
+
+def resolve_ambiguous(
+        trades: pd.DataFrame,
+        df_15m: pd.DataFrame,
+        loader: WindowLoader,
+        bar_timeframe: str = "15m",
+        timeframes: Sequence[str] = ("1m",),
+        page_limit: int = 1000
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Reavalia, com candles menores, só os trades cujo candle de saída bateu stop E TP.
+
+    - indexa os candles ambíguos primeiro; nada é carregado se não houver nenhum
+    - carrega só as janelas desses candles, agrupando janelas próximas em lotes de
+      até `page_limit` candles do timeframe menor (uma busca por lote)
+    - `timeframes` em ordem (ex.: ("1m", "1s")): o que continuar ambíguo no 1m
+      (stop e TP no mesmo candle de 1m) desce para o próximo
+    - sem dado suficiente, o trade fica como estava (loss, conservador)
+
+    Retorna (trades corrigidos, relatório com quantos trades mudaram de resultado).
+    """
+    resolved = trades.copy()
+    pending = ambiguous_trades(trades, df_15m)
+    bar_ms = timeframe_to_ms(bar_timeframe)
+
+    report = {
+        "ambiguous": int(len(pending)),
+        "changed": 0,
+        "confirmed_loss": 0,
+        "unresolved": 0,
+        "requests": 0,
+        "candles_loaded": 0,
+        "per_timeframe": {},
+    }
+
+    starts_all = (
+        pd.to_datetime(trades["exit_time"]).to_numpy(dtype="datetime64[ms]").astype("int64")
+        if len(trades) else np.empty(0, dtype="int64")
+    )
+
+    for timeframe in timeframes:
+        if len(pending) == 0:
+            break
+
+        tf_ms = timeframe_to_ms(timeframe)
+        outcome = {}
+        starts = starts_all[pending]
+
+        for since, until, group in _batches(starts, bar_ms, page_limit * tf_ms):
+            with instrumentation.stage("drilldown_fetch") as st:
+                window = loader(timeframe, since, until)
+                st.rows = len(window)
+            report["requests"] += 1
+            report["candles_loaded"] += len(window)
+
+            ts = window.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+            h = window["high"].to_numpy(dtype="float64")
+            l = window["low"].to_numpy(dtype="float64")
+
+            for g in group:
+                pos = pending[g]
+                a = int(np.searchsorted(ts, starts[g], side="left"))
+                b = int(np.searchsorted(ts, starts[g] + bar_ms, side="left"))
+                row = trades.iloc[pos]
+                outcome[pos] = _first_hit(h[a:b], l[a:b], float(row["stop"]), float(row["tp"]),
+                                          row["side"] == "long")
+
+        counts = {"tp": 0, "stop": 0, "both": 0, "none": 0}
+        still = []
+        for pos in pending:
+            kind = outcome[pos]
+            counts[kind] += 1
+            if kind == "tp":
+                row = trades.iloc[pos]
+                entry, stop, tp = float(row["entry"]), float(row["stop"]), float(row["tp"])
+                col = resolved.columns.get_loc
+                resolved.iat[pos, col("exit")] = tp
+                resolved.iat[pos, col("result")] = "win"
+                resolved.iat[pos, col("r")] = abs(tp - entry) / abs(entry - stop)
+            elif kind == "both":
+                still.append(pos)
+
+        report["changed"] += counts["tp"]
+        report["confirmed_loss"] += counts["stop"]
+        report["per_timeframe"][timeframe] = counts
+        pending = np.asarray(still, dtype="int64")
+
+    report["unresolved"] = report["ambiguous"] - report["changed"] - report["confirmed_loss"]
+
+    before = compute_metrics(trades["r"].to_numpy(dtype="float64")) if len(trades) else None
+    after = compute_metrics(resolved["r"].to_numpy(dtype="float64")) if len(trades) else None
+    report["equity_r_before"] = before["equity_r"] if before else 0.0
+    report["equity_r_after"] = after["equity_r"] if after else 0.0
+    report["win_rate_before"] = before["win_rate"] if before else 0.0
+    report["win_rate_after"] = after["win_rate"] if after else 0.0
+
+    return resolved, report
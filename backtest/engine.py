@@ -1,10 +1,15 @@
-import csv
-import os
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Optional, List, Dict
 
+import numpy as np
 import pandas as pd
 
+from backtest.metrics import compute_metrics
+from backtest.trade_log import TRADE_FIELDS, TradeLog
+from utils import instrumentation
+
+ENGINE_MODES = ("loop", "vectorized")
+
 
 @dataclass
 class Trade:
@@ -19,38 +24,377 @@ class Trade:
     r: float = 0.0  # resultado em R
 
 
-def _append_trade_csv(path: str, trade: Trade) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    file_exists = os.path.exists(path)
+def _next_true(mask: np.ndarray) -> np.ndarray:
+    """
+    nxt[i] = menor j >= i com mask[j] True (ou len(mask) se não existir).
+    """
+    n = len(mask)
+    idx = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(idx[::-1])[::-1]
+
+
+def _signal_mask_from_fn(df_15m: pd.DataFrame, side: str, entry_signal_fn) -> np.ndarray:
+    """
+    Fallback para sinais só "por candle": avalia entry_signal_fn(df[:i+1]) em cada candle.
+    """
+    mask = np.zeros(len(df_15m), dtype=bool)
+    for i in range(len(df_15m)):
+        mask[i] = bool(entry_signal_fn(df_15m.iloc[:i + 1], side))
+    return mask
+
+
+def _count_evaluations(zone_at: np.ndarray, held: List[tuple[int, int]]) -> None:
+    """
+    signal_evaluations como no loop: candles sem posição cujo candle anterior fechou na zona
+    (zone_at indexado pelo candle de ENTRADA). held = (entrada, saída) de cada posição;
+    os candles em (entrada, saída] estão com posição aberta.
+    """
+    if not instrumentation.is_enabled():
+        return
+    total = int(np.count_nonzero(zone_at[1:]))
+    for entry, exit_ in held:
+        total -= int(np.count_nonzero(zone_at[entry + 1:exit_ + 1]))
+    instrumentation.count("signal_evaluations", total)
+
+
+def _summary(
+        trades: List[Trade],
+        equity_r: float,
+        max_dd_r: float,
+        trade_log: TradeLog,
+        return_trades: bool,
+        owns_log: bool
+) -> Dict:
+    metrics = compute_metrics(np.array([t.r for t in trades], dtype="float64"))
+
+    # log criado aqui fecha com o run; log do chamador só grava o pendente (pode ser reusado)
+    if owns_log:
+        trade_log.close()
+    else:
+        trade_log.flush()
+
+    stats = {
+        "trades": metrics["trades"],
+        "wins": metrics["wins"],
+        "losses": metrics["losses"],
+        "win_rate": metrics["win_rate"],
+        "avg_r": metrics["avg_r"],
+        "equity_r": equity_r,
+        "max_drawdown_r": abs(max_dd_r),
+        "profit_factor": metrics["profit_factor"],
+        "expectancy_r": metrics["expectancy_r"],
+        "max_drawdown_trades": metrics["max_drawdown_trades"],
+        "max_loss_streak": metrics["max_loss_streak"],
+        "r_percentiles": metrics["r_percentiles"],
+        "csv": trade_log.path
+    }
+    if return_trades:
+        # só os trades deste run (um log reusado acumula runs anteriores)
+        stats["trades_df"] = pd.DataFrame([asdict(t) for t in trades], columns=TRADE_FIELDS)
+    return stats
+
+
+def _run_backtest_15m_vectorized(
+        df_15m: pd.DataFrame,
+        side: str,
+        zone: tuple[float, float],
+        stop_level: float,
+        rr: float,
+        trade_log: TradeLog,
+        return_trades: bool,
+        owns_log: bool,
+        entry_signal_fn,
+        entry_mask_fn
+) -> Dict:
+    """
+    Mesma semântica do loop, mas:
+    - sinal e "dentro da zona" são máscaras calculadas uma vez para a série inteira
+    - com posição aberta, pula direto para o primeiro candle que bate stop ou TP
+    - sem posição, pula direto para o próximo candle com entrada válida
+    """
+    n = len(df_15m)
+    zlow, zhigh = zone
+    stop = float(stop_level)
+
+    o = df_15m["open"].to_numpy(dtype="float64")
+    h = df_15m["high"].to_numpy(dtype="float64")
+    l = df_15m["low"].to_numpy(dtype="float64")
+    c = df_15m["close"].to_numpy(dtype="float64")
+
+    if entry_mask_fn is not None:
+        signal = np.asarray(entry_mask_fn(df_15m, side), dtype=bool)
+    else:
+        signal = _signal_mask_from_fn(df_15m, side, entry_signal_fn)
+
+    # sinal + zona no candle anterior, entrada no open do candle atual
+    in_zone = (zlow <= c) & (c <= zhigh)
+    zone_at = np.zeros(n, dtype=bool)
+    zone_at[1:] = in_zone[:-1]
+    setup = np.zeros(n, dtype=bool)
+    setup[1:] = in_zone[:-1] & signal[:-1]
+
+    # valida stop do lado certo (mesmas comparações do loop, inclusive com NaN)
+    risk = np.abs(o - stop)
+    valid = ~(risk <= 0)
+    if side == "long":
+        valid &= ~(stop >= o)
+    elif side == "short":
+        valid &= ~(stop <= o)
+
+    next_entry = _next_true(setup & valid)
+
+    if side == "long":
+        next_stop = _next_true(l <= stop)
+    else:
+        next_stop = _next_true(h >= stop)
+
+    trades: List[Trade] = []
+    held: List[tuple[int, int]] = []
+    equity_r = 0.0
+    peak_r = 0.0
+    max_dd_r = 0.0
+
+    i = int(next_entry[1]) if n > 1 else n
+    while i < n - 1:
+        instrumentation.count("trades_opened")
+        entry = float(o[i])
+        if side == "long":
+            tp = entry + rr * float(risk[i])
+        else:
+            tp = entry - rr * float(risk[i])
+
+        # checagem começa no candle seguinte à entrada
+        k_stop = int(next_stop[i + 1])
+        last = min(k_stop, n - 1)
+        if side == "long":
+            tp_hits = h[i + 1:last + 1] >= tp
+        else:
+            tp_hits = l[i + 1:last + 1] <= tp
+
+        k_tp = i + 1 + int(np.argmax(tp_hits)) if tp_hits.any() else n
+
+        # conservador: se bater ambos no mesmo candle, assume STOP primeiro
+        if k_tp < k_stop:
+            k, exit_price, result, r = k_tp, tp, "win", rr
+        elif k_stop < n:
+            k, exit_price, result, r = k_stop, stop, "loss", -1.0
+        else:
+            held.append((i, n - 1))
+            break  # posição ainda aberta no fim da série
+
+        trade = Trade(
+            side=side,
+            entry_time=str(df_15m.index[i]),
+            entry=entry,
+            stop=stop,
+            tp=tp,
+            exit_time=str(df_15m.index[k]),
+            exit=exit_price,
+            result=result,
+            r=r
+        )
+        trades.append(trade)
+        trade_log.add(trade)
+        instrumentation.count("trades_closed")
+
+        equity_r += trade.r
+        peak_r = max(peak_r, equity_r)
+        max_dd_r = min(max_dd_r, equity_r - peak_r)
+
+        held.append((i, k))
+        i = int(next_entry[k + 1]) if k + 1 < n else n
+
+    _count_evaluations(zone_at, held)
+    return _summary(trades, equity_r, max_dd_r, trade_log, return_trades, owns_log)
+
+
+def first_exit(
+        h: np.ndarray,
+        l: np.ndarray,
+        start: int,
+        stop: float,
+        tp: float,
+        is_long: bool
+) -> tuple[int, bool]:
+    """
+    Primeiro candle >= start que bate stop ou TP (busca em blocos que dobram de tamanho,
+    custo proporcional à duração do trade). Retorna (índice, bateu_stop); índice = len se nunca.
+    """
+    n = len(h)
+    pos = start
+    size = 64
+    while pos < n:
+        end = min(n, pos + size)
+        if is_long:
+            stop_hits = l[pos:end] <= stop
+            tp_hits = h[pos:end] >= tp
+        else:
+            stop_hits = h[pos:end] >= stop
+            tp_hits = l[pos:end] <= tp
+
+        hits = stop_hits | tp_hits
+        if hits.any():
+            k = int(np.argmax(hits))
+            # conservador: se bater ambos no mesmo candle, assume STOP primeiro
+            return pos + k, bool(stop_hits[k])
+
+        pos = end
+        size *= 2
+
+    return n, False
+
+
+def walkforward_setups(df_15m: pd.DataFrame, context: pd.DataFrame, entry_signal_fn, entry_mask_fn) -> dict:
+    """
+    Máscaras do walk-forward, indexadas pelo candle de ENTRADA i (sinal em i-1):
+    entry (entrada válida), zone (close de i-1 na zona de um bias long/short),
+    long (lado), stop, risk + arrays open/high/low.
+    sig_long/sig_short: gatilhos de cada lado, indexados pelo candle do SINAL.
+    """
+    n = len(df_15m)
+    o = df_15m["open"].to_numpy(dtype="float64")
+    h = df_15m["high"].to_numpy(dtype="float64")
+    l = df_15m["low"].to_numpy(dtype="float64")
+    c = df_15m["close"].to_numpy(dtype="float64")
+
+    bias = context["bias_final"].to_numpy()
+    zlow = context["zone_low"].to_numpy(dtype="float64")
+    zhigh = context["zone_high"].to_numpy(dtype="float64")
+    stops = context["invalidation"].to_numpy(dtype="float64")
+
+    is_long = bias == "long"
+    is_short = bias == "short"
+
+    if entry_mask_fn is not None:
+        sig_long = np.asarray(entry_mask_fn(df_15m, "long"), dtype=bool)
+        sig_short = np.asarray(entry_mask_fn(df_15m, "short"), dtype=bool)
+    else:
+        sig_long = _signal_mask_from_fn(df_15m, "long", entry_signal_fn)
+        sig_short = _signal_mask_from_fn(df_15m, "short", entry_signal_fn)
+
+    # tudo avaliado no candle do sinal (i-1); entrada no open de i
+    in_zone = (zlow <= c) & (c <= zhigh)
+    signal = (is_long & sig_long) | (is_short & sig_short)
+    setup_prev = in_zone & signal & ~np.isnan(stops)
+
+    setup = np.zeros(n, dtype=bool)
+    setup[1:] = setup_prev[:-1]
+    zone_at = np.zeros(n, dtype=bool)
+    zone_at[1:] = (in_zone & (is_long | is_short))[:-1]
+    stop_at = np.full(n, np.nan)
+    stop_at[1:] = stops[:-1]
+    long_at = np.zeros(n, dtype=bool)
+    long_at[1:] = is_long[:-1]
+
+    risk = np.abs(o - stop_at)
+    valid = ~(risk <= 0) & np.where(long_at, ~(stop_at >= o), ~(stop_at <= o))
+
+    return {
+        "entry": setup & valid,
+        "zone": zone_at,
+        "long": long_at,
+        "stop": stop_at,
+        "risk": risk,
+        "open": o,
+        "high": h,
+        "low": l,
+        "sig_long": sig_long,
+        "sig_short": sig_short,
+    }
+
+
+@instrumentation.timed("backtest_walk_forward", rows=None)
+def run_backtest_walkforward(
+        df_15m: pd.DataFrame,
+        context: pd.DataFrame,
+        rr: float = 2.0,
+        trades_csv_path: Optional[str] = "logs/trades_walkforward.csv",
+        entry_signal_fn=None,
+        entry_mask_fn=None,
+        trade_log: Optional[TradeLog] = None,
+        return_trades: bool = False
+) -> Dict:
+    """
+    Backtest walk-forward (Fase 3.0): lado, zona e stop vêm de `context`
+    (Positioning.walk_forward), linha a linha, em vez de uma zona fixa.
+
+    Mesmas regras do run_backtest_15m: sinal + zona no candle anterior, entrada
+    no OPEN do candle atual, 1 trade por vez, stop primeiro se bater ambos.
+    O stop de cada trade é a invalidação vigente no candle do sinal.
+    """
+    if entry_signal_fn is None and entry_mask_fn is None:
+        raise ValueError("Passe entry_mask_fn (ex.: parse_signal(\"ema21_rejection\")) ou entry_signal_fn.")
+    if not context.index.equals(df_15m.index):
+        raise ValueError("context precisa estar alinhado ao índice do df_15m.")
+
+    owns_log = trade_log is None
+    if owns_log:
+        trade_log = TradeLog(trades_csv_path)
 
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=["side", "entry_time", "entry", "stop", "tp", "exit_time", "exit", "result", "r"]
+    n = len(df_15m)
+    setup = walkforward_setups(df_15m, context, entry_signal_fn, entry_mask_fn)
+    o, h, l = setup["open"], setup["high"], setup["low"]
+    long_at, stop_at, risk = setup["long"], setup["stop"], setup["risk"]
+    next_entry = _next_true(setup["entry"])
+
+    trades: List[Trade] = []
+    held: List[tuple[int, int]] = []
+    equity_r = 0.0
+    peak_r = 0.0
+    max_dd_r = 0.0
+
+    i = int(next_entry[1]) if n > 1 else n
+    while i < n - 1:
+        instrumentation.count("trades_opened")
+        side = "long" if long_at[i] else "short"
+        entry = float(o[i])
+        stop = float(stop_at[i])
+        tp = entry + rr * float(risk[i]) if side == "long" else entry - rr * float(risk[i])
+
+        k, hit_stop = first_exit(h, l, i + 1, stop, tp, side == "long")
+        if k >= n:
+            held.append((i, n - 1))
+            break  # posição ainda aberta no fim da série
+
+        trade = Trade(
+            side=side,
+            entry_time=str(df_15m.index[i]),
+            entry=entry,
+            stop=stop,
+            tp=tp,
+            exit_time=str(df_15m.index[k]),
+            exit=stop if hit_stop else tp,
+            result="loss" if hit_stop else "win",
+            r=-1.0 if hit_stop else rr
         )
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow({
-            "side": trade.side,
-            "entry_time": trade.entry_time,
-            "entry": trade.entry,
-            "stop": trade.stop,
-            "tp": trade.tp,
-            "exit_time": trade.exit_time,
-            "exit": trade.exit,
-            "result": trade.result,
-            "r": trade.r,
-        })
+        trades.append(trade)
+        trade_log.add(trade)
+        instrumentation.count("trades_closed")
+
+        equity_r += trade.r
+        peak_r = max(peak_r, equity_r)
+        max_dd_r = min(max_dd_r, equity_r - peak_r)
 
+        held.append((i, k))
+        i = int(next_entry[k + 1]) if k + 1 < n else n
 
+    _count_evaluations(setup["zone"], held)
+    return _summary(trades, equity_r, max_dd_r, trade_log, return_trades, owns_log)
+
+
+@instrumentation.timed("backtest", rows=None)
 def run_backtest_15m(
         df_15m: pd.DataFrame,
         side: str,
         zone: tuple[float, float],
         stop_level: float,
         rr: float = 2.0,
-        trades_csv_path: str = "logs/trades.csv",
-        entry_signal_fn=None
+        trades_csv_path: Optional[str] = "logs/trades.csv",
+        entry_signal_fn=None,
+        mode: str = "loop",
+        entry_mask_fn=None,
+        trade_log: Optional[TradeLog] = None,
+        return_trades: bool = False
 ) -> Dict:
     """
     Backtest base:
@@ -58,10 +402,36 @@ def run_backtest_15m(
     - Entrada: quando entry_signal_fn dá True E preço está dentro da zona
     - Entrada é no OPEN do próximo candle (pra evitar lookahead)
     - Stop/TP intrabar usando high/low (conservador)
+
+    mode:
+    - "loop": avalia candle a candle (referência)
+    - "vectorized": máscaras pré-calculadas + salto direto ao próximo evento
+      (mesmo resultado do "loop"). Use entry_mask_fn (ex.: EntrySignal.ema21_rejection_mask)
+      para o sinal vetorizado; sem ela, entry_signal_fn é avaliada uma vez por candle.
+
+    Log de trades:
+    - trades_csv_path é reescrito a cada run (gravação única no fim); None = não grava
+    - trade_log: TradeLog customizado (Parquet/Feather, blocos, append) no lugar do CSV
+    - return_trades=True devolve os trades em stats["trades_df"]
     """
-    if entry_signal_fn is None:
+    if mode not in ENGINE_MODES:
+        raise ValueError(f"mode inválido: {mode!r} (use {', '.join(ENGINE_MODES)}).")
+
+    if entry_signal_fn is None and entry_mask_fn is None:
         raise ValueError("Passe entry_signal_fn (ex.: EntrySignal.ema21_rejection).")
 
+    owns_log = trade_log is None
+    if owns_log:
+        trade_log = TradeLog(trades_csv_path)
+
+    if mode == "vectorized":
+        return _run_backtest_15m_vectorized(
+            df_15m, side, zone, stop_level, rr, trade_log, return_trades, owns_log, entry_signal_fn, entry_mask_fn
+        )
+
+    if entry_signal_fn is None:
+        raise ValueError("mode='loop' precisa de entry_signal_fn.")
+
     zlow, zhigh = zone
     trades: List[Trade] = []
     position: Optional[Trade] = None
@@ -83,6 +453,8 @@ def run_backtest_15m(
         if position is None:
             in_zone = (zlow <= prev_close <= zhigh)
 
+            if in_zone:
+                instrumentation.count("signal_evaluations")
             if in_zone and entry_signal_fn(df_15m.iloc[:i], side):
                 entry = float(cur["open"])
                 stop = float(stop_level)
@@ -109,6 +481,7 @@ def run_backtest_15m(
                     stop=stop,
                     tp=tp
                 )
+                instrumentation.count("trades_opened")
             continue
 
         # 2) Se tem posição, checar stop/tp no candle atual (intrabar)
@@ -152,7 +525,8 @@ def run_backtest_15m(
         position.exit = exit_price
 
         trades.append(position)
-        _append_trade_csv(trades_csv_path, position)
+        trade_log.add(position)
+        instrumentation.count("trades_closed")
 
         equity_r += position.r
         peak_r = max(peak_r, equity_r)
@@ -160,20 +534,4 @@ def run_backtest_15m(
 
         position = None
 
-    # métricas básicas
-    n = len(trades)
-    wins = sum(1 for t in trades if t.result == "win")
-    losses = sum(1 for t in trades if t.result == "loss")
-    win_rate = (wins / n) if n else 0.0
-    avg_r = (sum(t.r for t in trades) / n) if n else 0.0
-
-    return {
-        "trades": n,
-        "wins": wins,
-        "losses": losses,
-        "win_rate": win_rate,
-        "avg_r": avg_r,
-        "equity_r": equity_r,
-        "max_drawdown_r": abs(max_dd_r),
-        "csv": trades_csv_path
-    }
+    return _summary(trades, equity_r, max_dd_r, trade_log, return_trades, owns_log)
@@ -0,0 +1,235 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+R_PERCENTILES = (5, 25, 50, 75, 95)
+MC_METHODS = ("shuffle", "bootstrap")
+
+
+# --- R ajustado por custos ---
+
+def adjusted_r(
+        side: np.ndarray,
+        entry: np.ndarray,
+        stop: np.ndarray,
+        exit_price: np.ndarray,
+        fee_rate: float = 0.0,
+        slippage: float = 0.0
+) -> np.ndarray:
+    """
+    R líquido de cada trade (arrays alinhados, um item por trade).
+
+    - slippage: fração do preço perdida na entrada E na saída (0.0005 = 5 bps)
+    - fee_rate: taxa sobre o notional da entrada E da saída (0.001 = 0.1%)
+    O risco (1R) continua sendo |entry - stop| do plano original.
+    """
+    direction = np.where(np.asarray(side) == "long", 1.0, -1.0)
+    entry = np.asarray(entry, dtype="float64")
+    stop = np.asarray(stop, dtype="float64")
+    exit_price = np.asarray(exit_price, dtype="float64")
+
+    # slippage sempre contra: compra mais caro, vende mais barato
+    entry_fill = entry * (1.0 + direction * slippage)
+    exit_fill = exit_price * (1.0 - direction * slippage)
+
+    pnl = direction * (exit_fill - entry_fill) - fee_rate * (entry_fill + exit_fill)
+    risk = np.abs(entry - stop)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return pnl / risk
+
+
+def trades_r(trades: pd.DataFrame, fee_rate: float = 0.0, slippage: float = 0.0) -> np.ndarray:
+    """R de cada trade de um trades_df (TradeLog.to_frame()); com custos se fee/slippage > 0."""
+    if fee_rate == 0.0 and slippage == 0.0:
+        return trades["r"].to_numpy(dtype="float64")
+    return adjusted_r(
+        trades["side"].to_numpy(),
+        trades["entry"].to_numpy(),
+        trades["stop"].to_numpy(),
+        trades["exit"].to_numpy(),
+        fee_rate=fee_rate,
+        slippage=slippage,
+    )
+
+
+# --- métricas ---
+
+def drawdown(r: np.ndarray) -> dict:
+    """
+    Drawdown da curva de equity em R (começando em 0): máximo em R e maior duração
+    (em trades) abaixo do topo anterior. `max_drawdown_span` = (topo, pior ponto do
+    período mais longo) em índices da curva (0 = antes do 1º trade, j = após o trade j-1).
+    """
+    r = np.asarray(r, dtype="float64")
+    if len(r) == 0:
+        return {"max_drawdown_r": 0.0, "max_drawdown_trades": 0, "max_drawdown_span": (0, 0)}
+
+    equity = np.r_[0.0, np.cumsum(r)]
+    peak = np.maximum.accumulate(equity)
+    underwater = peak - equity
+
+    # índice do último topo em cada ponto -> duração = distância até ele
+    idx = np.arange(len(equity))
+    last_peak = np.maximum.accumulate(np.where(underwater <= 0, idx, 0))
+    duration = idx - last_peak
+    longest = int(np.argmax(duration))
+
+    return {
+        "max_drawdown_r": float(underwater.max()),
+        "max_drawdown_trades": int(duration[longest]),
+        "max_drawdown_span": (int(last_peak[longest]), longest),
+    }
+
+
+def compute_metrics(r: np.ndarray, times: Optional[Sequence] = None) -> dict:
+    """
+    Métricas da Fase 3.1 sobre o array de R dos trades (em ordem de fechamento).
+    `times` (opcional, horário de saída de cada trade) dá a duração do drawdown mais longo em tempo.
+    """
+    r = np.asarray(r, dtype="float64")
+    n = len(r)
+
+    wins = r > 0
+    gross_win = float(r[wins].sum())
+    gross_loss = float(-r[r < 0].sum())
+
+    if gross_loss > 0:
+        profit_factor = gross_win / gross_loss
+    else:
+        profit_factor = float("inf") if gross_win > 0 else 0.0
+
+    # maior sequência de perdas seguidas (bordas de subida/descida da máscara)
+    edges = np.flatnonzero(np.diff(np.r_[0, (r <= 0).astype("int8"), 0]))
+    max_loss_streak = int((edges[1::2] - edges[::2]).max()) if len(edges) else 0
+
+    dd = drawdown(r)
+    metrics = {
+        "trades": n,
+        "wins": int(wins.sum()),
+        "losses": int(n - wins.sum()),
+        "win_rate": float(wins.mean()) if n else 0.0,
+        "avg_r": float(r.mean()) if n else 0.0,
+        "expectancy_r": float(r.mean()) if n else 0.0,
+        "std_r": float(r.std(ddof=1)) if n > 1 else 0.0,
+        "profit_factor": profit_factor,
+        "equity_r": float(r.sum()),
+        "max_drawdown_r": dd["max_drawdown_r"],
+        "max_drawdown_trades": dd["max_drawdown_trades"],
+        "max_loss_streak": max_loss_streak,
+        "r_percentiles": (
+            dict(zip(R_PERCENTILES, np.percentile(r, R_PERCENTILES).tolist())) if n else {}
+        ),
+    }
+
+    if times is not None and n:
+        t = pd.to_datetime(pd.Series(list(times))).to_numpy()
+        start, end = dd["max_drawdown_span"]
+        # ponto j da curva = saída do trade j-1 (ponto 0 usa o 1º trade)
+        metrics["max_drawdown_duration"] = pd.Timedelta(t[max(end - 1, 0)] - t[max(start - 1, 0)])
+
+    return metrics
+
+
+def trade_metrics(trades: pd.DataFrame, fee_rate: float = 0.0, slippage: float = 0.0) -> dict:
+    """compute_metrics de um trades_df, com custos opcionais e duração do drawdown em tempo."""
+    r = trades_r(trades, fee_rate=fee_rate, slippage=slippage)
+    times = trades["exit_time"] if "exit_time" in trades.columns else None
+    metrics = compute_metrics(r, times)
+    metrics["fee_rate"] = fee_rate
+    metrics["slippage"] = slippage
+    return metrics
+
+
+# --- Monte Carlo ---
+
+def _mc_batch(r: np.ndarray, sims: int, method: str, seed) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    `sims` sequências de uma vez (matriz sims x n):
+    shuffle = permutação da ordem dos trades; bootstrap = sorteio com reposição.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(r)
+    if method == "shuffle":
+        paths = rng.permuted(np.broadcast_to(r, (sims, n)), axis=1)
+    else:
+        paths = r[rng.integers(0, n, size=(sims, n))]
+
+    np.cumsum(paths, axis=1, out=paths)
+    final = paths[:, -1].copy()
+
+    peak = np.maximum.accumulate(paths, axis=1)
+    np.maximum(peak, 0.0, out=peak)  # equity começa em 0
+    np.subtract(peak, paths, out=paths)  # paths vira underwater
+    max_dd = paths.max(axis=1)
+
+    # duração: trades desde o último topo (underwater == 0)
+    idx = np.arange(1, n + 1, dtype="int32")
+    last_peak = np.where(paths <= 0, idx, np.int32(0))
+    np.maximum.accumulate(last_peak, axis=1, out=last_peak)
+    np.subtract(idx, last_peak, out=last_peak)
+    max_dd_trades = last_peak.max(axis=1)
+
+    return max_dd, max_dd_trades, final
+
+
+def _mc_job(args: tuple) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    r, sims, method, seed, batch_size = args
+    parts = [_mc_batch(r, min(batch_size, sims - done), method, s)
+             for done, s in zip(range(0, sims, batch_size), seed.spawn(-(-sims // batch_size)))]
+    return tuple(np.concatenate(col) for col in zip(*parts))
+
+
+def monte_carlo(
+        r: np.ndarray,
+        n_sims: int = 10_000,
+        method: str = "shuffle",
+        seed: Optional[int] = None,
+        ci: Sequence[float] = (5, 50, 95),
+        max_batch_cells: int = 10_000_000,
+        workers: Optional[int] = None
+) -> dict:
+    """
+    Monte Carlo da ordem dos trades: intervalo de confiança do drawdown máximo
+    (em R e em trades), da equity final e P(drawdown >= limiar).
+
+    Simulações em blocos (matriz de até `max_batch_cells` floats por vez);
+    workers > 1 divide os blocos entre processos. Resultado determinístico para o
+    mesmo seed e número de workers.
+    """
+    if method not in MC_METHODS:
+        raise ValueError(f"method inválido: {method!r} (use {', '.join(MC_METHODS)}).")
+
+    r = np.asarray(r, dtype="float64")
+    n = len(r)
+    if n == 0:
+        raise ValueError("Sem trades para simular.")
+
+    batch_size = max(1, max_batch_cells // n)
+    root = np.random.SeedSequence(seed)
+
+    if workers is None or workers <= 1:
+        max_dd, max_dd_trades, final = _mc_job((r, n_sims, method, root, batch_size))
+    else:
+        per_worker = -(-n_sims // workers)
+        seeds = root.spawn(workers)
+        jobs = [(r, min(per_worker, n_sims - w * per_worker), method, seeds[w], batch_size)
+                for w in range(workers) if n_sims - w * per_worker > 0]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_mc_job, jobs))
+        max_dd, max_dd_trades, final = (np.concatenate(col) for col in zip(*results))
+
+    ci = tuple(ci)
+    observed = drawdown(r)
+    return {
+        "method": method,
+        "sims": int(n_sims),
+        "trades": n,
+        "observed_max_drawdown_r": observed["max_drawdown_r"],
+        "max_drawdown_r": dict(zip(ci, np.percentile(max_dd, ci).tolist())),
+        "max_drawdown_trades": dict(zip(ci, np.percentile(max_dd_trades, ci).tolist())),
+        "equity_r": dict(zip(ci, np.percentile(final, ci).tolist())),
+        "prob_drawdown_ge_observed": float(np.mean(max_dd >= observed["max_drawdown_r"])),
+        "samples": {"max_drawdown_r": max_dd, "max_drawdown_trades": max_dd_trades, "equity_r": final},
+    }
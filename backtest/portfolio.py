@@ -0,0 +1,234 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import first_exit, walkforward_setups
+from data.frame_cache import FrameCache, cache_key, frame_fingerprint
+from data.timeframes import epoch_ms
+from indicators.ema import EMAIndicator
+from indicators.price_action import PriceAction
+from strategy.entry import EntrySignal
+from strategy.positioning import Positioning
+
+
+_PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def prepare_symbol(
+        symbol: str,
+        df_1d: pd.DataFrame,
+        df_4h: pd.DataFrame,
+        df_15m: pd.DataFrame,
+        rr: float = 2.0,
+        cache: Optional[FrameCache] = None
+) -> dict:
+    """
+    Pipeline 1D/4H/15m de UM símbolo (swings, EMAs, contexto walk-forward) e
+    lista de TODAS as entradas candidatas com a saída de cada uma já resolvida.
+
+    O portfólio decide depois quais candidatas viram trade (1 posição por símbolo
+    + limite global de risco), então aqui cada candidata é independente.
+
+    cache: FrameCache opcional; com os mesmos candles, o contexto alinhado vem do
+    disco e os indicadores 1D/4H nem são recalculados.
+    """
+    df_15m = EMAIndicator(df_15m).calculate()
+
+    def build_context() -> pd.DataFrame:
+        d1 = EMAIndicator(PriceAction(df_1d).detect_swings()).calculate()
+        h4 = EMAIndicator(PriceAction(df_4h).detect_swings()).calculate()
+        return Positioning(d1, h4, copy=False).walk_forward(df_15m)
+
+    if cache is None:
+        context = build_context()
+    else:
+        # 1D/4H são pequenos: hash de todas as linhas (correção no meio do histórico invalida)
+        key = cache_key(
+            "portfolio_context",
+            frame_fingerprint(df_1d, _PRICE_COLUMNS, full=True),
+            frame_fingerprint(df_4h, _PRICE_COLUMNS, full=True),
+            frame_fingerprint(df_15m, columns=(), full=True),
+        )
+        context = cache.get_or_compute(key, build_context)
+    setup = walkforward_setups(df_15m, context, None, EntrySignal.ema21_rejection_mask)
+
+    h, l, o = setup["high"], setup["low"], setup["open"]
+    n = len(df_15m)
+    ts = epoch_ms(df_15m.index)
+
+    # a última barra não tem candle seguinte para checar stop/TP
+    candidates = np.flatnonzero(setup["entry"][:n - 1]) if n > 1 else np.empty(0, dtype="int64")
+
+    entries, exits, longs, stops, tps, rs = [], [], [], [], [], []
+    for i in candidates:
+        is_long = bool(setup["long"][i])
+        entry = float(o[i])
+        stop = float(setup["stop"][i])
+        risk = float(setup["risk"][i])
+        tp = entry + rr * risk if is_long else entry - rr * risk
+
+        k, hit_stop = first_exit(h, l, int(i) + 1, stop, tp, is_long)
+        if k >= n:
+            continue  # nunca fecha dentro da série
+
+        entries.append(i)
+        exits.append(k)
+        longs.append(is_long)
+        stops.append(stop)
+        tps.append(tp)
+        rs.append(-1.0 if hit_stop else rr)
+
+    entries = np.asarray(entries, dtype="int64")
+    exits = np.asarray(exits, dtype="int64")
+
+    return {
+        "symbol": symbol,
+        "entry_ts": ts[entries],
+        "exit_ts": ts[exits],
+        "long": np.asarray(longs, dtype=bool),
+        "entry": o[entries],
+        "stop": np.asarray(stops, dtype="float64"),
+        "tp": np.asarray(tps, dtype="float64"),
+        "r": np.asarray(rs, dtype="float64"),
+    }
+
+
+def _candidate_stream(s: int, entry_ts: np.ndarray):
+    for j, ts in enumerate(entry_ts.tolist()):
+        yield ts, s, j
+
+
+def _prepare_job(args: tuple) -> dict:
+    return prepare_symbol(*args)
+
+
+def allocate_candidates(
+        prepared: list,
+        risk_per_trade: float = 1.0,
+        max_open_risk: float = 3.0
+) -> tuple[list, list, int]:
+    """
+    Decide quais candidatas (saída de prepare_symbol) viram trade, em ordem de entrada.
+
+    - candidatas de todos os símbolos unidas numa linha do tempo via k-way merge (heapq);
+      empate no mesmo instante: ordem dos símbolos em `prepared`
+    - no máximo 1 posição por símbolo e `max_open_risk` (em R) aberto ao mesmo tempo
+    - saída no mesmo candle de uma nova entrada ainda conta como aberta
+
+    Retorna (taken, closed, skipped_by_risk_cap): taken = [(símbolo, candidata)] na ordem
+    de entrada; closed = [(exit_ts, r ponderado)] na ordem de fechamento.
+    """
+    # cada símbolo já vem ordenado por entrada -> merge k-way em O(total * log N)
+    streams = [_candidate_stream(s, p["entry_ts"]) for s, p in enumerate(prepared)]
+
+    open_positions: list = []  # heap (exit_ts, símbolo, candidata)
+    busy = [False] * len(prepared)
+    open_risk = 0.0
+    skipped_risk = 0
+
+    taken: list = []
+    closed: list = []  # (exit_ts, r ponderado) na ordem de fechamento
+
+    def close_until(ts: Optional[int]) -> None:
+        nonlocal open_risk
+        # saídas estritamente antes da entrada (saída no mesmo candle ainda está aberta)
+        while open_positions and (ts is None or open_positions[0][0] < ts):
+            exit_ts, s, j = heapq.heappop(open_positions)
+            busy[s] = False
+            open_risk -= risk_per_trade
+            closed.append((exit_ts, prepared[s]["r"][j] * risk_per_trade))
+
+    for entry_ts, s, j in heapq.merge(*streams):
+        close_until(entry_ts)
+
+        if busy[s]:
+            continue  # símbolo já posicionado
+        if open_risk + risk_per_trade > max_open_risk + 1e-12:
+            skipped_risk += 1
+            continue
+
+        busy[s] = True
+        open_risk += risk_per_trade
+        heapq.heappush(open_positions, (int(prepared[s]["exit_ts"][j]), s, j))
+        taken.append((s, j))
+
+    close_until(None)
+    return taken, closed, skipped_risk
+
+
+def run_portfolio_backtest(
+        data: Dict[str, tuple],
+        rr: float = 2.0,
+        risk_per_trade: float = 1.0,
+        max_open_risk: float = 3.0,
+        workers: Optional[int] = None,
+        cache: Optional[FrameCache] = None
+) -> dict:
+    """
+    Backtest de portfólio sobre N símbolos com orçamento de risco compartilhado.
+
+    data: {symbol: (df_1d, df_4h, df_15m)} com OHLCV limpo.
+    - pré-processamento por símbolo em paralelo (processos)
+    - candidatas de todos os símbolos unidas numa linha do tempo via k-way merge (heapq)
+    - no máximo 1 posição por símbolo e `max_open_risk` (em R) aberto ao mesmo tempo
+    - equity do portfólio em R (cada trade arrisca `risk_per_trade` R)
+    - cache: FrameCache opcional para o contexto walk-forward de cada símbolo
+    """
+    jobs = [(symbol, d1, h4, m15, rr, cache) for symbol, (d1, h4, m15) in data.items()]
+
+    if workers == 1 or len(jobs) <= 1:
+        prepared = [_prepare_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            prepared = list(pool.map(_prepare_job, jobs))
+
+    taken, closed, skipped_risk = allocate_candidates(prepared, risk_per_trade, max_open_risk)
+
+    # --- saída: trades, curva de equity e métricas ---
+    trades = pd.DataFrame(
+        [
+            {
+                "symbol": prepared[s]["symbol"],
+                "side": "long" if prepared[s]["long"][j] else "short",
+                "entry_time": pd.Timestamp(int(prepared[s]["entry_ts"][j]), unit="ms"),
+                "entry": float(prepared[s]["entry"][j]),
+                "stop": float(prepared[s]["stop"][j]),
+                "tp": float(prepared[s]["tp"][j]),
+                "exit_time": pd.Timestamp(int(prepared[s]["exit_ts"][j]), unit="ms"),
+                "result": "win" if prepared[s]["r"][j] > 0 else "loss",
+                "r": float(prepared[s]["r"][j]),
+            }
+            for s, j in taken
+        ]
+    )
+
+    r_closed = np.array([r for _, r in closed], dtype="float64")
+    equity_curve = np.cumsum(r_closed)
+    peak = np.maximum.accumulate(np.r_[0.0, equity_curve])[1:]
+    max_dd = float(np.max(peak - equity_curve)) if len(equity_curve) else 0.0
+
+    equity = pd.DataFrame(
+        {"equity_r": equity_curve},
+        index=pd.to_datetime(np.array([t for t, _ in closed], dtype="int64"), unit="ms"),
+    )
+
+    n = len(r_closed)
+    wins = int(np.sum(r_closed > 0))
+    return {
+        "symbols": len(prepared),
+        "candidates": int(sum(len(p["entry_ts"]) for p in prepared)),
+        "trades": n,
+        "wins": wins,
+        "losses": n - wins,
+        "win_rate": wins / n if n else 0.0,
+        "avg_r": float(r_closed.mean()) if n else 0.0,
+        "equity_r": float(equity_curve[-1]) if n else 0.0,
+        "max_drawdown_r": max_dd,
+        "skipped_by_risk_cap": skipped_risk,
+        "per_symbol": trades.groupby("symbol")["r"].agg(["count", "sum"]).to_dict("index") if n else {},
+        "equity": equity,
+        "trades_df": trades,
+    }
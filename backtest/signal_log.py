@@ -0,0 +1,265 @@
+import os
+import re
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import walkforward_setups
+from strategy.entry import EntrySignal
+from utils import instrumentation
+
+SIGNAL_FLAGS = ["in_zone", "trigger_long", "trigger_short", "trigger", "accepted"]
+SIGNAL_FEATURES = ["dist_ema21", "zone_pos", "risk"]
+
+_PART_RE = re.compile(r"^part-(\d+)-(\d+)\.parquet$")
+
+
+def signal_frame(
+        df_15m: pd.DataFrame,
+        context: pd.DataFrame,
+        symbol: str,
+        entry_mask_fn=EntrySignal.ema21_rejection_mask
+) -> pd.DataFrame:
+    """
+    Dataset de oportunidades (Fase 2.9): UMA linha por candle 15m com features e flags,
+    calculado de uma vez (máscaras) com a mesma lógica de zona/sinal do walk-forward.
+    O último candle fica de fora: accepted depende do open do candle seguinte, e
+    SignalDataset.append nunca reescreve uma linha já gravada.
+
+    - in_zone: close dentro da zona vigente (context)
+    - trigger_long / trigger_short: gatilho de entrada em cada lado (independente do bias)
+    - trigger: gatilho no lado do bias vigente
+    - accepted: o backtest entraria no open do próximo candle (zona + gatilho + stop válido),
+      sem considerar se já havia posição aberta
+    - dist_ema21: (close - ema21) / close; zone_pos: 0 = fundo da zona, 1 = topo;
+      risk: |close - invalidação| / close
+    """
+    if not context.index.equals(df_15m.index):
+        raise ValueError("context precisa estar alinhado ao índice do df_15m.")
+
+    n = len(df_15m)
+    setup = walkforward_setups(df_15m, context, None, entry_mask_fn)
+    instrumentation.count("signal_evaluations", 2 * n)
+
+    c = df_15m["close"].to_numpy(dtype="float64")
+    bias = context["bias_final"].to_numpy()
+    zlow = context["zone_low"].to_numpy(dtype="float64")
+    zhigh = context["zone_high"].to_numpy(dtype="float64")
+    stops = context["invalidation"].to_numpy(dtype="float64")
+
+    # gatilhos já avaliados dentro do walkforward_setups (entry_mask_fn roda uma vez por lado)
+    trigger_long = setup["sig_long"]
+    trigger_short = setup["sig_short"]
+
+    # setup["entry"] é indexado pelo candle de ENTRADA (sinal no candle anterior)
+    accepted = np.zeros(n, dtype=bool)
+    accepted[:-1] = setup["entry"][1:]
+
+    out = pd.DataFrame(index=df_15m.index)
+    out["symbol"] = symbol
+    for col in ("open", "high", "low", "close", "volume", "ema_9", "ema_21", "ema_50"):
+        if col in df_15m.columns:
+            out[col] = df_15m[col].to_numpy(dtype="float64")
+
+    out["bias"] = bias.astype(str)
+    out["zone_low"] = zlow
+    out["zone_high"] = zhigh
+    out["invalidation"] = stops
+
+    out["in_zone"] = (zlow <= c) & (c <= zhigh)
+    out["trigger_long"] = trigger_long
+    out["trigger_short"] = trigger_short
+    out["trigger"] = ((bias == "long") & trigger_long) | ((bias == "short") & trigger_short)
+    out["accepted"] = accepted
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if "ema_21" in out.columns:
+            out["dist_ema21"] = (c - out["ema_21"].to_numpy()) / c
+        out["zone_pos"] = (c - zlow) / (zhigh - zlow)
+        out["risk"] = np.abs(c - stops) / c
+
+    out.index.name = "timestamp"
+    return out.iloc[:-1]
+
+
+class SignalDataset:
+    """
+    Dataset de sinais em Parquet particionado por símbolo/mês:
+
+        root/symbol=BTC-USDT/month=2024-01/part-<primeiro_ms>-<último_ms>.parquet
+
+    - append() só acrescenta arquivos novos (nunca reescreve partes existentes) e
+      descarta candles já gravados, então rodar de novo sobre a mesma janela é seguro
+    - o último timestamp gravado vem do NOME dos arquivos (não lê dados)
+    - load(symbol, month) lê só os arquivos daquela partição
+    - compact() junta as partes de uma partição num arquivo só (opcional)
+    """
+
+    def __init__(self, root: str = "logs/signals"):
+        self.root = root
+
+    # --- caminhos ---
+
+    @staticmethod
+    def _symbol_dir(symbol: str) -> str:
+        return "symbol=" + symbol.replace("/", "-").replace(":", "-")
+
+    def _partition_dir(self, symbol: str, month: str) -> str:
+        return os.path.join(self.root, self._symbol_dir(symbol), f"month={month}")
+
+    def _parts(self, symbol: str, month: Optional[str] = None) -> list[str]:
+        """Arquivos de dados de um símbolo (opcionalmente de um mês), em ordem de tempo."""
+        return self._scan(symbol, month)[0]
+
+    def _scan(self, symbol: str, month: Optional[str] = None) -> tuple[list[str], list[str]]:
+        """
+        (partes válidas, partes cobertas). Parte coberta = intervalo dentro do de outra
+        parte: sobra de um compact() interrompido depois de instalar o arquivo novo.
+        """
+        base = os.path.join(self.root, self._symbol_dir(symbol))
+        if not os.path.isdir(base):
+            return [], []
+
+        months = [f"month={month}"] if month is not None else sorted(os.listdir(base))
+        files = []
+        for m in months:
+            directory = os.path.join(base, m)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                match = _PART_RE.match(name)
+                if match:
+                    first, last = int(match.group(1)), int(match.group(2))
+                    files.append((first, -last, os.path.join(directory, name)))
+
+        parts, covered = [], []
+        max_last = None
+        for _, neg_last, path in sorted(files):
+            if max_last is not None and -neg_last <= max_last:
+                covered.append(path)
+                continue
+            parts.append(path)
+            max_last = -neg_last
+        return parts, covered
+
+    # --- consulta ---
+
+    def months(self, symbol: str) -> list[str]:
+        base = os.path.join(self.root, self._symbol_dir(symbol))
+        if not os.path.isdir(base):
+            return []
+        return sorted(m.split("=", 1)[1] for m in os.listdir(base) if m.startswith("month="))
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        """Maior timestamp (epoch ms) já gravado para o símbolo, ou None."""
+        last = None
+        for path in self._parts(symbol):
+            end = int(_PART_RE.match(os.path.basename(path)).group(2))
+            last = end if last is None else max(last, end)
+        return last
+
+    # --- escrita ---
+
+    def append(self, signals: pd.DataFrame) -> int:
+        """
+        Grava as linhas novas de `signals` (saída de signal_frame, pode ter vários símbolos).
+        Retorna quantas linhas foram gravadas.
+        """
+        pa, pq = _pyarrow()
+
+        written = 0
+        for symbol, frame in signals.groupby("symbol", sort=False):
+            ts = frame.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+            last = self.last_timestamp(symbol)
+            if last is not None:
+                keep = ts > last
+                frame, ts = frame[keep], ts[keep]
+            if frame.empty:
+                continue
+
+            month = frame.index.strftime("%Y-%m")
+            for m in pd.unique(month):
+                part = frame[month == m]
+                part_ts = ts[month == m]
+
+                directory = self._partition_dir(symbol, m)
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f"part-{part_ts[0]}-{part_ts[-1]}.parquet")
+
+                table = pa.Table.from_pandas(part, preserve_index=True)
+                tmp = path + ".tmp"
+                pq.write_table(table, tmp)
+                os.replace(tmp, path)  # parte nunca fica pela metade
+
+                instrumentation.count("bytes_written", os.path.getsize(path))
+                written += len(part)
+
+        return written
+
+    def compact(self, symbol: str, month: str) -> None:
+        """
+        Junta as partes de uma partição em um arquivo (mesmo conteúdo, menos arquivos).
+        O arquivo novo é instalado antes de apagar as partes antigas: uma interrupção no
+        meio deixa partes cobertas, que a leitura ignora e o próximo compact() apaga.
+        """
+        pa, pq = _pyarrow()
+
+        parts, covered = self._scan(symbol, month)
+        for p in covered:
+            os.remove(p)
+        if len(parts) <= 1:
+            return
+
+        table = pa.concat_tables([pq.read_table(p) for p in parts])
+        first = _PART_RE.match(os.path.basename(parts[0])).group(1)
+        last = _PART_RE.match(os.path.basename(parts[-1])).group(2)
+        path = os.path.join(self._partition_dir(symbol, month), f"part-{first}-{last}.parquet")
+
+        tmp = path + ".tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+        for p in parts:
+            if p != path:
+                os.remove(p)
+
+    # --- leitura ---
+
+    def load(
+            self,
+            symbol: str,
+            month: Optional[str] = None,
+            months: Optional[Iterable[str]] = None,
+            columns: Optional[list[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Lê o dataset de um símbolo. `month="2024-01"` (ou `months=[...]`) lê só essas
+        partições; `columns` lê só essas colunas (o índice timestamp vem sempre).
+        """
+        pa, pq = _pyarrow()
+
+        if month is not None:
+            months = [month]
+        if months is None:
+            parts = self._parts(symbol)
+        else:
+            parts = [p for m in months for p in self._parts(symbol, m)]
+
+        if not parts:
+            return pd.DataFrame()
+
+        read_cols = None if columns is None else list(dict.fromkeys(["timestamp", *columns]))
+        table = pa.concat_tables([pq.read_table(p, columns=read_cols) for p in parts])
+        df = table.to_pandas()
+        if "timestamp" in df.columns:
+            df = df.set_index("timestamp")
+        return df
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Dataset de sinais em Parquet precisa do pacote 'pyarrow'.") from e
+    return pa, pq
@@ -0,0 +1,209 @@
+import argparse
+import itertools
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import run_backtest_15m
+from indicators.ema import EMAIndicator
+from indicators.price_action import PriceAction
+from strategy.entry import EntrySignal
+from strategy.positioning import Positioning
+
+# parâmetros aceitos no grid (e valores padrão do main.py)
+PARAM_DEFAULTS = {
+    "rr": 2.0,
+    "ema_mid": 21,
+    "ema_slow": 50,
+    "swing_left": 1,
+    "swing_right": 1,
+}
+
+FRAME_KEYS = ("1d", "4h", "15m")
+_PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# frames abertos (memory-mapped) em cada processo worker
+_FRAMES: dict = {}
+
+
+def expand_grid(grid: dict) -> list[dict]:
+    """
+    {"rr": [1.5, 2], "ema_mid": [21, 34]} -> lista com todas as combinações
+    (parâmetros ausentes usam PARAM_DEFAULTS).
+    """
+    unknown = set(grid) - set(PARAM_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos no grid: {sorted(unknown)}")
+
+    keys = list(grid)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+    return [{**PARAM_DEFAULTS, **dict(zip(keys, combo))} for combo in itertools.product(*values)]
+
+
+def _dump_frames(frames: dict, directory: str) -> None:
+    """Grava cada coluna como .npy para os workers abrirem via mmap (sem pickle por tarefa)."""
+    for key, df in frames.items():
+        ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+        np.save(os.path.join(directory, f"{key}_timestamp.npy"), ts)
+        for col in _PRICE_COLUMNS:
+            np.save(os.path.join(directory, f"{key}_{col}.npy"), df[col].to_numpy(dtype="float64"))
+
+
+def _open_frames(directory: str) -> None:
+    """Initializer do worker: abre as colunas memory-mapped uma vez por processo."""
+    _FRAMES.clear()
+    _cached_htf.cache_clear()
+    _cached_15m.cache_clear()
+
+    for key in FRAME_KEYS:
+        ts = np.load(os.path.join(directory, f"{key}_timestamp.npy"), mmap_mode="r")
+        data = {col: np.load(os.path.join(directory, f"{key}_{col}.npy"), mmap_mode="r") for col in _PRICE_COLUMNS}
+        df = pd.DataFrame(data, index=pd.to_datetime(np.asarray(ts), unit="ms"))
+        df.index.name = "timestamp"
+        _FRAMES[key] = df
+
+
+def _with_emas(df: pd.DataFrame, mid: int, slow: int) -> pd.DataFrame:
+    """EMAs média/lenta com os spans do grid (colunas ema_<span>, como no EMAIndicator)."""
+    return EMAIndicator(df, copy=False).calculate((mid, slow))
+
+
+@lru_cache(maxsize=128)
+def _cached_htf(key: str, left: int, right: int, mid: int, slow: int) -> pd.DataFrame:
+    df = PriceAction(_FRAMES[key]).detect_swings(left=left, right=right)
+    return _with_emas(df, mid, slow)
+
+
+@lru_cache(maxsize=32)
+def _cached_15m(mid: int, slow: int) -> pd.DataFrame:
+    return _with_emas(_FRAMES["15m"].copy(), mid, slow)
+
+
+def _run_one(params: dict) -> dict:
+    spans = (int(params["ema_mid"]), int(params["ema_slow"]))
+    left, right = int(params["swing_left"]), int(params["swing_right"])
+
+    df_1d = _cached_htf("1d", left, right, *spans)
+    df_4h = _cached_htf("4h", left, right, *spans)
+    # papéis média/lenta da estratégia = colunas dos spans do grid
+    ema_mid, ema_slow = f"ema_{spans[0]}", f"ema_{spans[1]}"
+    pos = Positioning(df_1d, df_4h, ema_columns=(ema_mid, ema_slow)).summary()
+
+    side = pos["bias_final"]
+    zone = pos["buy_zone_4h"] if side == "long" else pos["sell_zone_4h"]
+    stop_level = pos["invalidation"]
+
+    row = {**params, "side": side}
+    if side not in ("long", "short") or zone is None or stop_level is None:
+        return {**row, "trades": 0, "wins": 0, "losses": 0, "win_rate": 0.0,
+                "avg_r": 0.0, "equity_r": 0.0, "max_drawdown_r": 0.0}
+
+    stats = run_backtest_15m(
+        df_15m=_cached_15m(*spans),
+        side=side,
+        zone=zone,
+        stop_level=stop_level,
+        rr=float(params["rr"]),
+        trades_csv_path=None,
+        mode="vectorized",
+        entry_mask_fn=partial(EntrySignal.ema21_rejection_mask, ema_column=ema_mid)
+    )
+    stats.pop("csv", None)
+    return {**row, **stats}
+
+
+def run_sweep(
+        df_1d: pd.DataFrame,
+        df_4h: pd.DataFrame,
+        df_15m: pd.DataFrame,
+        grid: dict,
+        workers: Optional[int] = None,
+        rank_by: str = "equity_r",
+        ascending: bool = False
+) -> pd.DataFrame:
+    """
+    Roda run_backtest_15m para todas as combinações do grid num pool de processos.
+
+    Os OHLCV vão para arquivos .npy memory-mapped: cada worker abre uma vez
+    (o SO compartilha as páginas) e cada tarefa só recebe o dict de parâmetros.
+    Swings/EMAs iguais entre combinações são reaproveitados no worker (lru_cache).
+
+    Retorna uma tabela única ordenada por `rank_by`.
+    """
+    combos = expand_grid(grid)
+    workers = workers or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(prefix="sweep_") as directory:
+        _dump_frames({"1d": df_1d, "4h": df_4h, "15m": df_15m}, directory)
+
+        if workers == 1:
+            _open_frames(directory)
+            rows = [_run_one(p) for p in combos]
+            _FRAMES.clear()
+        else:
+            chunksize = max(1, len(combos) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_open_frames, initargs=(directory,)) as pool:
+                rows = list(pool.map(_run_one, combos, chunksize=chunksize))
+
+    table = pd.DataFrame(rows)
+    if len(table):
+        table = table.sort_values(rank_by, ascending=ascending, kind="stable").reset_index(drop=True)
+        table.insert(0, "rank", np.arange(1, len(table) + 1))
+    return table
+
+
+def _parse_param(text: str) -> tuple[str, list]:
+    """'rr=1.5,2,3' -> ("rr", [1.5, 2.0, 3.0])"""
+    name, _, values = text.partition("=")
+    name = name.strip()
+    if name not in PARAM_DEFAULTS or not values:
+        raise argparse.ArgumentTypeError(f"Parâmetro inválido: {text!r}")
+    cast = type(PARAM_DEFAULTS[name])
+    return name, [cast(v) for v in values.split(",")]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Sweep de parâmetros do backtest 15m (dados do store local).")
+    parser.add_argument("--symbol", default="BTC/USDT")
+    parser.add_argument("--db", default="data/cache/ohlcv.sqlite", help="store SQLite com os candles")
+    parser.add_argument("--grid", help="arquivo JSON {parametro: [valores]}")
+    parser.add_argument("--param", action="append", type=_parse_param, default=[],
+                        help="ex.: --param rr=1.5,2,3 (pode repetir)")
+    parser.add_argument("--limit-1d", type=int, default=200)
+    parser.add_argument("--limit-4h", type=int, default=200)
+    parser.add_argument("--limit-15m", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rank-by", default="equity_r")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="salva a tabela completa em CSV")
+    args = parser.parse_args(argv)
+
+    grid: dict = {}
+    if args.grid:
+        with open(args.grid, encoding="utf-8") as f:
+            grid.update(json.load(f))
+    grid.update(dict(args.param))
+
+    from data.market_data import MarketData
+    from data.store import OHLCVStore
+
+    market = MarketData(store=OHLCVStore(args.db), offline=True)
+    df_1d = market.get_ohlcv(symbol=args.symbol, timeframe="1d", limit=args.limit_1d)
+    df_4h = market.get_ohlcv(symbol=args.symbol, timeframe="4h", limit=args.limit_4h)
+    df_15m = market.get_ohlcv(symbol=args.symbol, timeframe="15m", limit=args.limit_15m)
+
+    table = run_sweep(df_1d, df_4h, df_15m, grid, workers=args.workers, rank_by=args.rank_by)
+
+    if args.out:
+        table.to_csv(args.out, index=False)
+    print(table.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
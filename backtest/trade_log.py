@@ -0,0 +1,154 @@
+import csv
+import os
+from dataclasses import asdict
+from typing import Optional
+
+import pandas as pd
+
+from utils import instrumentation
+
+TRADE_FIELDS = ["side", "entry_time", "entry", "stop", "tp", "exit_time", "exit", "result", "r"]
+LOG_FORMATS = ("csv", "parquet", "feather")
+
+
+class TradeLog:
+    """
+    Log de trades em memória (colunar), gravado em disco uma vez por run ou em blocos.
+
+    - path=None: não toca no disco (use to_frame() para pegar os trades)
+    - fmt: "csv", "parquet" ou "feather" (padrão: deduzido da extensão do path)
+    - chunk_size: grava a cada N trades (csv/parquet); None = grava só no close()
+    - append=False: cada run começa um arquivo novo (não acumula runs anteriores)
+
+    Feather não suporta escrita incremental: é sempre gravado inteiro no close().
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            fmt: Optional[str] = None,
+            chunk_size: Optional[int] = None,
+            append: bool = False
+    ):
+        if fmt is None and path is not None:
+            ext = os.path.splitext(path)[1].lstrip(".").lower()
+            fmt = ext if ext in LOG_FORMATS else "csv"
+        fmt = fmt or "csv"
+
+        if fmt not in LOG_FORMATS:
+            raise ValueError(f"Formato de log não suportado: {fmt!r} (use {', '.join(LOG_FORMATS)}).")
+        if append and fmt != "csv":
+            raise ValueError("append=True só é suportado para CSV.")
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("chunk_size precisa ser >= 1.")
+
+        self.path = path
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.append = append
+
+        self._columns: dict[str, list] = {field: [] for field in TRADE_FIELDS}
+        self._flushed = 0  # quantos trades já foram para o disco
+        self._started = False  # arquivo já foi aberto/criado neste run
+        self._parquet_writer = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._columns["side"])
+
+    def __enter__(self) -> "TradeLog":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def add(self, trade) -> None:
+        """Adiciona um trade fechado (dataclass Trade ou dict com TRADE_FIELDS)."""
+        if self._closed:
+            raise ValueError("TradeLog já foi fechado (close()); crie outro para um novo run.")
+        row = trade if isinstance(trade, dict) else asdict(trade)
+        for field in TRADE_FIELDS:
+            self._columns[field].append(row[field])
+
+        if self.chunk_size is not None and len(self) - self._flushed >= self.chunk_size:
+            self.flush()
+
+    def to_frame(self) -> pd.DataFrame:
+        """Todos os trades do run como DataFrame (sem ler do disco)."""
+        return self._frame(0, len(self))
+
+    def _frame(self, start: int, end: int) -> pd.DataFrame:
+        return pd.DataFrame({field: self._columns[field][start:end] for field in TRADE_FIELDS}, columns=TRADE_FIELDS)
+
+    def flush(self) -> None:
+        """Grava no disco os trades ainda pendentes."""
+        if self.path is None or self.fmt == "feather":
+            return
+
+        start, end = self._flushed, len(self)
+        if start == end and self._started:
+            return
+
+        if not self._started:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        if self.fmt == "csv":
+            self._write_csv(start, end)
+        else:
+            self._write_parquet(start, end)
+
+        self._started = True
+        self._flushed = end
+
+    def close(self) -> None:
+        """Grava o que falta e fecha o arquivo."""
+        if self._closed:
+            return
+
+        if self.path is not None and self.fmt == "feather":
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.to_frame().to_feather(self.path)
+            instrumentation.count("bytes_written", os.path.getsize(self.path))
+            self._flushed = len(self)
+        else:
+            self.flush()
+
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+            instrumentation.count("bytes_written", os.path.getsize(self.path))
+
+        self._closed = True
+
+    def _write_csv(self, start: int, end: int) -> None:
+        if self._started:
+            mode, header = "a", False
+        elif self.append:
+            mode, header = "a", not os.path.exists(self.path)
+        else:
+            mode, header = "w", True
+
+        with open(self.path, mode, newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            start_pos = f.tell()
+            if header:
+                writer.writerow(TRADE_FIELDS)
+            writer.writerows(zip(*(self._columns[field][start:end] for field in TRADE_FIELDS)))
+            instrumentation.count("bytes_written", f.tell() - start_pos)
+
+    def _write_parquet(self, start: int, end: int) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Log em Parquet precisa do pacote 'pyarrow'.") from e
+
+        # só as linhas pendentes do bloco (não remonta o frame inteiro a cada flush)
+        table = pa.Table.from_pandas(self._frame(start, end), preserve_index=False)
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+        self._parquet_writer.write_table(table)
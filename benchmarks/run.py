@@ -0,0 +1,188 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import run_backtest_15m
+from benchmarks.synthetic import generate_ohlcv
+from indicators.ema import EMAIndicator
+from indicators.market_structure import MarketStructure
+from indicators.price_action import PriceAction
+from strategy.entry import EntrySignal
+from strategy.positioning import Positioning
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+STAGES = ("detect_swings", "add_structure", "ema", "positioning_summary", "backtest_vectorized", "backtest_loop")
+
+
+def _measure(fn, repeat: int, memory: bool) -> dict:
+    """Melhor tempo de `repeat` execuções + pico de memória (tracemalloc) de uma execução extra."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def _stage_fns(df: pd.DataFrame) -> dict:
+    """Funções de cada estágio sobre o mesmo frame sintético (dependências pré-calculadas)."""
+    swings = PriceAction(df).detect_swings()
+    with_emas = EMAIndicator(swings).calculate()
+
+    # zona e stop fixos em torno do preço médio: garante trades em qualquer tamanho
+    mid = float(with_emas["close"].median())
+    spread = float(with_emas["close"].std())
+    zone = (mid - spread, mid + spread)
+    stop = mid - 2 * spread
+
+    def backtest(mode: str):
+        return run_backtest_15m(
+            with_emas, "long", zone, stop,
+            trades_csv_path=None,
+            entry_signal_fn=EntrySignal.ema21_rejection,
+            mode=mode,
+            entry_mask_fn=EntrySignal.ema21_rejection_mask if mode == "vectorized" else None
+        )
+
+    return {
+        "detect_swings": lambda: PriceAction(df).detect_swings(),
+        "add_structure": lambda: MarketStructure(swings).add_structure(),
+        "ema": lambda: EMAIndicator(df).calculate(),
+        # mesmo frame como 1D e 4H: mede o custo do summary() no tamanho n
+        "positioning_summary": lambda: Positioning(with_emas, with_emas).summary(),
+        "backtest_vectorized": lambda: backtest("vectorized"),
+        "backtest_loop": lambda: backtest("loop"),
+    }
+
+
+def run_benchmarks(
+        sizes: list[str],
+        stages: tuple[str, ...] = STAGES,
+        seed: int = 42,
+        repeat: int = 3,
+        memory: bool = True,
+        loop_max_rows: int = 10_000
+) -> dict:
+    """
+    Roda cada estágio em cada tamanho com OHLCV sintético (offline, determinístico).
+    O backtest em modo loop só roda até `loop_max_rows` (é O(n) lento por candle).
+    """
+    results = []
+    for label in sizes:
+        n = SIZES[label]
+        df = generate_ohlcv(n, seed=seed)
+        fns = _stage_fns(df)
+
+        for stage in stages:
+            if stage == "backtest_loop" and n > loop_max_rows:
+                continue
+            measured = _measure(fns[stage], repeat, memory)
+            results.append({"stage": stage, "size": label, "rows": n, **measured})
+            print(f"{stage:<22} {label:>5}  {measured['seconds'] * 1000:10.2f} ms"
+                  + (f"  peak {measured['peak_bytes'] / 1e6:8.1f} MB" if measured["peak_bytes"] is not None else ""),
+                  flush=True)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 1.2, min_delta_s: float = 0.001) -> list[dict]:
+    """
+    Compara tempos por (estágio, tamanho). Regressão = atual / baseline > threshold
+    e diferença absoluta > min_delta_s (ignora ruído em estágios de microssegundos).
+    """
+    base = {(r["stage"], r["size"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        key = (r["stage"], r["size"])
+        if key not in base:
+            continue
+        ratio = r["seconds"] / base[key]["seconds"] if base[key]["seconds"] > 0 else float("inf")
+        rows.append({
+            "stage": r["stage"],
+            "size": r["size"],
+            "baseline_s": base[key]["seconds"],
+            "current_s": r["seconds"],
+            "ratio": ratio,
+            "regression": ratio > threshold and r["seconds"] - base[key]["seconds"] > min_delta_s,
+        })
+    return rows
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline (dados sintéticos, offline).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="roda os benchmarks e salva JSON")
+    p_run.add_argument("--sizes", default="10k,100k", help=f"lista separada por vírgula ({', '.join(SIZES)})")
+    p_run.add_argument("--stages", default=",".join(STAGES))
+    p_run.add_argument("--seed", type=int, default=42)
+    p_run.add_argument("--repeat", type=int, default=3)
+    p_run.add_argument("--no-memory", action="store_true", help="não mede pico de memória (mais rápido)")
+    p_run.add_argument("--loop-max-rows", type=int, default=10_000)
+    p_run.add_argument("--out", default="bench_results.json")
+
+    p_cmp = sub.add_parser("compare", help="compara resultado atual com um baseline salvo")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=1.2, help="razão atual/baseline considerada regressão")
+    p_cmp.add_argument("--min-delta-ms", type=float, default=1.0, help="diferença mínima (ms) para contar regressão")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        sizes = [s.strip().lower() for s in args.sizes.split(",") if s.strip()]
+        stages = tuple(s.strip() for s in args.stages.split(",") if s.strip())
+        unknown = [s for s in sizes if s not in SIZES] + [s for s in stages if s not in STAGES]
+        if unknown:
+            parser.error(f"valores desconhecidos: {unknown}")
+
+        report = run_benchmarks(sizes, stages, seed=args.seed, repeat=args.repeat,
+                                memory=not args.no_memory, loop_max_rows=args.loop_max_rows)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados salvos em: {args.out}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, threshold=args.threshold, min_delta_s=args.min_delta_ms / 1000)
+    for r in rows:
+        flag = "REGRESSÃO" if r["regression"] else "ok"
+        print(f"{r['stage']:<22} {r['size']:>5}  {r['baseline_s'] * 1000:10.2f} ms -> "
+              f"{r['current_s'] * 1000:10.2f} ms  x{r['ratio']:.2f}  {flag}")
+
+    return 1 if any(r["regression"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
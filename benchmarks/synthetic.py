@@ -0,0 +1,59 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from data.timeframes import timeframe_to_ms
+
+# volatilidade por regime (desvio do log-retorno por candle) e probabilidade de troca
+REGIME_VOLS = (0.0015, 0.004, 0.01)
+REGIME_SWITCH_PROB = 0.002
+
+
+def generate_ohlcv(
+        n: int,
+        seed: int = 42,
+        timeframe: str = "15m",
+        start: str = "2020-01-01",
+        start_price: float = 30_000.0,
+        regime_vols: tuple[float, ...] = REGIME_VOLS,
+        switch_prob: float = REGIME_SWITCH_PROB,
+        drift: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    OHLCV sintético e determinístico (mesmo seed -> mesmos candles):
+    random walk em log-preço com regimes de volatilidade (cadeia de Markov).
+
+    Formato igual ao de MarketData.get_ohlcv (índice datetime, colunas float64).
+    """
+    rng = np.random.default_rng(seed)
+
+    # regimes: troca com probabilidade switch_prob por candle
+    segment = np.cumsum(rng.random(n) < switch_prob)
+    regime = rng.integers(len(regime_vols), size=int(segment[-1]) + 1 if n else 1)
+    vol = np.asarray(regime_vols, dtype="float64")[regime[segment]]
+
+    mu = 0.0 if drift is None else drift
+    log_ret = mu + vol * rng.standard_normal(n)
+    close = start_price * np.exp(np.cumsum(log_ret))
+    open_ = np.empty(n)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+
+    # pavios proporcionais à volatilidade do regime
+    wick_up = np.abs(rng.standard_normal(n)) * vol * 0.5
+    wick_down = np.abs(rng.standard_normal(n)) * vol * 0.5
+    high = np.maximum(open_, close) * np.exp(wick_up)
+    low = np.minimum(open_, close) * np.exp(-wick_down)
+
+    volume = rng.lognormal(mean=3.0, sigma=0.5, size=n) * (vol / regime_vols[0])
+
+    step = timeframe_to_ms(timeframe)
+    start_ms = int(pd.Timestamp(start).value // 1_000_000)
+    index = pd.to_datetime(start_ms + np.arange(n, dtype="int64") * step, unit="ms")
+    index.name = "timestamp"
+
+    return pd.DataFrame(
+        {"open": open_, "high": high, "low": low, "close": close, "volume": volume},
+        index=index,
+    )
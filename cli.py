@@ -0,0 +1,297 @@
+"""
+Linha de comando do analisador (início rápido: cada subcomando importa só o que usa).
+
+    python cli.py fetch    --symbol BTC/USDT --timeframes 1d,4h,15m     # rede (ccxt)
+    python cli.py analyze  --symbol BTC/USDT                             # só o store local
+    python cli.py compact  --symbol BTC/USDT --timeframes 1d,4h,15m     # store -> layout memory-mapped
+    python cli.py backtest --symbol BTC/USDT --signal "ema21_rejection & within(engulfing, 3)"
+    python cli.py validate --symbol BTC/USDT --timeframe 1m --repair refetch
+    python cli.py sweep    --param rr=1.5,2,3                            # = python -m backtest.sweep
+    python cli.py importtime --budget-ms 1500                            # orçamento de startup
+
+Só `fetch`, `validate --repair refetch` e `analyze`/`backtest` com --fetch carregam o ccxt.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Optional
+
+DEFAULT_DB = "data/cache/ohlcv.sqlite"
+DEFAULT_COMPACT = "data/cache/compact"
+TIMEFRAME_LIMITS = {"1d": 200, "4h": 200, "15m": 1000}
+
+# módulos que os subcomandos offline (analyze/backtest/validate) importam
+OFFLINE_MODULES = (
+    "data.market_data",
+    "data.store",
+    "data.validation",
+    "data.frame_cache",
+    "indicators.pipeline",
+    "strategy.positioning",
+    "strategy.signals",
+    "backtest.engine",
+    "backtest.metrics",
+)
+# módulos que nunca podem aparecer no startup offline
+NETWORK_MODULES = ("ccxt",)
+# orçamento de startup offline (ms) do `importtime` e do teste
+IMPORT_BUDGET_MS = 1500.0
+
+
+def _market(args, offline: bool):
+    from data.market_data import MarketData
+    from data.store import OHLCVStore
+
+    return MarketData(exchange_name=args.exchange, store=OHLCVStore(args.db), offline=offline)
+
+
+def _load_frames(args) -> dict:
+    """
+    {timeframe: frame} do store (com --fetch, completa antes pela exchange)
+    ou, com --compact, do layout memory-mapped gravado por `cli.py compact`.
+    """
+    if args.compact and args.fetch:
+        raise SystemExit("--fetch não atualiza o layout compacto (rode `cli.py compact` depois do fetch).")
+    market = _market(args, offline=not args.fetch)
+    frames = {}
+    for tf, default in TIMEFRAME_LIMITS.items():
+        limit = getattr(args, f"limit_{tf}", default)
+        if args.compact:
+            frames[tf] = market.get_compact(args.symbol, tf, args.compact, limit=limit)
+        else:
+            frames[tf] = market.get_ohlcv(symbol=args.symbol, timeframe=tf, limit=limit)
+        if frames[tf].empty:
+            source = args.compact or args.db
+            raise SystemExit(f"Sem candles de {args.symbol} {tf} em {source} (rode `cli.py fetch` antes).")
+    return frames
+
+
+# --- subcomandos ---
+
+def cmd_fetch(args) -> int:
+    market = _market(args, offline=False)
+    for tf in [t.strip() for t in args.timeframes.split(",") if t.strip()]:
+        df = market.get_ohlcv(symbol=args.symbol, timeframe=tf, limit=args.limit)
+        last = df.index[-1] if len(df) else None
+        print(f"{args.symbol} {tf}: {len(df)} candles no store (último: {last})")
+    return 0
+
+
+def cmd_compact(args) -> int:
+    market = _market(args, offline=True)
+    for tf in [t.strip() for t in args.timeframes.split(",") if t.strip()]:
+        directory = market.export_compact(args.symbol, tf, args.out, float32=args.float32)
+        print(f"{args.symbol} {tf}: layout compacto em {directory}")
+    return 0
+
+
+def cmd_analyze(args) -> int:
+    from indicators.pipeline import IndicatorPipeline
+    from strategy.positioning import Positioning
+
+    frames = _load_frames(args)
+    df_1d = IndicatorPipeline(frames["1d"]).run()
+    df_4h = IndicatorPipeline(frames["4h"]).run()
+
+    print(f"=== {args.symbol} ===")
+    for tf, df in (("1d", df_1d), ("4h", df_4h)):
+        print(f"Trend {tf}:", IndicatorPipeline(df, copy=False).trend())
+    print("Positioning:", Positioning(df_1d, df_4h, copy=False).summary())
+    return 0
+
+
+def cmd_backtest(args) -> int:
+    from backtest.engine import run_backtest_walkforward
+    from backtest.metrics import trade_metrics
+    from data.frame_cache import FrameCache
+    from indicators.pipeline import IndicatorPipeline
+    from strategy.positioning import Positioning
+    from strategy.signals import parse_signal
+
+    entry_mask = parse_signal(args.signal)
+    frames = _load_frames(args)
+    df_1d = IndicatorPipeline(frames["1d"]).run("swings", "emas")
+    df_4h = IndicatorPipeline(frames["4h"]).run("swings", "emas")
+    df_15m = IndicatorPipeline(frames["15m"]).run("swings", "emas")
+
+    cache = FrameCache(args.cache_dir) if args.cache_dir else None
+    context = Positioning(df_1d, df_4h, copy=False).walk_forward(df_15m, cache=cache)
+    stats = run_backtest_walkforward(
+        df_15m=df_15m,
+        context=context,
+        rr=args.rr,
+        trades_csv_path=args.trades_csv,
+        entry_mask_fn=entry_mask,
+        return_trades=True
+    )
+    trades = stats.pop("trades_df")
+
+    print(f"=== Walk-forward {args.symbol} ({entry_mask!r}) ===")
+    print("Stats:", stats)
+    if len(trades):
+        print("Líquido:", trade_metrics(trades, fee_rate=args.fee, slippage=args.slippage))
+    return 0
+
+
+def cmd_validate(args) -> int:
+    from data.validation import repair_ohlcv, validate_ohlcv
+
+    market = _market(args, offline=args.repair != "refetch")
+    df = market.get_ohlcv(symbol=args.symbol, timeframe=args.timeframe, limit=args.limit)
+    report = validate_ohlcv(df, args.timeframe)
+    print("Antes:", report.summary())
+    if len(report.gaps):
+        print(report.gap_frame().head(args.top).to_string(index=False))
+
+    if args.repair != "none":
+        df, report = repair_ohlcv(
+            df,
+            args.timeframe,
+            mode=args.repair,
+            report=report,
+            refetch=lambda since, until: market.get_window(
+                args.symbol, args.timeframe, since, until, refresh=True
+            ),
+        )
+        if args.repair == "mark":
+            print(f"Marcados como inválidos: {int(df['invalid'].sum())}")
+        else:
+            print("Depois:", report.summary())
+
+    # código de saída != 0 se ainda há problemas (útil em scripts)
+    return 0 if report.ok else 1
+
+
+def cmd_sweep(args) -> int:
+    from backtest.sweep import main as sweep_main
+
+    sweep_main(args.sweep_args)
+    return 0
+
+
+def importtime_report(modules=OFFLINE_MODULES) -> dict:
+    """
+    Importa `modules` num interpretador novo com -X importtime e devolve
+    {"total_ms": ..., "top": [(módulo, ms acumulado)], "network_modules": [...]}.
+    """
+    code = "; ".join(f"import {m}" for m in modules) or "pass"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=False,
+        cwd=os.path.dirname(os.path.abspath(__file__)),  # raiz do projeto, de onde quer que rode
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modules}:\n{proc.stderr[-2000:]}")
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package" (indentação = nível)
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum_us, name = line.split(":", 1)[1].split("|", 2)
+        cumulative[name[1:]] = int(cum_us) / 1000
+
+    # raiz = módulos importados no nível superior (sem indentação no nome)
+    roots = {name: ms for name, ms in cumulative.items() if not name.startswith(" ")}
+    loaded = {name.strip() for name in cumulative}
+    return {
+        "total_ms": sum(roots.values()),
+        "top": sorted(roots.items(), key=lambda kv: kv[1], reverse=True)[:10],
+        "network_modules": sorted(m for m in NETWORK_MODULES if m in loaded),
+    }
+
+
+def cmd_importtime(args) -> int:
+    report = importtime_report()
+    print(f"Startup offline: {report['total_ms']:.0f} ms (orçamento {args.budget_ms:.0f} ms)")
+    for name, ms in report["top"]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if report["network_modules"]:
+        print("ERRO: subcomandos offline importam", ", ".join(report["network_modules"]))
+        failed = True
+    if report["total_ms"] > args.budget_ms:
+        print("ERRO: startup acima do orçamento")
+        failed = True
+    return 1 if failed else 0
+
+
+# --- parser ---
+
+def _add_data_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--symbol", default="BTC/USDT")
+    parser.add_argument("--db", default=DEFAULT_DB, help="store SQLite com os candles")
+    parser.add_argument("--exchange", default="binance")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="BTC Market Analyzer")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("fetch", help="baixa/atualiza candles no store (rede)")
+    _add_data_args(p)
+    p.add_argument("--timeframes", default="1d,4h,15m")
+    p.add_argument("--limit", type=int, default=1000, help="candles iniciais quando o store está vazio")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("compact", help="grava o histórico do store no layout memory-mapped (offline)")
+    _add_data_args(p)
+    p.add_argument("--timeframes", default="1d,4h,15m")
+    p.add_argument("--out", default=DEFAULT_COMPACT)
+    p.add_argument("--float32", action="store_true", help="OHLC em float32 (metade do disco, menos precisão)")
+    p.set_defaults(func=cmd_compact)
+
+    for name, func, help_text in (
+            ("analyze", cmd_analyze, "tendência + positioning a partir do store"),
+            ("backtest", cmd_backtest, "backtest walk-forward a partir do store"),
+    ):
+        p = sub.add_parser(name, help=help_text)
+        _add_data_args(p)
+        p.add_argument("--fetch", action="store_true", help="completa o store pela exchange antes (rede)")
+        p.add_argument("--compact", default="", help="lê do layout de `cli.py compact` (ex.: data/cache/compact)")
+        for tf, default in TIMEFRAME_LIMITS.items():
+            p.add_argument(f"--limit-{tf}", type=int, default=default)
+        p.set_defaults(func=func)
+
+        if name == "backtest":
+            p.add_argument("--signal", default="ema21_rejection", help="expressão de strategy.signals")
+            p.add_argument("--rr", type=float, default=2.0)
+            p.add_argument("--fee", type=float, default=0.001, help="taxa por lado (fração)")
+            p.add_argument("--slippage", type=float, default=0.0005, help="slippage por execução (fração)")
+            p.add_argument("--cache-dir", default="data/cache/frames", help="'' desliga o cache de contexto")
+            p.add_argument("--trades-csv", default="logs/trades_walkforward.csv")
+
+    p = sub.add_parser("validate", help="valida candles do store (gaps + regras) e aplica reparo")
+    _add_data_args(p)
+    p.add_argument("--timeframe", default="15m")
+    p.add_argument("--limit", type=int, default=1_000_000)
+    p.add_argument("--repair", choices=("none", "mark", "ffill", "refetch"), default="none",
+                   help="refetch acessa a rede para os gaps/candles inválidos")
+    p.add_argument("--top", type=int, default=20, help="gaps listados")
+    p.set_defaults(func=cmd_validate)
+
+    # argumentos repassados sem parse para backtest.sweep (inclusive -h)
+    p = sub.add_parser("sweep", help="sweep de parâmetros (argumentos de backtest.sweep)", add_help=False)
+    p.set_defaults(func=cmd_sweep)
+
+    p = sub.add_parser("importtime", help="mede o startup offline (-X importtime) contra um orçamento")
+    p.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    p.set_defaults(func=cmd_importtime)
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "sweep":
+        args.sweep_args = extra
+    elif extra:
+        parser.error(f"argumentos não reconhecidos: {' '.join(extra)}")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
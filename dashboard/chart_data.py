@@ -0,0 +1,250 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators.market_structure import STRUCTURE_HIGH_LABELS, STRUCTURE_LOW_LABELS
+
+OHLC_COLUMNS = ("open", "high", "low", "close", "volume")
+BAND_COLUMNS = ("zone_low", "zone_high", "invalidation")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Downsampling estilo Largest-Triangle-Three-Buckets: índices de `threshold` pontos
+    que preservam a forma da linha (picos/vales), sempre com o primeiro e o último.
+
+    Variante vetorizada: o 1º vértice do triângulo é a MÉDIA do bucket anterior (e não
+    o ponto escolhido nele), então todos os buckets são resolvidos de uma vez.
+    NaNs são ignorados (a linha é reduzida só sobre os pontos válidos).
+    """
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if threshold >= n or threshold < 3:
+        return valid
+
+    xv = x[valid].astype("float64")
+    yv = y[valid].astype("float64")
+
+    # buckets internos sobre os pontos 1..n-2 (primeiro e último ficam fixos)
+    edges = np.linspace(1, n - 1, threshold - 1).astype("int64")
+    starts = edges[:-1]
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(xv[1:n - 1], starts - 1) / counts
+    avg_y = np.add.reduceat(yv[1:n - 1], starts - 1) / counts
+
+    # vértices A (bucket anterior) e C (bucket seguinte) de cada bucket
+    ax = np.r_[xv[0], avg_x[:-1]]
+    ay = np.r_[yv[0], avg_y[:-1]]
+    cx = np.r_[avg_x[1:], xv[-1]]
+    cy = np.r_[avg_y[1:], yv[-1]]
+
+    bucket = np.repeat(np.arange(len(starts)), counts)
+    bx, by = xv[1:n - 1], yv[1:n - 1]
+    area = np.abs((ax[bucket] - cx[bucket]) * (by - ay[bucket]) - (ax[bucket] - bx) * (cy[bucket] - ay[bucket]))
+
+    # primeiro ponto de área máxima em cada bucket
+    best = np.maximum.reduceat(area, starts - 1)
+    pos = np.where(area == best[bucket], np.arange(n - 2), n)
+    chosen = np.minimum.reduceat(pos, starts - 1) + 1
+
+    return valid[np.r_[0, chosen, n - 1]]
+
+
+class ChartPyramid:
+    """
+    Dados de gráfico pré-computados em vários níveis de zoom (pirâmide de OHLC).
+
+    Nível 0 = candles originais; nível k agrupa `factor**k` candles base por bucket
+    de tempo (open=primeiro, high=máx, low=mín, close=último, volume=soma), então
+    máximos/mínimos nunca somem ao afastar o zoom. EMAs e bandas (zona/invalidação)
+    usam o último valor de cada bucket.
+
+    query(start, end, max_points) escolhe o nível mais fino que cabe em max_points
+    candles e devolve só a janela pedida (busca binária, sem varrer o histórico).
+    """
+
+    def __init__(self, df: pd.DataFrame, base_ms: int, factor: int = 4, min_rows: int = 500):
+        if factor < 2:
+            raise ValueError("factor precisa ser >= 2.")
+
+        self.base_ms = base_ms
+        self.factor = factor
+        self.line_columns = [c for c in df.columns if c.startswith("ema_")]
+        self.band_columns = [c for c in BAND_COLUMNS if c in df.columns]
+
+        ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+        level0 = {"t": ts}
+        for col in OHLC_COLUMNS:
+            level0[col] = df[col].to_numpy(dtype="float64")
+        for col in self.line_columns + self.band_columns:
+            level0[col] = df[col].to_numpy(dtype="float64")
+
+        self.levels = [level0]
+        self.bucket_ms = [base_ms]
+        while len(self.levels[-1]["t"]) > min_rows:
+            bucket = self.bucket_ms[-1] * factor
+            self.levels.append(self._aggregate(self.levels[-1], bucket))
+            self.bucket_ms.append(bucket)
+
+        # swings também em níveis: cada nível guarda só o high mais alto e o low
+        # mais baixo por bucket (mesmos buckets da pirâmide de candles)
+        self._marker_levels = [self._build_markers(df, ts)]
+        for bucket in self.bucket_ms[1:]:
+            self._marker_levels.append(self._reduce_markers(self._marker_levels[-1], bucket))
+        self._markers = self._marker_levels[0]
+
+    @staticmethod
+    def _aggregate(level: dict, bucket_ms: int) -> dict:
+        ts = level["t"]
+        key = ts // bucket_ms
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+
+        out = {
+            "t": key[starts] * bucket_ms,
+            "open": level["open"][starts],
+            "high": np.maximum.reduceat(level["high"], starts),
+            "low": np.minimum.reduceat(level["low"], starts),
+            "close": level["close"][ends],
+            "volume": np.add.reduceat(level["volume"], starts),
+        }
+        for col in level:
+            if col not in out:
+                out[col] = level[col][ends]
+        return out
+
+    @staticmethod
+    def _build_markers(df: pd.DataFrame, ts: np.ndarray) -> dict:
+        """Swings (com label de estrutura quando houver) como arrays ordenados por tempo."""
+        parts = []
+        for flag, price_col, struct_col, labels, kind in (
+                ("swing_high", "high", "structure_high", STRUCTURE_HIGH_LABELS, 1),
+                ("swing_low", "low", "structure_low", STRUCTURE_LOW_LABELS, -1),
+        ):
+            if flag not in df.columns:
+                continue
+            rows = np.flatnonzero(df[flag].to_numpy(dtype=bool))
+            if struct_col in df.columns:
+                codes = np.asarray(pd.Categorical(df[struct_col], categories=labels).codes)[rows]
+                label = np.where(codes >= 0, np.asarray(labels, dtype=object)[np.maximum(codes, 0)], None)
+            else:
+                label = np.full(len(rows), None, dtype=object)
+            parts.append((ts[rows], df[price_col].to_numpy(dtype="float64")[rows],
+                          np.full(len(rows), kind, dtype="int8"), label))
+
+        if not parts:
+            return {"t": np.empty(0, "int64"), "price": np.empty(0), "kind": np.empty(0, "int8"),
+                    "label": np.empty(0, dtype=object)}
+
+        t, price, kind, label = (np.concatenate(col) for col in zip(*parts))
+        order = np.argsort(t, kind="stable")
+        return {"t": t[order], "price": price[order], "kind": kind[order], "label": label[order]}
+
+    @staticmethod
+    def _reduce_markers(m: dict, bucket_ms: int) -> dict:
+        key = m["t"] // bucket_ms
+        keep = []
+        for sign in (1, -1):
+            sel = np.flatnonzero(m["kind"] == sign)
+            if not len(sel):
+                continue
+            # por bucket: maior preço (highs) ou menor (lows) -> ordena e pega o 1º de cada bucket
+            order = sel[np.lexsort((-sign * m["price"][sel], key[sel]))]
+            first = np.r_[True, key[order][1:] != key[order][:-1]]
+            keep.append(order[first])
+
+        idx = np.sort(np.concatenate(keep)) if keep else np.empty(0, dtype="int64")
+        return {name: values[idx] for name, values in m.items()}
+
+    # --- consulta ---
+
+    @property
+    def start(self) -> int:
+        return int(self.levels[0]["t"][0]) if len(self.levels[0]["t"]) else 0
+
+    @property
+    def end(self) -> int:
+        return int(self.levels[0]["t"][-1]) + self.base_ms if len(self.levels[0]["t"]) else 0
+
+    def level_for(self, start: int, end: int, max_points: int) -> int:
+        """Nível mais fino com no máximo max_points candles em [start, end)."""
+        for k, level in enumerate(self.levels):
+            t = level["t"]
+            if np.searchsorted(t, end, "left") - np.searchsorted(t, start, "left") <= max_points:
+                return k
+        return len(self.levels) - 1
+
+    def query(
+            self,
+            start: Optional[int] = None,
+            end: Optional[int] = None,
+            max_points: int = 1500,
+            max_markers: int = 300
+    ) -> dict:
+        start = self.start if start is None else int(start)
+        end = self.end if end is None else int(end)
+
+        k = self.level_for(start, end, max_points)
+        level = self.levels[k]
+        i, j = np.searchsorted(level["t"], [start, end], "left")
+
+        # NaN (buracos no OHLC, warm-up de indicador) sai como null em todo o payload
+        candles = {"t": level["t"][i:j].tolist()}
+        for col in OHLC_COLUMNS:
+            candles[col] = _json_floats(level[col][i:j])
+
+        # linhas: parte de um nível mais fino e reduz com LTTB (forma melhor que "último do bucket")
+        fine = self.levels[max(k - 1, 0)]
+        fi, fj = np.searchsorted(fine["t"], [start, end], "left")
+        lines = {}
+        for col in self.line_columns:
+            x, y = fine["t"][fi:fj], fine[col][fi:fj]
+            keep = lttb(x, y, max_points)
+            lines[col] = {"t": x[keep].tolist(), "v": _json_floats(y[keep])}
+
+        bands = {col: _json_floats(level[col][i:j]) for col in self.band_columns}
+
+        return {
+            "level": k,
+            "bucket_ms": self.bucket_ms[k],
+            "start": start,
+            "end": end,
+            "candles": candles,
+            "lines": lines,
+            "bands": bands,
+            "markers": self.markers(start, end, max_markers),
+        }
+
+    def markers(self, start: int, end: int, max_markers: int = 300) -> dict:
+        """
+        Swings dentro da janela, do nível mais fino com no máximo max_markers
+        (nos níveis agregados fica só o swing high mais alto e o low mais baixo por bucket).
+        """
+        for m in self._marker_levels:
+            i, j = np.searchsorted(m["t"], [start, end], "left")
+            if j - i <= max_markers:
+                break
+
+        return {
+            "t": m["t"][i:j].tolist(),
+            "price": _json_floats(m["price"][i:j]),
+            "kind": ["high" if x > 0 else "low" for x in m["kind"][i:j].tolist()],
+            "label": m["label"][i:j].tolist(),
+        }
+
+    def meta(self) -> dict:
+        return {
+            "start": self.start,
+            "end": self.end,
+            "rows": len(self.levels[0]["t"]),
+            "levels": [{"bucket_ms": b, "rows": len(lv["t"])} for b, lv in zip(self.bucket_ms, self.levels)],
+            "lines": self.line_columns,
+            "bands": self.band_columns,
+            "markers": len(self._markers["t"]),
+        }
+
+
+def _json_floats(values: np.ndarray) -> list:
+    """NaN não existe em JSON: vira null."""
+    return [None if v != v else v for v in values.tolist()]
@@ -0,0 +1,137 @@
+"""
+Servidor local de dados para o painel (Fase 4): HTTP + JSON sobre os frames calculados.
+
+    GET /api/series                       -> séries disponíveis e níveis da pirâmide
+    GET /api/chart?series=BTC/USDT 1m&start=<ms>&end=<ms>&points=1500&markers=300
+
+Uso:
+    python -m dashboard.server --store data/cache/ohlcv.sqlite --symbol BTC/USDT --timeframe 1m
+    python -m dashboard.server --synthetic-rows 2600000      # ~5 anos de 1m, offline
+"""
+import argparse
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from dashboard.chart_data import ChartPyramid
+from data.timeframes import timeframe_to_ms
+from indicators.pipeline import IndicatorPipeline
+
+
+def build_pyramid(df: pd.DataFrame, timeframe: str, factor: int = 4) -> ChartPyramid:
+    """Swings + EMAs + estrutura (um pipeline, sem cópias extras) e pirâmide de zoom."""
+    frame = IndicatorPipeline(df).run("swings", "emas", "structure")
+    return ChartPyramid(frame, timeframe_to_ms(timeframe), factor=factor)
+
+
+class ChartDataServer:
+    """Guarda as pirâmides por nome de série e responde as consultas do painel."""
+
+    def __init__(self, series: Optional[Dict[str, ChartPyramid]] = None):
+        self.series: Dict[str, ChartPyramid] = dict(series or {})
+
+    def add(self, name: str, pyramid: ChartPyramid) -> None:
+        self.series[name] = pyramid
+
+    def handle(self, path: str) -> tuple[int, dict]:
+        """(status HTTP, corpo JSON) de uma URL; separado do http.server para uso direto."""
+        url = urlparse(path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/api/series":
+            return 200, {name: p.meta() for name, p in self.series.items()}
+
+        if url.path == "/api/chart":
+            name = params.get("series")
+            if name is None and len(self.series) == 1:
+                name = next(iter(self.series))
+            if name not in self.series:
+                return 404, {"error": f"série desconhecida: {name!r}", "series": list(self.series)}
+
+            try:
+                start = int(params["start"]) if "start" in params else None
+                end = int(params["end"]) if "end" in params else None
+                points = int(params.get("points", 1500))
+                markers = int(params.get("markers", 300))
+            except ValueError:
+                return 400, {"error": "start/end/points/markers precisam ser inteiros"}
+            if not 10 <= points <= 20_000:
+                return 400, {"error": "points fora do intervalo [10, 20000]"}
+
+            t0 = time.perf_counter()
+            body = self.series[name].query(start, end, max_points=points, max_markers=markers)
+            body["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+            return 200, body
+
+        return 404, {"error": f"rota desconhecida: {url.path}"}
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8050) -> None:
+        app = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = app.handle(self.path)
+                payload = json.dumps(body, allow_nan=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        httpd = ThreadingHTTPServer((host, port), Handler)
+        print(f"Servindo {', '.join(self.series)} em http://{host}:{port}/api/series")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor de dados do painel (pirâmide OHLC + LTTB).")
+    parser.add_argument("--store", default="data/cache/ohlcv.sqlite")
+    parser.add_argument("--exchange", default="binance")
+    parser.add_argument("--symbol", default="BTC/USDT")
+    parser.add_argument("--timeframe", default="1m")
+    parser.add_argument("--synthetic-rows", type=int, default=0, help="> 0: usa OHLCV sintético (offline)")
+    parser.add_argument("--factor", type=int, default=4, help="candles por bucket entre níveis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    args = parser.parse_args(argv)
+
+    if args.synthetic_rows > 0:
+        from benchmarks.synthetic import generate_ohlcv
+
+        df = generate_ohlcv(args.synthetic_rows, timeframe=args.timeframe)
+    else:
+        from data.market_data import MarketData
+        from data.store import OHLCVStore
+
+        store = OHLCVStore(args.store)
+        rows = store.load(args.exchange, args.symbol, args.timeframe)
+        if not rows:
+            parser.error(f"sem candles de {args.symbol} {args.timeframe} em {args.store}")
+        df = MarketData(exchange_name=args.exchange, store=store, offline=True)._clean_ohlcv(
+            MarketData._to_frame(rows), drop_last=False
+        )
+
+    t0 = time.perf_counter()
+    pyramid = build_pyramid(df, args.timeframe, factor=args.factor)
+    print(f"Pirâmide: {len(df):,} candles, {len(pyramid.levels)} níveis em {time.perf_counter() - t0:.1f}s")
+
+    ChartDataServer({f"{args.symbol} {args.timeframe}": pyramid}).serve(args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from data.market_data import MarketData
+from data.timeframes import timeframe_to_ms
+
+
+@dataclass
+class LoadJob:
+    symbol: str
+    timeframe: str
+    since: int  # ms
+    until: Optional[int] = None  # ms (exclusive); None = até o presente
+
+
+class RateLimiter:
+    """
+    Espaça as requisições (compartilhado entre threads): no máximo 1 chamada a cada `interval_ms`.
+    """
+
+    def __init__(self, interval_ms: float):
+        self.interval = interval_ms / 1000.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class BulkLoader:
+    """
+    Carga de histórico longo para vários símbolos/timeframes.
+
+    - pagina com `since` até `until` (ou o presente)
+    - jobs rodam em paralelo num pool de threads (max_workers)
+    - todas as threads respeitam o mesmo rate limit da exchange
+    - cada página passa pela limpeza e vai direto para o store (não acumula tudo em memória)
+    - retomável: continua do progresso salvo em progress_path (ou do 1º candle que falta no store)
+    """
+
+    def __init__(
+            self,
+            market: MarketData,
+            max_workers: int = 4,
+            page_limit: int = 1000,
+            rate_limit_ms: Optional[float] = None,
+            max_retries: int = 5,
+            progress_path: Optional[str] = None,
+            backoff_ms: float = 500.0
+    ):
+        if market.store is None or market.exchange is None:
+            raise ValueError("BulkLoader precisa de MarketData com store e exchange (modo online).")
+
+        self.market = market
+        self.max_workers = max_workers
+        self.page_limit = page_limit
+        self.max_retries = max_retries
+        self.progress_path = progress_path
+        # espera mínima depois de erro de rede/rate limit (dobra a cada tentativa)
+        self.backoff = backoff_ms / 1000.0
+
+        if rate_limit_ms is None:
+            rate_limit_ms = getattr(market.exchange, "rateLimit", 100)
+        self.limiter = RateLimiter(rate_limit_ms)
+
+        self._progress_lock = threading.Lock()
+        self._progress = self._read_progress()
+
+    def load(
+            self,
+            symbols: list[str],
+            timeframes: list[str],
+            since: int,
+            until: Optional[int] = None
+    ) -> dict:
+        """
+        Baixa [since, until) para todas as combinações símbolo x timeframe.
+        Retorna {(symbol, timeframe): candles gravados nesta chamada}.
+        """
+        jobs = [LoadJob(s, tf, since, until) for s in symbols for tf in timeframes]
+        return self.run(jobs)
+
+    def run(self, jobs: list[LoadJob]) -> dict:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {(job.symbol, job.timeframe): pool.submit(self._run_job, job) for job in jobs}
+            return {key: future.result() for key, future in futures.items()}
+
+    def _run_job(self, job: LoadJob) -> int:
+        store = self.market.store
+        exchange_name = self.market.exchange_name
+        tf_ms = timeframe_to_ms(job.timeframe)
+
+        since = self._resume_from(job, tf_ms)
+        last_saved = since - 1 if since > job.since else None
+
+        written = 0
+        while job.until is None or since < job.until:
+            page = self._fetch_page(job.symbol, job.timeframe, since)
+            if not page:
+                break  # nada depois de `since`: chegou no presente
+
+            df = self.market._clean_ohlcv(self.market._to_frame(page), drop_last=False)
+
+            # só candles fechados e dentro do intervalo pedido
+            ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+            keep = ts + tf_ms <= self._now_ms()
+            if job.until is not None:
+                keep &= ts < job.until
+            df = df[keep]
+
+            written += store.upsert(exchange_name, job.symbol, job.timeframe, df)
+            if len(df):
+                last_saved = int(ts[keep][-1])
+                self._save_progress(job, last_saved, done=False)
+
+            # só o candle em formação (ou nada novo) na página: não há mais o que buscar
+            if not keep.any():
+                break
+            next_since = int(page[-1][0]) + 1
+            if next_since <= since:
+                break  # cursor não avançou
+            since = next_since
+
+        self._save_progress(job, last_saved, done=True)
+        return written
+
+    def _resume_from(self, job: LoadJob, tf_ms: int) -> int:
+        """
+        Onde o job recomeça:
+        - progresso salvo de uma carga que começou em `since` ou antes -> depois do último
+          candle percorrido (buracos reais da exchange já ficaram para trás)
+        - senão, primeiro candle que falta no store a partir de `since` (um store que só tem
+          os candles recentes do get_ohlcv não faz pular o histórico antigo)
+        """
+        with self._progress_lock:
+            entry = self._progress.get(self._progress_key(job))
+
+        if entry and entry.get("last_ts") is not None and entry.get("since", job.since) <= job.since:
+            if entry["last_ts"] >= job.since:
+                return int(entry["last_ts"]) + 1
+
+        return self.market.store.first_missing(
+            self.market.exchange_name, job.symbol, job.timeframe, job.since, tf_ms
+        )
+
+    def _fetch_page(self, symbol: str, timeframe: str, since: int) -> list:
+        import ccxt
+
+        # RateLimitExceeded/DDoSProtection/ExchangeNotAvailable/RequestTimeout já são NetworkError
+        # no ccxt; ficam explícitos (junto com timeouts do socket) para exchanges que não herdam
+        retry_errors = (
+            ccxt.NetworkError,
+            ccxt.RateLimitExceeded,
+            ccxt.ExchangeNotAvailable,
+            ccxt.RequestTimeout,
+            TimeoutError,
+        )
+
+        delay = self.limiter.interval
+        for attempt in range(self.max_retries + 1):
+            self.limiter.wait()
+            try:
+                return self.market.exchange.fetch_ohlcv(
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    since=since,
+                    limit=self.page_limit
+                )
+            except retry_errors:
+                # espera com backoff e tenta de novo
+                if attempt == self.max_retries:
+                    raise
+                delay = max(delay * 2, self.backoff)
+                time.sleep(delay)
+        return []
+
+    def _now_ms(self) -> int:
+        return self.market._now_ms()
+
+    def _read_progress(self) -> dict:
+        if self.progress_path is None or not os.path.exists(self.progress_path):
+            return {}
+        with open(self.progress_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_progress(self, job: LoadJob, last_ts: Optional[int], done: bool) -> None:
+        if self.progress_path is None:
+            return
+
+        with self._progress_lock:
+            self._progress[self._progress_key(job)] = {"since": job.since, "last_ts": last_ts, "done": done}
+
+            directory = os.path.dirname(self.progress_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = self.progress_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._progress, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.progress_path)
+
+    @staticmethod
+    def _progress_key(job: LoadJob) -> str:
+        return f"{job.symbol}|{job.timeframe}"
+
+    def progress(self) -> dict:
+        """Status por job: {"SYMBOL|TF": {"since": ms, "last_ts": ms, "done": bool}}."""
+        with self._progress_lock:
+            return dict(self._progress)
@@ -0,0 +1,148 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators.market_structure import STRUCTURE_HIGH_LABELS, STRUCTURE_LOW_LABELS, STRUCTURE_LABELS
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+
+# bits da coluna swing_flags
+SWING_HIGH_BIT = 1
+SWING_LOW_BIT = 2
+
+_FORMAT_VERSION = 1
+
+
+class CompactOHLCV:
+    """
+    Layout compacto para histórico longo (ex.: anos de 1m), uma coluna por array:
+
+    - timestamp: int64 (epoch ms, abertura do candle)
+    - open/high/low/close: float32 (opcional) ou float64
+    - volume: float64
+    - swing_flags: uint8 (bit 1 = swing_high, bit 2 = swing_low)
+    - structure_high / structure_low: int8 (índice em SH/HH/LH e SL/HL/LL, -1 = vazio)
+
+    Gravado como um .npy por coluna; open() usa memory-map, então abrir anos de
+    candles é quase instantâneo e só as páginas tocadas são lidas do disco.
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+
+    # --- construção / disco ---
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, float32: bool = True) -> "CompactOHLCV":
+        """Converte um DataFrame OHLCV (índice datetime, + swings/structure opcionais)."""
+        price_dtype = "float32" if float32 else "float64"
+
+        columns = {"timestamp": df.index.to_numpy(dtype="datetime64[ms]").astype("int64")}
+        for col in PRICE_COLUMNS:
+            columns[col] = df[col].to_numpy(dtype=price_dtype)
+        columns["volume"] = df["volume"].to_numpy(dtype="float64")
+
+        if "swing_high" in df.columns and "swing_low" in df.columns:
+            flags = df["swing_high"].to_numpy(dtype=bool).astype("uint8") * SWING_HIGH_BIT
+            flags |= df["swing_low"].to_numpy(dtype=bool).astype("uint8") * SWING_LOW_BIT
+            columns["swing_flags"] = flags
+
+        for col, labels in (("structure_high", STRUCTURE_HIGH_LABELS), ("structure_low", STRUCTURE_LOW_LABELS)):
+            if col in df.columns:
+                cat = pd.Categorical(df[col], categories=labels)
+                columns[col] = np.asarray(cat.codes, dtype="int8")
+
+        return cls(columns)
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for name, values in self.columns.items():
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values))
+
+        meta = {
+            "version": _FORMAT_VERSION,
+            "rows": len(self),
+            "columns": {name: str(values.dtype) for name, values in self.columns.items()},
+        }
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def open(cls, directory: str, mmap: bool = True) -> "CompactOHLCV":
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"Versão de layout não suportada em {directory}: {meta.get('version')}")
+
+        mode = "r" if mmap else None
+        columns = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in meta["columns"]}
+        return cls(columns)
+
+    # --- acesso ---
+
+    def slice(self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> "CompactOHLCV":
+        """
+        Janela [start, end) por tempo via busca binária no timestamp.
+        Retorna views (não lê o resto do arquivo).
+        """
+        ts = self.columns["timestamp"]
+        i = 0 if start is None else int(np.searchsorted(ts, _to_ms(start), side="left"))
+        j = len(ts) if end is None else int(np.searchsorted(ts, _to_ms(end), side="left"))
+        return CompactOHLCV({name: values[i:j] for name, values in self.columns.items()})
+
+    def tail(self, n: int) -> "CompactOHLCV":
+        """Últimos n candles (views, como em slice())."""
+        i = max(0, len(self) - int(n))
+        return CompactOHLCV({name: values[i:] for name, values in self.columns.items()})
+
+    @property
+    def swing_high(self) -> np.ndarray:
+        return (self.columns["swing_flags"] & SWING_HIGH_BIT).astype(bool)
+
+    @property
+    def swing_low(self) -> np.ndarray:
+        return (self.columns["swing_flags"] & SWING_LOW_BIT).astype(bool)
+
+    def to_frame(self, float64: bool = True) -> pd.DataFrame:
+        """
+        DataFrame no formato do resto do projeto (índice datetime, swings bool,
+        structure categórico). Só materializa as linhas desta janela.
+        """
+        cols = self.columns
+        price_dtype = "float64" if float64 else None
+
+        data = {col: np.asarray(cols[col], dtype=price_dtype) for col in PRICE_COLUMNS}
+        data["volume"] = np.asarray(cols["volume"])
+
+        if "swing_flags" in cols:
+            data["swing_high"] = self.swing_high
+            data["swing_low"] = self.swing_low
+
+        if "structure_high" in cols and "structure_low" in cols:
+            high_codes = np.asarray(cols["structure_high"])
+            low_codes = np.asarray(cols["structure_low"])
+            data["structure_high"] = pd.Categorical.from_codes(high_codes, categories=STRUCTURE_HIGH_LABELS)
+            data["structure_low"] = pd.Categorical.from_codes(low_codes, categories=STRUCTURE_LOW_LABELS)
+            combined = np.where(low_codes >= 0, low_codes + 3, high_codes).astype("int8")
+            data["structure"] = pd.Categorical.from_codes(combined, categories=STRUCTURE_LABELS)
+
+        df = pd.DataFrame(data, index=pd.to_datetime(np.asarray(cols["timestamp"]), unit="ms"))
+        df.index.name = "timestamp"
+        return df
+
+
+def compact_path(root: str, exchange: str, symbol: str, timeframe: str) -> str:
+    """Diretório do layout de um par/timeframe: root/<exchange>/<BTC-USDT>/<timeframe>."""
+    return os.path.join(root, exchange, symbol.replace("/", "-"), timeframe)
+
+
+def _to_ms(when) -> int:
+    if isinstance(when, (int, np.integer)):
+        return int(when)
+    return int(pd.Timestamp(when).value // 1_000_000)
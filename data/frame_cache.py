@@ -0,0 +1,145 @@
+import hashlib
+import os
+import time
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils import instrumentation
+
+# linhas finais que entram no checksum rápido (candles novos/corrigidos ficam no fim)
+TAIL_ROWS = 64
+
+
+def frame_fingerprint(df: pd.DataFrame, columns: Optional[Iterable[str]] = None, full: bool = False) -> str:
+    """
+    Impressão digital barata de um frame de candles:
+    nº de linhas + primeiro/último timestamp + colunas + checksum das últimas TAIL_ROWS linhas.
+
+    Cobre o caso normal (histórico que só cresce no fim / último candle corrigido).
+    full=True faz o hash de todas as linhas (para históricos que podem mudar no meio).
+    columns: colunas que entram no hash (padrão: todas; () = só o índice).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+    columns = list(df.columns if columns is None else columns)
+
+    h.update(repr((len(df), int(ts[0]) if len(ts) else None, int(ts[-1]) if len(ts) else None, columns)).encode())
+
+    rows = slice(None) if full else slice(-TAIL_ROWS, None)
+    h.update(np.ascontiguousarray(ts[rows]).tobytes())
+    for col in columns:
+        values = df[col].to_numpy()[rows]
+        if values.dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype):
+            h.update(repr(list(values)).encode())
+        else:
+            h.update(np.ascontiguousarray(values).tobytes())
+    return h.hexdigest()
+
+
+def cache_key(*parts) -> str:
+    """Chave de cache a partir de fingerprints e parâmetros (qualquer coisa com repr estável)."""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class FrameCache:
+    """
+    Cache em disco de DataFrames derivados (ex.: contexto 1D/4H alinhado no 15m),
+    chaveado por cache_key(fingerprints dos candles, parâmetros).
+
+    - um arquivo pickle por chave em `root` (escrita atômica: tmp + os.replace)
+    - LRU pelo mtime: leitura "toca" o arquivo; ao passar de max_bytes os mais
+      antigos são apagados
+    - chave diferente = dado diferente; não há invalidação manual
+    """
+
+    def __init__(self, root: str = "data/cache/frames", max_bytes: int = 512 * 1024 * 1024):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes precisa ser > 0.")
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """(mtime, tamanho, caminho) de cada entrada, da menos para a mais recente."""
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return sorted(entries)
+
+    # --- API ---
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Frame guardado ou None. Entrada corrompida/truncada conta como miss e é apagada."""
+        path = self._path(key)
+        try:
+            df = pd.read_pickle(path)
+        except FileNotFoundError:
+            instrumentation.count("frame_cache_misses")
+            return None
+        except Exception:
+            # pickle ilegível (UnpicklingError, EOFError, classe ausente, ...): descarta
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            instrumentation.count("frame_cache_misses")
+            return None
+        os.utime(path)  # mais recente no LRU
+        instrumentation.count("frame_cache_hits")
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        df.to_pickle(tmp)
+        os.replace(tmp, path)
+        instrumentation.count("bytes_written", os.path.getsize(path))
+        self.evict()
+
+    def get_or_compute(self, key: str, fn: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        df = self.get(key)
+        if df is None:
+            df = fn()
+            self.put(key, df)
+        return df
+
+    def evict(self) -> int:
+        """Apaga as entradas menos usadas até caber em max_bytes. Retorna quantas apagou."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            os.remove(path)
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "oldest_age_s": time.time() - entries[0][0] if entries else None,
+        }
@@ -1,14 +1,60 @@
-import ccxt
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
 import pandas as pd
 
+from data.store import OHLCV_COLUMNS, OHLCVStore
+from data.timeframes import timeframe_offset_ms, timeframe_to_ms
+from utils import instrumentation
+
+# fronteiras de bucket guardadas por MarketData (LRU)
+BUCKET_CACHE_SIZE = 32
+
 
 class MarketData:
-    def __init__(self, exchange_name: str = "binance"):
-        if exchange_name == "binance":
-            self.exchange = ccxt.binance()
-        else:
+    def __init__(
+        self,
+        exchange_name: str = "binance",
+        store: Optional[OHLCVStore] = None,
+        offline: bool = False,
+        exchange=None
+    ):
+        """
+        store:    armazenamento local de candles (carrega o que já existe e só baixa o que falta)
+        offline:  nunca acessa a rede (exige store)
+        exchange: objeto compatível com ccxt (ex.: exchange fake em testes)
+        """
+        if offline and store is None:
+            raise ValueError("Modo offline precisa de um store local.")
+
+        self.exchange_name = exchange_name
+        self.store = store
+        self.offline = offline
+
+        # cache LRU de fronteiras de bucket por (série base, timeframe alvo)
+        self._bucket_cache: OrderedDict = OrderedDict()
+
+        if exchange is None and not offline and exchange_name != "binance":
             raise ValueError("Exchange não suportada")
 
+        # cliente ccxt criado só no primeiro acesso à rede (importar ccxt é caro)
+        self._exchange = exchange
+
+    @property
+    def exchange(self):
+        if self._exchange is None and not self.offline:
+            import ccxt
+
+            self._exchange = ccxt.binance()
+        return self._exchange
+
+    @exchange.setter
+    def exchange(self, value) -> None:
+        self._exchange = value
+
     def get_ohlcv(
         self,
         symbol: str = "BTC/USDT",
@@ -17,19 +63,281 @@ class MarketData:
     ) -> pd.DataFrame:
         """
         Coleta dados OHLCV da exchange e retorna DataFrame limpo
+
+        Com store: baixa só candles mais novos que o último guardado,
+        grava os candles fechados e devolve os últimos `limit` do store
+        (se o store tiver menos que `limit`, completa para trás).
         """
+        if self.store is not None:
+            return self._get_ohlcv_stored(symbol, timeframe, limit)
 
         # Coleta dos dados brutos
-        ohlcv = self.exchange.fetch_ohlcv(
+        ohlcv = self._fetch_ohlcv(
             symbol=symbol,
             timeframe=timeframe,
             limit=limit
         )
 
+        return self._clean_ohlcv(self._to_frame(ohlcv))
+
+    def _get_ohlcv_stored(self, symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
+        if not self.offline:
+            last_ts = self.store.last_timestamp(self.exchange_name, symbol, timeframe)
+            if last_ts is None:
+                ohlcv = self._fetch_ohlcv(symbol=symbol, timeframe=timeframe, limit=limit)
+            else:
+                ohlcv = self._fetch_since(symbol, timeframe, last_ts + 1)
+
+            # o último candle retornado ainda está em formação -> não vai pro store
+            written = self.store.upsert(self.exchange_name, symbol, timeframe, ohlcv[:-1])
+            instrumentation.count("store_rows_written", written)
+
+        rows = self.store.load(self.exchange_name, symbol, timeframe, limit=limit)
+
+        # pedido maior que o store (ex.: primeira carga com limit menor): completa para trás
+        if not self.offline and rows and len(rows) < limit:
+            first_ts = int(rows[0][0])
+            since = first_ts - (limit - len(rows)) * timeframe_to_ms(timeframe)
+            self.get_window(symbol, timeframe, since, first_ts)
+            rows = self.store.load(self.exchange_name, symbol, timeframe, limit=limit)
+
+        # candles do store já são fechados: não remove o último
+        return self._clean_ohlcv(self._to_frame(rows), drop_last=False)
+
+    def _fetch_ohlcv(self, **kwargs) -> list:
+        """Chamada única à exchange (medida como estágio "fetch")."""
+        with instrumentation.stage("fetch") as st:
+            ohlcv = self.exchange.fetch_ohlcv(**kwargs)
+            st.rows = len(ohlcv)
+        instrumentation.count("exchange_requests")
+        return ohlcv
+
+    def _fetch_since(self, symbol: str, timeframe: str, since: int) -> list:
+        """
+        Busca todos os candles a partir de `since` (ms), paginando até chegar no presente.
+        """
+        candles: list = []
+        while True:
+            page = self._fetch_ohlcv(symbol=symbol, timeframe=timeframe, since=since)
+            if not page:
+                break
+
+            candles.extend(page)
+            next_since = int(page[-1][0]) + 1
+            if len(page) < 2 or next_since <= since:
+                break
+            since = next_since
+
+        return candles
+
+    def get_window(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: int,
+        until: int,
+        page_limit: int = 1000,
+        refresh: bool = False
+    ) -> pd.DataFrame:
+        """
+        Candles fechados em [since, until) (ms). Usa o store quando ele já tem a janela
+        inteira; senão (e se não estiver offline) busca só essa janela na exchange
+        e grava no store. refresh=True busca de novo mesmo com a janela completa
+        (ex.: candles inválidos no store) e sobrescreve o store.
+        """
+        tf_ms = timeframe_to_ms(timeframe)
+        expected = max(0, -(-(until - since) // tf_ms))
+
+        rows: list = []
+        if self.store is not None:
+            rows = self.store.load(self.exchange_name, symbol, timeframe, since=since, until=until)
+
+        if (refresh or len(rows) < expected) and not self.offline and self.exchange is not None:
+            fetched: list = []
+            cursor = since
+            # candle em formação (abertura + timeframe > agora) não entra no store
+            closed_until = min(until, self._now_ms() - tf_ms + 1)
+            while cursor < closed_until:
+                page = self._fetch_ohlcv(
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    since=cursor,
+                    limit=min(page_limit, max(1, -(-(until - cursor) // tf_ms)))
+                )
+                page = [c for c in page if since <= int(c[0]) < closed_until]
+                if not page:
+                    break
+                fetched.extend(page)
+                cursor = int(page[-1][0]) + tf_ms
+
+            if self.store is not None and fetched:
+                written = self.store.upsert(self.exchange_name, symbol, timeframe, fetched)
+                instrumentation.count("store_rows_written", written)
+            if len(fetched) > len(rows) or (refresh and fetched):
+                rows = fetched
+
+        return self._clean_ohlcv(self._to_frame(rows), drop_last=False)
+
+    def _now_ms(self) -> int:
+        """Relógio da exchange (ccxt: milliseconds()) ou o relógio local."""
+        exchange = self.exchange
+        if hasattr(exchange, "milliseconds"):
+            return int(exchange.milliseconds())
+        return int(time.time() * 1000)
+
+    def export_compact(self, symbol: str, timeframe: str, root: str, float32: bool = False) -> str:
+        """
+        Grava todo o histórico do store de symbol/timeframe no layout memory-mapped
+        (data/columnar.py) em compact_path(root, ...). Retorna o diretório.
+        float32=True reduz o OHLC pela metade (perde precisão; bom para gráficos).
+        """
+        from data.columnar import CompactOHLCV, compact_path
+
+        if self.store is None:
+            raise ValueError("export_compact precisa de um store local.")
+        rows = self.store.load(self.exchange_name, symbol, timeframe)
+        df = self._clean_ohlcv(self._to_frame(rows), drop_last=False)
+
+        directory = compact_path(root, self.exchange_name, symbol, timeframe)
+        CompactOHLCV.from_frame(df, float32=float32).save(directory)
+        return directory
+
+    def get_compact(
+        self,
+        symbol: str,
+        timeframe: str,
+        root: str,
+        limit: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Candles do layout memory-mapped gravado por export_compact (sem store nem rede):
+        abrir é instantâneo e só os últimos `limit` candles (todos com None) são lidos.
+        """
+        from data.columnar import CompactOHLCV, compact_path
+
+        data = CompactOHLCV.open(compact_path(root, self.exchange_name, symbol, timeframe))
+        if limit is not None:
+            data = data.tail(limit)
+        return data.to_frame()
+
+    def get_validated(
+        self,
+        symbol: str = "BTC/USDT",
+        timeframe: str = "15m",
+        limit: int = 1000,
+        repair: str = "mark"
+    ):
+        """
+        get_ohlcv + validação (data/validation.py). Retorna (frame, ValidationReport).
+        repair="refetch" busca gaps/candles inválidos de novo via get_window (store primeiro).
+        """
+        from data.validation import repair_ohlcv
+
+        df = self.get_ohlcv(symbol=symbol, timeframe=timeframe, limit=limit)
+        return repair_ohlcv(
+            df,
+            timeframe,
+            mode=repair,
+            refetch=lambda since, until: self.get_window(symbol, timeframe, since, until, refresh=True),
+        )
+
+    def get_resampled(
+        self,
+        symbol: str = "BTC/USDT",
+        timeframe: str = "4h",
+        base_timeframe: str = "15m",
+        limit: int = 1000
+    ) -> pd.DataFrame:
+        """
+        Monta um timeframe maior a partir dos candles base (uma única coleta),
+        garantindo que 1D/4H/15m terminem no mesmo instante.
+        limit = quantidade de candles BASE usados.
+        """
+        base = self.get_ohlcv(symbol=symbol, timeframe=base_timeframe, limit=limit)
+        return self.resample(base, timeframe, base_timeframe)
+
+    @instrumentation.timed("resample")
+    def resample(self, df: pd.DataFrame, timeframe: str, base_timeframe: str) -> pd.DataFrame:
+        """
+        Agrega candles base (ex.: 1m/15m) em `timeframe` (ex.: 4h, 1d, 1w):
+        open=primeiro, high=máximo, low=mínimo, close=último, volume=soma.
+
+        Buckets alinhados em UTC (semana começa na segunda, como na Binance).
+        Buckets incompletos nas pontas são descartados: o último ainda está
+        "em formação" (mesma ideia do _clean_ohlcv) e o primeiro começaria no meio.
+        """
+        base_ms = timeframe_to_ms(base_timeframe)
+        target_ms = timeframe_to_ms(timeframe)
+        if target_ms % base_ms != 0:
+            raise ValueError(f"{timeframe} não é múltiplo de {base_timeframe}.")
+
+        ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+        starts, bucket_ts = self._bucket_bounds(ts, base_ms, target_ms, timeframe)
+
+        o = df["open"].to_numpy(dtype="float64")
+        h = df["high"].to_numpy(dtype="float64")
+        l = df["low"].to_numpy(dtype="float64")
+        c = df["close"].to_numpy(dtype="float64")
+        v = df["volume"].to_numpy(dtype="float64")
+
+        if len(starts):
+            ends = np.r_[starts[1:], len(ts)] - 1
+            data = {
+                "open": o[starts],
+                "high": np.maximum.reduceat(h, starts),
+                "low": np.minimum.reduceat(l, starts),
+                "close": c[ends],
+                "volume": np.add.reduceat(v, starts),
+            }
+        else:
+            data = {col: np.empty(0) for col in OHLCV_COLUMNS[1:]}
+
+        out = pd.DataFrame(data, index=pd.to_datetime(bucket_ts, unit="ms"))
+        out.index.name = "timestamp"
+
+        # descarta buckets incompletos (primeiro/último)
+        keep = np.ones(len(out), dtype=bool)
+        if len(out):
+            if ts[0] > bucket_ts[0]:
+                keep[0] = False
+            if ts[-1] + base_ms < bucket_ts[-1] + target_ms:
+                keep[-1] = False
+
+        return out[keep]
+
+    def _bucket_bounds(self, ts: np.ndarray, base_ms: int, target_ms: int, timeframe: str):
+        """
+        Índices de início de cada bucket e o timestamp de abertura do bucket.
+        Resultado fica em cache (mesma série base -> não recalcula); a chave usa o hash
+        de todos os timestamps, então séries com gaps em lugares diferentes não colidem.
+        """
+        digest = hashlib.blake2b(np.ascontiguousarray(ts, dtype="int64").tobytes(), digest_size=16).hexdigest()
+        key = (timeframe, base_ms, target_ms, digest)
+        cached = self._bucket_cache.get(key)
+        if cached is not None:
+            self._bucket_cache.move_to_end(key)
+            return cached
+
+        offset = timeframe_offset_ms(timeframe)
+        bucket = (ts - offset) // target_ms
+
+        if len(ts):
+            starts = np.r_[0, np.flatnonzero(np.diff(bucket)) + 1]
+        else:
+            starts = np.empty(0, dtype="int64")
+        bucket_ts = bucket[starts] * target_ms + offset
+
+        self._bucket_cache[key] = (starts, bucket_ts)
+        if len(self._bucket_cache) > BUCKET_CACHE_SIZE:
+            self._bucket_cache.popitem(last=False)
+        return starts, bucket_ts
+
+    @staticmethod
+    def _to_frame(ohlcv: list) -> pd.DataFrame:
         #  Criação do DataFrame
         df = pd.DataFrame(
             ohlcv,
-            columns=["timestamp", "open", "high", "low", "close", "volume"]
+            columns=OHLCV_COLUMNS
         )
 
         #  Conversão do timestamp para datetime
@@ -38,12 +346,10 @@ class MarketData:
         #  Definição do timestamp como índice
         df.set_index("timestamp", inplace=True)
 
-        #  Limpeza dos dados (Fase 1.5)
-        df = self._clean_ohlcv(df)
-
         return df
 
-    def _clean_ohlcv(self, df: pd.DataFrame) -> pd.DataFrame:
+    @instrumentation.timed("clean")
+    def _clean_ohlcv(self, df: pd.DataFrame, drop_last: bool = True) -> pd.DataFrame:
         """
         Aplica limpeza e padronização dos dados OHLCV
         """
@@ -65,11 +371,7 @@ class MarketData:
         })
 
         # 9️⃣ Remoção do candle em formação
-        df = df.iloc[:-1]
+        if drop_last:
+            df = df.iloc[:-1]
 
         return df
-
-
-
-
-
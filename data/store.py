@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+import pandas as pd
+
+OHLCV_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+class OHLCVStore:
+    """
+    Armazenamento local de candles (SQLite), chaveado por exchange/símbolo/timeframe.
+
+    Guarda apenas candles FECHADOS, com timestamp em epoch ms (abertura do candle).
+    """
+
+    def __init__(self, path: str = "data/cache/ohlcv.sqlite"):
+        self.path = path
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        # uma conexão compartilhada (protegida por lock) para poder ser usada por threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS candles (
+                exchange  TEXT    NOT NULL,
+                symbol    TEXT    NOT NULL,
+                timeframe TEXT    NOT NULL,
+                timestamp INTEGER NOT NULL,
+                open      REAL,
+                high      REAL,
+                low       REAL,
+                close     REAL,
+                volume    REAL,
+                PRIMARY KEY (exchange, symbol, timeframe, timestamp)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def last_timestamp(self, exchange: str, symbol: str, timeframe: str) -> Optional[int]:
+        """Timestamp (ms) do último candle guardado, ou None se não houver nada."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(timestamp) FROM candles WHERE exchange = ? AND symbol = ? AND timeframe = ?",
+                (exchange, symbol, timeframe),
+            ).fetchone()
+        return None if row[0] is None else int(row[0])
+
+    def first_missing(self, exchange: str, symbol: str, timeframe: str, since: int, step_ms: int) -> int:
+        """
+        Primeiro timestamp (ms) >= since que falta no store, supondo candles a cada step_ms.
+        Sem nada guardado a partir de since (ou com buraco logo no início), devolve since.
+        """
+        key = "exchange = ? AND symbol = ? AND timeframe = ?"
+        with self._lock:
+            first = self._conn.execute(
+                f"SELECT MIN(timestamp) FROM candles WHERE {key} AND timestamp >= ?",
+                (exchange, symbol, timeframe, int(since)),
+            ).fetchone()[0]
+            if first is None or first >= since + step_ms:
+                return int(since)
+
+            # candle guardado cujo sucessor não está no store (busca pela chave primária)
+            row = self._conn.execute(
+                f"SELECT MIN(c.timestamp) FROM candles c WHERE {key} AND c.timestamp >= ? "
+                "AND NOT EXISTS (SELECT 1 FROM candles d WHERE d.exchange = c.exchange "
+                "AND d.symbol = c.symbol AND d.timeframe = c.timeframe AND d.timestamp = c.timestamp + ?)",
+                (exchange, symbol, timeframe, int(first), int(step_ms)),
+            ).fetchone()
+        return int(row[0]) + int(step_ms)
+
+    def upsert(self, exchange: str, symbol: str, timeframe: str, candles) -> int:
+        """
+        Grava candles (lista [ts, o, h, l, c, v] ou DataFrame com OHLCV_COLUMNS).
+        Timestamps já existentes são sobrescritos. Retorna quantos candles foram gravados.
+        """
+        if isinstance(candles, pd.DataFrame):
+            frame = candles.reset_index() if "timestamp" not in candles.columns else candles
+            ts = frame["timestamp"]
+            if pd.api.types.is_datetime64_any_dtype(ts):
+                ts = ts.astype("datetime64[ms]").astype("int64")
+            rows = zip(
+                ts.astype("int64").tolist(),
+                *(frame[col].astype("float64").tolist() for col in OHLCV_COLUMNS[1:]),
+            )
+        else:
+            rows = ((int(c[0]), *map(float, c[1:6])) for c in candles)
+
+        rows = [(exchange, symbol, timeframe, *row) for row in rows]
+        if not rows:
+            return 0
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candles "
+                "(exchange, symbol, timeframe, timestamp, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def load(
+            self,
+            exchange: str,
+            symbol: str,
+            timeframe: str,
+            since: Optional[int] = None,
+            until: Optional[int] = None,
+            limit: Optional[int] = None
+    ) -> list:
+        """
+        Lê candles guardados como lista [ts, o, h, l, c, v] em ordem temporal.
+        since/until em ms (inclusive/exclusive). limit = últimos N candles do intervalo.
+        """
+        query = "SELECT timestamp, open, high, low, close, volume FROM candles " \
+                "WHERE exchange = ? AND symbol = ? AND timeframe = ?"
+        params: list = [exchange, symbol, timeframe]
+
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(since))
+        if until is not None:
+            query += " AND timestamp < ?"
+            params.append(int(until))
+
+        if limit is not None:
+            query += " ORDER BY timestamp DESC LIMIT ?"
+            params.append(int(limit))
+        else:
+            query += " ORDER BY timestamp"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        if limit is not None:
+            rows.reverse()
+        return rows
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+# epoch (1970-01-01) foi quinta-feira; semanas da Binance começam na segunda
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+_UNIT_MS = {
+    "s": 1_000,
+    "m": 60_000,
+    "h": 3_600_000,
+    "d": 86_400_000,
+    "w": 604_800_000,
+}
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """
+    Converte timeframe no formato ccxt ("1m", "15m", "4h", "1d", "1w") para milissegundos.
+    """
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if unit not in _UNIT_MS or not amount.isdigit() or int(amount) <= 0:
+        raise ValueError(f"Timeframe não suportado: {timeframe!r}")
+    return int(amount) * _UNIT_MS[unit]
+
+
+def timeframe_offset_ms(timeframe: str) -> int:
+    """
+    Deslocamento (ms) da grade de candles em relação ao epoch: abertura de um candle
+    satisfaz (ts - offset) % timeframe_to_ms(timeframe) == 0. Só semanas têm offset.
+    """
+    return WEEK_OFFSET_MS if timeframe.endswith("w") else 0
+
+
+def epoch_ms(index: pd.Index) -> np.ndarray:
+    """Índice datetime -> timestamps em epoch ms (int64)."""
+    return index.to_numpy(dtype="datetime64[ms]").astype("int64")
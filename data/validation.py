@@ -0,0 +1,280 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from data.timeframes import timeframe_offset_ms, timeframe_to_ms
+from utils import instrumentation
+
+REPAIR_MODES = ("none", "mark", "ffill", "refetch")
+RULES = ("unsorted", "misaligned", "bad_price", "high_low", "ohlc_range", "zero_volume", "spike")
+# regras que tornam o candle inválido; zero_volume e spike só são reportados por padrão
+# (mercado parado e crash de verdade existem; passe rules=RULES para tratá-los como inválidos)
+INVALID_RULES = ("unsorted", "misaligned", "bad_price", "high_low", "ohlc_range")
+
+# amostra máxima usada na mediana do range (escala "normal" do ativo) do filtro de spikes
+_SPIKE_SAMPLE = 1_000_000
+# candles por bloco nas regras de preço
+_BLOCK = 1 << 16
+
+
+@dataclass
+class ValidationReport:
+    """
+    Resultado de validate_ohlcv:
+    - masks: regra -> array booleano por candle (True = viola a regra)
+    - gaps:  array (k, 2) int64 com intervalos [início, fim) em ms de candles AUSENTES
+    """
+
+    timeframe: str
+    rows: int
+    masks: Dict[str, np.ndarray] = field(repr=False)
+    gaps: np.ndarray = field(repr=False)
+
+    def violations(self, rules: tuple = INVALID_RULES) -> np.ndarray:
+        """Candles que violam alguma das `rules`."""
+        out = np.zeros(self.rows, dtype=bool)
+        for rule in rules:
+            out |= self.masks[rule]
+        return out
+
+    @property
+    def invalid(self) -> np.ndarray:
+        return self.violations()
+
+    @property
+    def missing(self) -> int:
+        """Total de candles ausentes nos gaps."""
+        if not len(self.gaps):
+            return 0
+        return int(((self.gaps[:, 1] - self.gaps[:, 0]) // timeframe_to_ms(self.timeframe)).sum())
+
+    @property
+    def ok(self) -> bool:
+        return not len(self.gaps) and not self.invalid.any()
+
+    def counts(self) -> dict:
+        return {rule: int(mask.sum()) for rule, mask in self.masks.items()}
+
+    def gap_frame(self) -> pd.DataFrame:
+        """Gaps como tabela (start, end, candles) para inspeção."""
+        tf_ms = timeframe_to_ms(self.timeframe)
+        return pd.DataFrame({
+            "start": pd.to_datetime(self.gaps[:, 0], unit="ms"),
+            "end": pd.to_datetime(self.gaps[:, 1], unit="ms"),
+            "candles": (self.gaps[:, 1] - self.gaps[:, 0]) // tf_ms,
+        })
+
+    def summary(self) -> dict:
+        return {
+            "timeframe": self.timeframe,
+            "rows": self.rows,
+            "invalid": int(self.invalid.sum()),
+            **self.counts(),
+            "gaps": len(self.gaps),
+            "missing": self.missing,
+        }
+
+
+@instrumentation.timed("validate")
+def validate_ohlcv(df: pd.DataFrame, timeframe: str, spike_factor: float = 30.0) -> ValidationReport:
+    """
+    Valida um frame OHLCV (saída do _clean_ohlcv) de forma vetorizada, sem alterar nada.
+
+    Regras (uma máscara por regra):
+    - unsorted:    timestamp <= anterior (fora de ordem / duplicado)
+    - misaligned:  timestamp fora da grade do timeframe (semanas começam na segunda)
+    - bad_price:   OHLC não finito ou <= 0, volume NaN ou negativo
+    - high_low:    high < low
+    - ohlc_range:  open/close fora de [low, high]
+    - zero_volume: volume == 0
+    - spike:       range (high - low) ou salto close -> close maior que spike_factor x a
+                   mediana do range relativo da série (candle "impossível" que vira swing falso)
+
+    Gaps: intervalos de candles ausentes entre timestamps consecutivos.
+    """
+    tf_ms = timeframe_to_ms(timeframe)
+    n = len(df)
+
+    ts = df.index.to_numpy(dtype="datetime64[ms]").view("int64")
+    o = df["open"].to_numpy(dtype="float64")
+    h = df["high"].to_numpy(dtype="float64")
+    l = df["low"].to_numpy(dtype="float64")
+    c = df["close"].to_numpy(dtype="float64")
+    v = df["volume"].to_numpy(dtype="float64")
+
+    # --- tempo: só os passos != timeframe (poucos) são examinados em detalhe ---
+    step = np.diff(ts)
+    irregular = np.flatnonzero(step != tf_ms)
+
+    unsorted = np.zeros(n, dtype=bool)
+    unsorted[irregular[step[irregular] <= 0] + 1] = True
+
+    # alinhamento se propaga em passos regulares: basta checar o 1º candle de cada trecho
+    anchors = np.r_[0, irregular + 1] if n else np.empty(0, dtype="int64")
+    bad_anchor = (ts[anchors] - timeframe_offset_ms(timeframe)) % tf_ms != 0
+    if bad_anchor.any():
+        misaligned = np.repeat(bad_anchor, np.diff(np.r_[anchors, n]))
+    else:
+        misaligned = np.zeros(n, dtype=bool)
+
+    gap_at = irregular[step[irregular] > tf_ms]
+    gaps = np.column_stack([ts[gap_at] + tf_ms, ts[gap_at + 1]]) if len(gap_at) else np.empty((0, 2), "int64")
+
+    # escala "normal" = mediana do range relativo (high - low) / close numa amostra da série
+    stride = max(1, n // _SPIKE_SAMPLE)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sample = (h[::stride] - l[::stride]) / c[::stride]
+    sample = sample[np.isfinite(sample) & (sample > 0)]
+    threshold = spike_factor * float(np.median(sample)) if len(sample) else np.inf
+
+    price_masks = {name: np.empty(n, dtype=bool) for name in ("bad_price", "high_low", "ohlc_range", "spike")}
+    for start in range(0, n, _BLOCK):
+        stop = min(start + _BLOCK, n)
+        _price_block(o, h, l, c, v, threshold, start, stop, price_masks)
+
+    masks = {
+        "unsorted": unsorted,
+        "misaligned": misaligned,
+        **price_masks,
+        "zero_volume": v == 0,
+    }
+
+    return ValidationReport(timeframe=timeframe, rows=n, masks=masks, gaps=gaps.astype("int64"))
+
+
+def _price_block(o, h, l, c, v, threshold: float, start: int, stop: int, out: dict) -> None:
+    """
+    Regras de preço em out[regra][start:stop]. Em blocos os temporários ficam no cache
+    da CPU (10M candles sem alocar arrays float do tamanho da série).
+    """
+    prev_close = c[start - 1] if start else np.nan
+    o, h, l, c, v = (x[start:stop] for x in (o, h, l, c, v))
+
+    # comparações com NaN dão False, então NaN cai em bad_price; +inf em open/close/low
+    # já viola high_low/ohlc_range, basta checar o high
+    good = v >= 0
+    for x in (o, h, l, c):
+        good &= x > 0
+    good &= h != np.inf
+    bad_price = ~good
+
+    ohlc_range = (o > h) | (c > h) | (o < l) | (c < l)
+    ohlc_range &= good
+
+    # spike: range do candle ou salto close -> close acima de threshold x preço
+    prev = np.r_[prev_close, c[:-1]]
+    with np.errstate(invalid="ignore", over="ignore"):
+        spike = (h - l) > c * threshold
+        spike |= np.abs(c - prev) > prev * threshold
+    spike &= good
+
+    out["bad_price"][start:stop] = bad_price
+    out["high_low"][start:stop] = h < l
+    out["ohlc_range"][start:stop] = ohlc_range
+    out["spike"][start:stop] = spike
+
+
+def repair_ohlcv(
+        df: pd.DataFrame,
+        timeframe: str,
+        mode: str = "mark",
+        report: Optional[ValidationReport] = None,
+        refetch: Optional[Callable[[int, int], pd.DataFrame]] = None,
+        rules: tuple = INVALID_RULES
+) -> tuple[pd.DataFrame, ValidationReport]:
+    """
+    Aplica o reparo escolhido e devolve (frame, relatório do frame devolvido).
+
+    - "none":    frame como veio
+    - "mark":    coluna `invalid` (candle viola alguma das `rules`)
+    - "ffill":   remove candles inválidos/fora da grade e completa a grade do timeframe
+                 (gaps inclusive) com candles "flat" no close anterior e volume 0;
+                 coluna `filled` marca o que foi criado
+    - "refetch": chama refetch(since_ms, until_ms) para cada gap e para cada trecho de
+                 candles inválidos (ex.: MarketData.get_window) e junta o resultado
+    """
+    if mode not in REPAIR_MODES:
+        raise ValueError(f"Reparo inválido: {mode!r} (use {', '.join(REPAIR_MODES)}).")
+    unknown = set(rules) - set(RULES)
+    if unknown:
+        raise ValueError(f"Regras desconhecidas: {sorted(unknown)}")
+
+    report = report or validate_ohlcv(df, timeframe)
+    bad = report.violations(rules)
+
+    if mode == "none":
+        return df, report
+
+    if mode == "mark":
+        out = df.copy()
+        out["invalid"] = bad
+        return out, report
+
+    if mode == "ffill":
+        out = _ffill_grid(df[~(bad | report.masks["misaligned"] | report.masks["unsorted"])], timeframe)
+        return out, validate_ohlcv(out, timeframe)
+
+    if refetch is None:
+        raise ValueError("mode='refetch' precisa de refetch(since_ms, until_ms).")
+    return _refetch(df, timeframe, report, bad, refetch)
+
+
+def _ffill_grid(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    tf_ms = timeframe_to_ms(timeframe)
+    ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+    if not len(ts):
+        out = df.copy()
+        out["filled"] = np.zeros(0, dtype=bool)
+        return out
+
+    grid = np.arange(ts[0], ts[-1] + tf_ms, tf_ms, dtype="int64")
+    pos = (ts - ts[0]) // tf_ms
+    present = np.zeros(len(grid), dtype=bool)
+    present[pos] = True
+
+    # para cada candle da grade: último candle real até ele
+    src = np.maximum.accumulate(np.where(present, np.arange(len(grid)), 0))
+    row = np.zeros(len(grid), dtype="int64")
+    row[pos] = np.arange(len(ts))
+    row = row[src]
+
+    close = df["close"].to_numpy(dtype="float64")[row]
+    data = {}
+    for col in ("open", "high", "low", "close"):
+        data[col] = np.where(present, df[col].to_numpy(dtype="float64")[row], close)
+    data["volume"] = np.where(present, df["volume"].to_numpy(dtype="float64")[row], 0.0)
+
+    out = pd.DataFrame(data, index=pd.to_datetime(grid, unit="ms"))
+    out.index.name = df.index.name
+    out["filled"] = ~present
+    return out
+
+
+def _refetch(
+        df: pd.DataFrame,
+        timeframe: str,
+        report: ValidationReport,
+        bad: np.ndarray,
+        refetch: Callable[[int, int], pd.DataFrame]
+) -> tuple[pd.DataFrame, ValidationReport]:
+    tf_ms = timeframe_to_ms(timeframe)
+    ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+
+    # trechos contíguos de candles inválidos viram intervalos [início, fim)
+    edges = np.diff(np.r_[0, bad.astype("int8"), 0])
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+    ranges = np.column_stack([ts[starts], ts[ends] + tf_ms]) if len(starts) else np.empty((0, 2), "int64")
+    ranges = np.concatenate([report.gaps, ranges.astype("int64")])
+    ranges = ranges[np.argsort(ranges[:, 0], kind="stable")]
+
+    fetched = [refetch(int(since), int(until)) for since, until in ranges]
+    fetched = [f for f in fetched if f is not None and len(f)]
+    instrumentation.count("refetch_ranges", len(ranges))
+
+    # candles novos substituem os antigos (mesmo timestamp); inválidos sem reposição saem
+    # (inclusive quando nenhuma busca devolve nada)
+    out = pd.concat([df[~bad], *(f[list(df.columns)] for f in fetched)])
+    out = out[~out.index.duplicated(keep="last")].sort_index()
+    return out, validate_ohlcv(out, timeframe)
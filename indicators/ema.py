@@ -1,17 +1,68 @@
+import math
+
 import pandas as pd
 
+from utils import instrumentation
+
+EMA_SPANS = (9, 21, 50)
+
 
 class EMAIndicator:
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    """EMAs do close em colunas ema_<span>; copy=False escreve as colunas no próprio frame recebido."""
 
-    def calculate(self) -> pd.DataFrame:
-        """calcula as EMA"""
+    def __init__(self, df: pd.DataFrame, copy: bool = True):
+        self.df = df.copy() if copy else df
+
+    @instrumentation.timed("ema")
+    def calculate(self, spans: tuple[int, ...] = EMA_SPANS) -> pd.DataFrame:
+        """calcula as EMA (colunas ema_<span>)"""
 
         df = self.df
 
-        df["ema_9"] = df["close"].ewm(span=9, adjust=False).mean()
-        df["ema_21"] = df["close"].ewm(span=21, adjust=False).mean()
-        df["ema_50"] = df["close"].ewm(span=50, adjust=False).mean()
+        for span in spans:
+            df[f"ema_{span}"] = df["close"].ewm(span=span, adjust=False).mean()
 
         return df
+
+
+class IncrementalEMA:
+    """
+    EMA(s) atualizadas candle a candle (O(1) por candle fechado).
+
+    Reproduz exatamente `close.ewm(span=..., adjust=False).mean()` do pandas,
+    inclusive o tratamento de NaN (ignore_na=False), então o resultado é idêntico
+    ao de EMAIndicator.calculate() rodando no histórico inteiro.
+    """
+
+    def __init__(self, spans: tuple[int, ...] = EMA_SPANS):
+        self.spans = tuple(spans)
+        alphas = [1.0 / (1.0 + (span - 1) / 2.0) for span in self.spans]
+        self._new_wt = alphas
+        self._old_wt_factor = [1.0 - a for a in alphas]
+        self._old_wt = [1.0] * len(self.spans)
+        self._values = [math.nan] * len(self.spans)
+
+    @property
+    def values(self) -> dict:
+        return {f"ema_{span}": value for span, value in zip(self.spans, self._values)}
+
+    def update(self, close: float) -> dict:
+        """Recebe o close do novo candle fechado e devolve {"ema_9": ..., ...}."""
+        cur = float(close)
+        is_obs = cur == cur
+
+        for j in range(len(self.spans)):
+            weighted = self._values[j]
+            if weighted == weighted:
+                self._old_wt[j] *= self._old_wt_factor[j]
+                if is_obs:
+                    if weighted != cur:
+                        new_wt = self._new_wt[j]
+                        weighted = self._old_wt[j] * weighted + new_wt * cur
+                        weighted /= self._old_wt[j] + new_wt
+                        self._values[j] = weighted
+                    self._old_wt[j] = 1.0
+            elif is_obs:
+                self._values[j] = cur
+
+        return self.values
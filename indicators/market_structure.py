@@ -1,9 +1,52 @@
+from typing import Optional
+
+import numpy as np
 import pandas as pd
 
+from utils import instrumentation
+
+STRUCTURE_HIGH_LABELS = ["SH", "HH", "LH"]
+STRUCTURE_LOW_LABELS = ["SL", "HL", "LL"]
+STRUCTURE_LABELS = STRUCTURE_HIGH_LABELS + STRUCTURE_LOW_LABELS
+CLASSIFY_LABELS = ["HH", "HL", "LH", "LL"]
+
+
+def _swing_label_codes(prices: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Códigos por candle para uma sequência de swings:
+      -1 = sem swing, 0 = primeiro swing, 1 = acima do swing anterior, 2 = abaixo/igual
+    O "último swing" é carregado pra frente comparando cada ponto com o anterior.
+    """
+    codes = np.full(len(prices), -1, dtype="int8")
+    points = prices[mask]
+    if len(points):
+        # NaN compara como False -> cai em "abaixo/igual", igual ao loop antigo
+        rel = np.where(points[1:] > points[:-1], 1, 2).astype("int8")
+        codes[mask] = np.concatenate((np.zeros(1, dtype="int8"), rel))
+    return codes
+
+
+def structure_codes(
+        high: np.ndarray,
+        low: np.ndarray,
+        swing_high: np.ndarray,
+        swing_low: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Versão em arrays da classificação de estrutura.
+    Retorna códigos int8 (índices de STRUCTURE_HIGH_LABELS / STRUCTURE_LOW_LABELS, -1 = vazio).
+    """
+    return _swing_label_codes(high, swing_high), _swing_label_codes(low, swing_low)
+
 
 class MarketStructure:
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    """
+    Estrutura HH/HL/LH/LL a partir das colunas de swing.
+    copy=False evita a cópia: add_structure escreve no frame de quem chamou.
+    """
+
+    def __init__(self, df: pd.DataFrame, copy: bool = True):
+        self.df = df.copy() if copy else df
 
     def classify(self) -> pd.DataFrame:
         """
@@ -14,39 +57,29 @@ class MarketStructure:
         """
         df = self.df
 
-        # Colunas novas
-        df["structure"] = None  # HH, HL, LH, LL (apenas nos pontos de swing)
-        df["trend"] = None  # uptrend, downtrend, range (vamos preencher no final)
-
-        last_high = None
-        last_low = None
-
-        # Guardar sequência das últimas classificações pra decidir tendência
-        highs_seq = []  # HH/LH
-        lows_seq = []  # HL/LL
+        high_codes, low_codes = structure_codes(
+            df["high"].to_numpy(dtype="float64"),
+            df["low"].to_numpy(dtype="float64"),
+            df["swing_high"].to_numpy(dtype=bool),
+            df["swing_low"].to_numpy(dtype=bool),
+        )
 
-        for i in range(len(df)):
-            if df["swing_high"].iloc[i]:
-                price = df["high"].iloc[i]
-                if last_high is None:
-                    label = "LH"  # primeiro high não tem comparação (convencional)
-                else:
-                    label = "HH" if price > last_high else "LH"
+        # aqui o primeiro high/low não tem comparação e vira LH/LL (convencional)
+        # códigos em CLASSIFY_LABELS: HH=0, HL=1, LH=2, LL=3
+        high_map = np.array([2, 0, 2], dtype="int8")
+        low_map = np.array([3, 1, 3], dtype="int8")
 
-                df.iloc[i, df.columns.get_loc("structure")] = label
-                highs_seq.append(label)
-                last_high = price
+        is_high = high_codes >= 0
+        is_low = low_codes >= 0
 
-            if df["swing_low"].iloc[i]:
-                price = df["low"].iloc[i]
-                if last_low is None:
-                    label = "LL"  # primeiro low não tem comparação (convencional)
-                else:
-                    label = "HL" if price > last_low else "LL"
+        codes = np.full(len(df), -1, dtype="int8")
+        codes[is_high] = high_map[high_codes[is_high]]
+        codes[is_low] = low_map[low_codes[is_low]]  # low prevalece se ambos
+        df["structure"] = pd.Categorical.from_codes(codes, categories=CLASSIFY_LABELS)
 
-                df.iloc[i, df.columns.get_loc("structure")] = label
-                lows_seq.append(label)
-                last_low = price
+        labels = np.array(CLASSIFY_LABELS)
+        highs_seq = labels[high_map[high_codes[is_high]]].tolist()  # HH/LH
+        lows_seq = labels[low_map[low_codes[is_low]]].tolist()  # HL/LL
 
         # Determinar tendência com base nas últimas marcações
         trend = self._detect_trend(highs_seq, lows_seq)
@@ -71,15 +104,17 @@ class MarketStructure:
             return "downtrend"
         return "range"
 
+    @instrumentation.timed("structure")
     def add_structure(self) -> pd.DataFrame:
         """
         Fase 2.2:
         Adiciona estrutura HH/HL/LH/LL com base em swing_high/swing_low.
 
-        Cria colunas:
+        Cria colunas (categóricas):
           - structure_high: SH/HH/LH (apenas onde swing_high=True)
           - structure_low:  SL/HL/LL (apenas onde swing_low=True)
-          - structure:      coluna combinada (preenche apenas em candles de swing)
+          - structure:      coluna combinada (preenche apenas em candles de swing;
+                            se o candle for swing high e low ao mesmo tempo, vale o low)
         """
         df = self.df
 
@@ -91,39 +126,19 @@ class MarketStructure:
         if "high" not in df.columns or "low" not in df.columns:
             raise ValueError("DataFrame precisa ter colunas 'high' e 'low'.")
 
-        df["structure_high"] = None
-        df["structure_low"] = None
-        df["structure"] = None
-
-        last_high = None
-        last_low = None
-
-        for i in range(len(df)):
-            # Swing High -> SH / HH / LH
-            if bool(df["swing_high"].iloc[i]):
-                curr_high = float(df["high"].iloc[i])
-
-                if last_high is None:
-                    label = "SH"
-                else:
-                    label = "HH" if curr_high > last_high else "LH"
-
-                df.iloc[i, df.columns.get_loc("structure_high")] = label
-                df.iloc[i, df.columns.get_loc("structure")] = label
-                last_high = curr_high
+        high_codes, low_codes = structure_codes(
+            df["high"].to_numpy(dtype="float64"),
+            df["low"].to_numpy(dtype="float64"),
+            df["swing_high"].to_numpy(dtype=bool),
+            df["swing_low"].to_numpy(dtype=bool),
+        )
 
-            # Swing Low -> SL / HL / LL
-            if bool(df["swing_low"].iloc[i]):
-                curr_low = float(df["low"].iloc[i])
+        # códigos combinados: 0..2 = SH/HH/LH, 3..5 = SL/HL/LL
+        combined = np.where(low_codes >= 0, low_codes + 3, high_codes).astype("int8")
 
-                if last_low is None:
-                    label = "SL"
-                else:
-                    label = "HL" if curr_low > last_low else "LL"
-
-                df.iloc[i, df.columns.get_loc("structure_low")] = label
-                df.iloc[i, df.columns.get_loc("structure")] = label
-                last_low = curr_low
+        df["structure_high"] = pd.Categorical.from_codes(high_codes, categories=STRUCTURE_HIGH_LABELS)
+        df["structure_low"] = pd.Categorical.from_codes(low_codes, categories=STRUCTURE_LOW_LABELS)
+        df["structure"] = pd.Categorical.from_codes(combined, categories=STRUCTURE_LABELS)
 
         return df
 
@@ -161,3 +176,48 @@ class MarketStructure:
         if down_score >= up_score + 2:
             return "downtrend"
         return "range"
+
+
+class IncrementalStructure:
+    """
+    Labels de estrutura (SH/HH/LH e SL/HL/LL) atualizados swing a swing (O(1)).
+
+    Guarda só o preço do último swing high/low; resultado idêntico ao de add_structure().
+    """
+
+    def __init__(self):
+        self.last_high: Optional[float] = None
+        self.last_low: Optional[float] = None
+
+    def update(
+            self,
+            swing_high: bool,
+            high: float,
+            swing_low: bool,
+            low: float
+    ) -> tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        Recebe um candle já confirmado (saída de IncrementalSwings + high/low dele).
+        Retorna (structure_high, structure_low, structure).
+        """
+        label_high = None
+        label_low = None
+
+        if swing_high:
+            curr_high = float(high)
+            if self.last_high is None:
+                label_high = "SH"
+            else:
+                label_high = "HH" if curr_high > self.last_high else "LH"
+            self.last_high = curr_high
+
+        if swing_low:
+            curr_low = float(low)
+            if self.last_low is None:
+                label_low = "SL"
+            else:
+                label_low = "HL" if curr_low > self.last_low else "LL"
+            self.last_low = curr_low
+
+        # combinado: low prevalece se o candle for os dois
+        return label_high, label_low, label_low if label_low is not None else label_high
@@ -0,0 +1,125 @@
+import time
+import tracemalloc
+from typing import Optional
+
+import pandas as pd
+
+from indicators.ema import EMA_SPANS, EMAIndicator
+from indicators.market_structure import MarketStructure
+from indicators.price_action import PriceAction
+from strategy.context import MarketContext
+
+# estágio -> estágios dos quais depende
+STAGE_DEPENDENCIES = {
+    "swings": (),
+    "emas": (),
+    "structure": ("swings",),
+}
+
+
+class IndicatorPipeline:
+    """
+    Dono de UM frame (símbolo/timeframe): roda os indicadores in-place, na ordem
+    de dependência (swings -> structure, close -> EMAs), sem copiar o frame a cada classe.
+
+    Cada estágio é calculado uma vez e fica em cache (pelos parâmetros usados);
+    mudar os parâmetros de um estágio recalcula ele e invalida quem depende dele.
+
+    track_memory=True mede o pico de memória de cada estágio (tracemalloc).
+    """
+
+    def __init__(self, df: pd.DataFrame, copy: bool = True, track_memory: bool = False):
+        # a única cópia do pipeline (copy=False usa o frame recebido)
+        self.df = df.copy() if copy else df
+        self.track_memory = track_memory
+
+        self._done: dict[str, tuple] = {}  # estágio -> parâmetros com que foi calculado
+        self.stage_stats: dict[str, dict] = {}
+
+    # --- estágios ---
+
+    def swings(self, left: int = 1, right: int = 1, ties: str = "strict") -> "IndicatorPipeline":
+        params = (left, right, ties)
+        if self._done.get("swings") != params:
+            self._timed("swings", lambda: PriceAction(self.df, copy=False).detect_swings(left, right, ties))
+            self._done["swings"] = params
+            self._invalidate_dependents("swings")
+        return self
+
+    def emas(self, spans: tuple[int, ...] = EMA_SPANS) -> "IndicatorPipeline":
+        done = self._done.get("emas", ())
+        missing = tuple(span for span in spans if span not in done)
+        if missing:
+            self._timed("emas", lambda: EMAIndicator(self.df, copy=False).calculate(missing))
+            self._done["emas"] = done + missing
+        return self
+
+    def structure(self) -> "IndicatorPipeline":
+        if "swings" not in self._done:
+            self.swings()
+        if "structure" not in self._done:
+            self._timed("structure", lambda: MarketStructure(self.df, copy=False).add_structure())
+            self._done["structure"] = ()
+        return self
+
+    def run(self, *stages: str) -> pd.DataFrame:
+        """
+        Roda os estágios pedidos (e dependências) com parâmetros padrão.
+        Sem argumentos: todos. Retorna o frame.
+        """
+        for stage in stages or tuple(STAGE_DEPENDENCIES):
+            if stage not in STAGE_DEPENDENCIES:
+                raise ValueError(f"Estágio desconhecido: {stage!r}")
+            getattr(self, stage)()
+        return self.df
+
+    # --- leituras (sem cópia) ---
+
+    def trend(self, lookback: int = 6) -> str:
+        self.structure()
+        return MarketStructure(self.df, copy=False).get_trend(lookback=lookback)
+
+    def context(self) -> dict:
+        # swings já calculados ficam com os parâmetros do chamador; emas() só completa spans faltando
+        if "swings" not in self._done:
+            self.swings()
+        self.emas()
+        return MarketContext(self.df, copy=False).summary()
+
+    @property
+    def peak_memory(self) -> Optional[int]:
+        """Maior pico (bytes) entre os estágios medidos, ou None se não mediu."""
+        peaks = [s["peak_bytes"] for s in self.stage_stats.values() if s.get("peak_bytes") is not None]
+        return max(peaks) if peaks else None
+
+    # --- interno ---
+
+    def _invalidate_dependents(self, stage: str) -> None:
+        for other, deps in STAGE_DEPENDENCIES.items():
+            if stage in deps and other in self._done:
+                del self._done[other]
+                self._invalidate_dependents(other)
+
+    def _timed(self, stage: str, fn) -> None:
+        started_tracing = False
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+
+        t0 = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - t0
+
+        peak = None
+        if self.track_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+
+        stats = self.stage_stats.setdefault(stage, {"runs": 0, "seconds": 0.0, "peak_bytes": None})
+        stats["runs"] += 1
+        stats["seconds"] += seconds
+        if peak is not None:
+            stats["peak_bytes"] = max(stats["peak_bytes"] or 0, peak)
@@ -1,33 +1,176 @@
+from typing import Optional
+
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils import instrumentation
+
+TIE_MODES = ("strict", "first", "last")
+
+
+def _neighbor_extremes(values: np.ndarray, left: int, right: int, how: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Para cada candle i devolve o extremo (max/min) dos `left` candles anteriores
+    e dos `right` candles seguintes. Onde não existe janela completa, devolve NaN.
+    """
+    n = len(values)
+    prev_ext = np.full(n, np.nan)
+    next_ext = np.full(n, np.nan)
+
+    reduce = np.max if how == "max" else np.min
+
+    # janela [i-left, i-1] -> termina no candle anterior
+    if n - 1 >= left:
+        prev_ext[left:] = reduce(sliding_window_view(values[:-1], left), axis=1)
+
+    # janela [i+1, i+right] -> começa no candle seguinte
+    if n - 1 >= right:
+        next_ext[:n - right] = reduce(sliding_window_view(values[1:], right), axis=1)
+
+    return prev_ext, next_ext
+
+
+def swing_masks(
+        high: np.ndarray,
+        low: np.ndarray,
+        left: int = 1,
+        right: int = 1,
+        ties: str = "strict"
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Versão vetorizada (NumPy) da detecção de swings (fractal N-esquerda / M-direita).
+
+    ties:
+      - "strict": o candle precisa ser estritamente maior/menor que todos os vizinhos
+      - "first":  em platô de máximos/mínimos iguais, marca o PRIMEIRO candle
+      - "last":   em platô de máximos/mínimos iguais, marca o ÚLTIMO candle
+
+    Com left=1, right=1 e ties="strict" reproduz a regra original de 3 candles.
+
+    Limitação de "first"/"last": o platô só é comparado com a janela fixa de `right`
+    (ou `left`) candles. Um platô mais largo que a janela é marcado mesmo que depois
+    dele venha um topo maior (ex.: high [1, 5, 5, 6], ties="first", right=1 marca o
+    candle 1). É proposital: olhar além da janela faria o swing depender de candles
+    posteriores a i + right, e o resto do projeto (walk-forward, bos, IncrementalSwings)
+    assume que o swing de i está confirmado em i + right. Use uma janela maior se
+    platôs longos forem comuns.
+    """
+    if int(left) != left or int(right) != right or left < 1 or right < 1:
+        raise ValueError("left e right precisam ser inteiros >= 1.")
+    if ties not in TIE_MODES:
+        raise ValueError(f"ties inválido: {ties!r} (use {', '.join(TIE_MODES)}).")
+    left, right = int(left), int(right)
+
+    high = np.asarray(high, dtype="float64")
+    low = np.asarray(low, dtype="float64")
+
+    prev_hi, next_hi = _neighbor_extremes(high, left, right, "max")
+    prev_lo, next_lo = _neighbor_extremes(low, left, right, "min")
+
+    # comparações com NaN dão False -> bordas sem janela completa nunca viram swing
+    if ties == "strict":
+        swing_high = (high > prev_hi) & (high > next_hi)
+        swing_low = (low < prev_lo) & (low < next_lo)
+    elif ties == "first":
+        swing_high = (high > prev_hi) & (high >= next_hi)
+        swing_low = (low < prev_lo) & (low <= next_lo)
+    else:  # "last"
+        swing_high = (high >= prev_hi) & (high > next_hi)
+        swing_low = (low <= prev_lo) & (low < next_lo)
+
+    return swing_high, swing_low
 
 
 class PriceAction:
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    """
+    Swings (topos/fundos) em colunas swing_high/swing_low.
+    Por padrão trabalha numa cópia; com copy=False altera o frame recebido.
+    """
+
+    def __init__(self, df: pd.DataFrame, copy: bool = True):
+        self.df = df.copy() if copy else df
 
-    def detect_swings(self) -> pd.DataFrame:
+    @instrumentation.timed("swings")
+    def detect_swings(self, left: int = 1, right: int = 1, ties: str = "strict") -> pd.DataFrame:
         """
         Detecta Swing Highs (topos) e Swing Lows (fundos)
+
+        left/right: quantidade de candles à esquerda/direita que o swing precisa superar.
+        ties: tratamento de empates (ver `swing_masks`).
+        O padrão (1, 1, "strict") é a regra de 3 candles.
         """
         df = self.df
 
-        df["swing_high"] = False
-        df["swing_low"] = False
+        swing_high, swing_low = swing_masks(
+            df["high"].to_numpy(dtype="float64"),
+            df["low"].to_numpy(dtype="float64"),
+            left=left,
+            right=right,
+            ties=ties,
+        )
 
-        for i in range(1, len(df) - 1):
+        df["swing_high"] = swing_high
+        df["swing_low"] = swing_low
 
-            # Swing High
-            if (
-                    df["high"].iloc[i] > df["high"].iloc[i - 1]
-                    and df["high"].iloc[i] > df["high"].iloc[i + 1]
-            ):
-                df.iloc[i, df.columns.get_loc("swing_high")] = True
+        return df
 
-            # Swing Low
-            if (
-                    df["low"].iloc[i] < df["low"].iloc[i - 1]
-                    and df["low"].iloc[i] < df["low"].iloc[i + 1]
-            ):
-                df.iloc[i, df.columns.get_loc("swing_low")] = True
 
-        return df
+class IncrementalSwings:
+    """
+    Detecção de swings candle a candle (O(left + right) por candle).
+
+    Um swing no candle i só é confirmado quando chegam os `right` candles seguintes,
+    então update() devolve o resultado do candle (n - 1 - right), com o mesmo atraso
+    da versão em lote. O resultado é idêntico ao de `swing_masks` no histórico inteiro.
+    """
+
+    def __init__(self, left: int = 1, right: int = 1, ties: str = "strict"):
+        if int(left) != left or int(right) != right or left < 1 or right < 1:
+            raise ValueError("left e right precisam ser inteiros >= 1.")
+        if ties not in TIE_MODES:
+            raise ValueError(f"ties inválido: {ties!r} (use {', '.join(TIE_MODES)}).")
+
+        self.left = int(left)
+        self.right = int(right)
+        self.ties = ties
+        self._highs: list[float] = []
+        self._lows: list[float] = []
+        self._count = 0  # candles recebidos
+
+    def update(self, high: float, low: float) -> Optional[tuple[int, bool, bool, float, float]]:
+        """
+        Recebe high/low do novo candle fechado.
+        Retorna (índice do candle confirmado, swing_high, swing_low, high dele, low dele)
+        ou None enquanto ainda não há janela completa.
+        """
+        window = self.left + self.right + 1
+        self._highs.append(float(high))
+        self._lows.append(float(low))
+        if len(self._highs) > window:
+            del self._highs[0]
+            del self._lows[0]
+        self._count += 1
+
+        if len(self._highs) < window:
+            return None
+
+        center = self.left
+        h = self._highs[center]
+        l = self._lows[center]
+        prev_h, next_h = self._highs[:center], self._highs[center + 1:]
+        prev_l, next_l = self._lows[:center], self._lows[center + 1:]
+
+        # comparações com NaN dão False, como na versão vetorizada
+        strict_prev = self.ties != "last"
+        strict_next = self.ties != "first"
+        swing_high = _beats(h, prev_h, strict_prev, higher=True) and _beats(h, next_h, strict_next, higher=True)
+        swing_low = _beats(l, prev_l, strict_prev, higher=False) and _beats(l, next_l, strict_next, higher=False)
+
+        return self._count - 1 - self.right, swing_high, swing_low, h, l
+
+
+def _beats(value: float, others: list[float], strict: bool, higher: bool) -> bool:
+    if higher:
+        return all(value > o for o in others) if strict else all(value >= o for o in others)
+    return all(value < o for o in others) if strict else all(value <= o for o in others)
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from data.timeframes import timeframe_to_ms
+
+
+class FakeClock:
+    """
+    Relógio virtual para rodar o LiveRunner offline.
+
+    sleep_until() salta direto para o instante pedido (dias de mercado em segundos),
+    mas o tempo REAL gasto processando continua correndo em now_ms(), então a
+    latência fechamento -> decisão medida pelo runner é a de verdade.
+    """
+
+    def __init__(self, start_ms: int):
+        self._virtual = float(start_ms)
+        self._anchor = time.perf_counter()
+
+    def now_ms(self) -> float:
+        return self._virtual + (time.perf_counter() - self._anchor) * 1000.0
+
+    async def sleep_until(self, when_ms: float) -> None:
+        await asyncio.sleep(0)
+        if when_ms > self.now_ms():
+            self._virtual = float(when_ms)
+            self._anchor = time.perf_counter()
+
+    async def sleep(self, ms: float) -> None:
+        await self.sleep_until(self.now_ms() + ms)
+
+
+class FakeExchange:
+    """
+    Exchange local (API do ccxt.async_support) servindo candles de frames em memória,
+    só até o relógio: candles fechados + o candle em formação, como uma exchange real.
+
+    frames: {(symbol, timeframe): DataFrame OHLCV}; delay_ms simula a latência de rede.
+    """
+
+    def __init__(self, frames: Dict[tuple, pd.DataFrame], clock: FakeClock, delay_ms: float = 0.0):
+        self.clock = clock
+        self.delay_ms = delay_ms
+        self.requests = 0
+        self._data = {}
+        for key, df in frames.items():
+            ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+            rows = df[["open", "high", "low", "close", "volume"]].to_numpy(dtype="float64")
+            self._data[key] = (ts, rows)
+
+    async def fetch_ohlcv(
+            self,
+            symbol: str,
+            timeframe: str = "1m",
+            since: Optional[int] = None,
+            limit: Optional[int] = None
+    ) -> list:
+        self.requests += 1
+        if self.delay_ms:
+            await asyncio.sleep(self.delay_ms / 1000)
+
+        ts, rows = self._data[(symbol, timeframe)]
+        # candles já abertos até agora (o último ainda pode estar em formação)
+        end = int(np.searchsorted(ts, self.clock.now_ms(), side="right"))
+        limit = limit or 500
+        if since is None:
+            start = max(0, end - limit)
+        else:
+            start = int(np.searchsorted(ts, since, side="left"))
+        end = min(end, start + limit)
+
+        return [[int(t), *r] for t, r in zip(ts[start:end].tolist(), rows[start:end].tolist())]
+
+
+def resampled_frames(base: pd.DataFrame, symbol: str, base_timeframe: str, timeframes: tuple) -> dict:
+    """{(symbol, tf): frame} agregando um OHLCV base (ex.: 15m sintético) nos timeframes pedidos."""
+    from data.market_data import MarketData
+
+    market = MarketData(exchange=object())
+    frames = {}
+    for tf in timeframes:
+        if timeframe_to_ms(tf) == timeframe_to_ms(base_timeframe):
+            frames[(symbol, tf)] = base
+        else:
+            frames[(symbol, tf)] = market.resample(base, tf, base_timeframe)
+    return frames
@@ -0,0 +1,480 @@
+"""
+Runner ao vivo (Fase 2.8): um processo que acorda a cada fechamento de candle
+15m/4h/1d, busca só os candles novos e atualiza indicadores e contexto de forma
+incremental (IncrementalEMA / IncrementalPositioning), num único event loop asyncio.
+
+Modos:
+- collect: só registra os sinais (dataset de sinais, sem posição)
+- trade:   aplica a policy (max trades/dia, cooldown após loss, metade da zona)
+           e simula as posições (paper) com as mesmas regras do backtest
+
+Uso:
+    python -m live.runner --mode collect --symbols BTC/USDT
+    python -m live.runner --mode trade --simulate-days 30   # offline, relógio fake
+"""
+import argparse
+import asyncio
+import inspect
+import math
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import Trade
+from backtest.signal_log import SignalDataset
+from backtest.trade_log import TradeLog
+from data.timeframes import timeframe_to_ms
+from indicators.ema import IncrementalEMA
+from strategy.entry import EntrySignal
+from strategy.positioning import IncrementalPositioning
+from utils import instrumentation
+
+LIVE_MODES = ("collect", "trade")
+
+# ordem de processamento quando vários timeframes fecham no mesmo instante:
+# o contexto 1D/4H precisa estar atualizado antes da decisão do 15m
+TIMEFRAMES = ("1d", "4h", "15m")
+
+
+class SystemClock:
+    def now_ms(self) -> float:
+        return time.time() * 1000.0
+
+    async def sleep_until(self, when_ms: float) -> None:
+        delay = (when_ms - self.now_ms()) / 1000
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def sleep(self, ms: float) -> None:
+        await asyncio.sleep(ms / 1000)
+
+
+@dataclass
+class TradePolicy:
+    """
+    Regras do modo trade:
+    - max_trades_per_day: entradas por dia (UTC) e por símbolo
+    - cooldown_bars_after_loss: candles 15m sem novas entradas depois de um stop
+    - half_zone: long só na metade de baixo da zona, short só na metade de cima
+    """
+    max_trades_per_day: int = 2
+    cooldown_bars_after_loss: int = 8
+    half_zone: bool = True
+
+    def check(self, state: "_SymbolState", bar_ts: int, side: str, close: float,
+              zone_low: float, zone_high: float) -> Optional[str]:
+        """None = entrada permitida; senão o motivo do bloqueio."""
+        if state.trades_by_day.get(_day(bar_ts), 0) >= self.max_trades_per_day:
+            return "max_trades_per_day"
+        if bar_ts < state.cooldown_until:
+            return "cooldown"
+        if self.half_zone:
+            mid = (zone_low + zone_high) / 2
+            if side == "long" and close > mid:
+                return "half_zone"
+            if side == "short" and close < mid:
+                return "half_zone"
+        return None
+
+
+def _day(ts_ms: int) -> int:
+    return int(ts_ms // 86_400_000)
+
+
+def _valid_entry(side: str, stop: float, open_: float) -> bool:
+    """Entrada no open só vale com risco > 0 e stop do lado certo (mesma regra do backtest)."""
+    return abs(open_ - stop) > 0 and (stop < open_ if side == "long" else stop > open_)
+
+
+class _SymbolState:
+    def __init__(self, symbol: str, swing_left: int, swing_right: int):
+        self.symbol = symbol
+        self.positioning = IncrementalPositioning(swing_left, swing_right)
+        self.ema_15m = IncrementalEMA()
+        self.last_ts = {tf: None for tf in TIMEFRAMES}
+
+        # modo trade (paper)
+        self.position: Optional[Trade] = None
+        self.position_ts: int = 0  # abertura do candle de entrada
+        self.pending: Optional[dict] = None  # entrada decidida, executa no open do próximo candle
+        self.signal_row: Optional[dict] = None  # linha do dataset esperando o open seguinte (accepted)
+        self.trades_by_day: dict[int, int] = {}
+        self.cooldown_until: int = 0
+
+
+class LiveRunner:
+    """
+    exchange: objeto estilo ccxt (fetch_ohlcv síncrono ou coroutine, ex.: ccxt.async_support)
+    clock:    SystemClock (padrão) ou live.fake.FakeClock para rodar offline
+    on_decision: callback opcional chamado com o dict de cada decisão 15m
+    """
+
+    def __init__(
+            self,
+            exchange,
+            symbols: List[str],
+            mode: str = "collect",
+            clock=None,
+            policy: Optional[TradePolicy] = None,
+            rr: float = 2.0,
+            entry_signal_fn=EntrySignal.ema21_rejection,
+            warmup: int = 300,
+            swing_left: int = 1,
+            swing_right: int = 1,
+            signals_path: Optional[str] = "logs/signals",
+            trades_path: Optional[str] = "logs/trades_live.csv",
+            flush_every: int = 96,
+            fetch_retries: int = 10,
+            retry_delay_ms: float = 200.0,
+            on_decision: Optional[Callable[[dict], None]] = None
+    ):
+        if mode not in LIVE_MODES:
+            raise ValueError(f"Modo inválido: {mode!r} (use {', '.join(LIVE_MODES)}).")
+
+        self.exchange = exchange
+        self.symbols = list(symbols)
+        self.mode = mode
+        self.clock = clock or SystemClock()
+        self.policy = policy or TradePolicy()
+        self.rr = rr
+        self.entry_signal_fn = entry_signal_fn
+        self.warmup = warmup
+        self.fetch_retries = fetch_retries
+        self.retry_delay_ms = retry_delay_ms
+        self.on_decision = on_decision
+
+        self._tf_ms = {tf: timeframe_to_ms(tf) for tf in TIMEFRAMES}
+        self._states = {s: _SymbolState(s, swing_left, swing_right) for s in self.symbols}
+        self._fetch_is_async = inspect.iscoroutinefunction(exchange.fetch_ohlcv)
+
+        self.signals = SignalDataset(signals_path) if signals_path else None
+        self.flush_every = flush_every
+        self._signal_rows: list = []
+
+        # processo longo: reinícios acrescentam ao mesmo log em vez de truncar
+        self.trade_log = TradeLog(trades_path, chunk_size=1, append=True) if mode == "trade" else None
+        self.trades: List[Trade] = []
+
+        self.decisions: deque = deque(maxlen=10_000)
+        self.latencies_ms: deque = deque(maxlen=10_000)
+        self.steps = 0
+        self._warmed_up = False
+
+    # --- exchange ---
+
+    async def _fetch(self, symbol: str, timeframe: str, since: Optional[int], limit: int) -> list:
+        kwargs = {"symbol": symbol, "timeframe": timeframe, "since": since, "limit": limit}
+        if self._fetch_is_async:
+            page = await self.exchange.fetch_ohlcv(**kwargs)
+        else:
+            page = await asyncio.to_thread(self.exchange.fetch_ohlcv, **kwargs)
+        instrumentation.count("exchange_requests")
+        return page
+
+    async def _fetch_closed(self, symbol: str, timeframe: str, close_ms: int) -> list:
+        """
+        Candles fechados até close_ms que ainda não foram processados.
+        Se a exchange ainda não publicou o candle que acabou de fechar, tenta de novo.
+        """
+        tf_ms = self._tf_ms[timeframe]
+        last = self._states[symbol].last_ts[timeframe]
+        since = last + tf_ms if last is not None else close_ms - tf_ms * self.warmup
+        expected_last = (int(close_ms) // tf_ms - 1) * tf_ms  # último candle que já deveria ter fechado
+
+        candles: list = []
+        for attempt in range(self.fetch_retries + 1):
+            page = await self._fetch(symbol, timeframe, since, max(1, int(close_ms - since) // tf_ms + 1))
+            candles = [c for c in page if since <= int(c[0]) and int(c[0]) + tf_ms <= close_ms]
+            if candles and int(candles[-1][0]) >= expected_last:
+                break
+            if attempt < self.fetch_retries:
+                await self.clock.sleep(self.retry_delay_ms)
+
+        return candles
+
+    # --- agenda ---
+
+    def next_close(self, now_ms: float) -> int:
+        """Próximo instante (ms) em que algum dos timeframes fecha um candle."""
+        return min((int(now_ms) // tf_ms + 1) * tf_ms for tf_ms in self._tf_ms.values())
+
+    async def warm_up(self) -> None:
+        """Histórico inicial (`warmup` candles por timeframe) para EMAs/swings, sem decisões."""
+        close_ms = int(self.clock.now_ms())
+        jobs = [(s, tf) for s in self.symbols for tf in TIMEFRAMES]
+        pages = await asyncio.gather(*(self._fetch_closed(s, tf, close_ms) for s, tf in jobs))
+
+        for (symbol, tf), candles in zip(jobs, pages):
+            state = self._states[symbol]
+            for candle in candles:
+                if tf == "15m":
+                    state.ema_15m.update(candle[4])
+                else:
+                    self._update_htf(state, tf, candle)
+            if candles:
+                state.last_ts[tf] = int(candles[-1][0])
+
+        self._warmed_up = True
+
+    async def step(self, close_ms: int) -> None:
+        """Processa todos os candles que fecharam em close_ms (todos os símbolos)."""
+        t0 = time.perf_counter()
+        closing = [tf for tf in TIMEFRAMES if close_ms % self._tf_ms[tf] == 0]
+        jobs = [(s, tf) for s in self.symbols for tf in closing]
+
+        with instrumentation.stage("live_fetch", rows=len(jobs)):
+            pages = await asyncio.gather(*(self._fetch_closed(s, tf, close_ms) for s, tf in jobs))
+        new = dict(zip(jobs, pages))
+
+        with instrumentation.stage("live_update", rows=len(jobs)):
+            for symbol in self.symbols:
+                state = self._states[symbol]
+                for tf in closing:
+                    for candle in new[(symbol, tf)]:
+                        if tf == "15m":
+                            self._on_15m(state, candle)
+                        else:
+                            self._update_htf(state, tf, candle)
+                        state.last_ts[tf] = int(candle[0])
+
+        latency = self.clock.now_ms() - close_ms
+        self.latencies_ms.append(latency)
+        self.steps += 1
+        instrumentation.count("live_steps")
+
+        if self._signal_rows and len(self._signal_rows) >= self.flush_every:
+            self.flush_signals()
+
+        # processamento puro (sem espera pela exchange) também fica registrado
+        instrumentation.count("live_step_ms", (time.perf_counter() - t0) * 1000)
+
+    async def run(self, until_ms: Optional[int] = None, max_steps: Optional[int] = None) -> None:
+        """Loop principal: dorme até o próximo fechamento, processa, repete."""
+        try:
+            if not self._warmed_up:
+                await self.warm_up()
+            while True:
+                close_ms = self.next_close(self.clock.now_ms())
+                if until_ms is not None and close_ms > until_ms:
+                    break
+                await self.clock.sleep_until(close_ms)
+                await self.step(close_ms)
+                if max_steps is not None and self.steps >= max_steps:
+                    break
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.flush_signals()
+        if self.trade_log is not None:
+            self.trade_log.close()
+
+    # --- atualização por candle ---
+
+    @staticmethod
+    def _update_htf(state: _SymbolState, timeframe: str, candle: list) -> None:
+        _, _, h, l, c, _ = candle[:6]
+        if timeframe == "1d":
+            state.positioning.update_1d(c)
+        else:
+            state.positioning.update_4h(h, l, c)
+
+    def _on_15m(self, state: _SymbolState, candle: list) -> None:
+        ts, o, h, l, c, v = (int(candle[0]), *map(float, candle[1:6]))
+        emas = state.ema_15m.update(c)
+        bar_time = pd.Timestamp(ts, unit="ms")
+
+        if self.mode == "trade":
+            self._manage_position(state, ts, bar_time, o, h, l)
+
+        if state.signal_row is not None:
+            # accepted do candle anterior como no signal_frame: setup + stop válido no open deste candle
+            row, state.signal_row = state.signal_row, None
+            row["accepted"] = row["accepted"] and _valid_entry(row["bias"], row["invalidation"], o)
+            self._signal_rows.append(row)
+
+        ctx = state.positioning.state()
+        bias = ctx["bias_final"]
+        zlow, zhigh, stop = ctx["zone_low"], ctx["zone_high"], ctx["invalidation"]
+
+        bar = pd.DataFrame({"open": [o], "high": [h], "low": [l], "close": [c], **{k: [x] for k, x in emas.items()}})
+        trigger_long = bool(self.entry_signal_fn(bar, "long"))
+        trigger_short = bool(self.entry_signal_fn(bar, "short"))
+        trigger = (bias == "long" and trigger_long) or (bias == "short" and trigger_short)
+        in_zone = zlow <= c <= zhigh  # NaN -> False
+        setup = in_zone and trigger and not math.isnan(stop)
+
+        action = "none"
+        if setup and self.mode == "collect":
+            action = "signal"
+        elif setup and state.position is None and state.pending is None:
+            blocked = self.policy.check(state, ts, bias, c, zlow, zhigh)
+            if blocked is None:
+                state.pending = {"side": bias, "stop": stop}
+                action = "enter"
+            else:
+                action = f"blocked:{blocked}"
+        elif setup:
+            action = "in_position"
+
+        decision = {
+            "symbol": state.symbol,
+            "time": bar_time,
+            "close": c,
+            "bias": bias,
+            "zone_low": zlow,
+            "zone_high": zhigh,
+            "invalidation": stop,
+            "in_zone": in_zone,
+            "trigger": trigger,
+            "setup": setup,
+            "action": action,
+        }
+        self.decisions.append(decision)
+        if self.on_decision is not None:
+            self.on_decision(decision)
+
+        if self.signals is not None:
+            ema21 = emas.get("ema_21", math.nan)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                zone_pos = (c - zlow) / (zhigh - zlow) if zhigh != zlow else math.nan
+            state.signal_row = {
+                "timestamp": bar_time, "symbol": state.symbol,
+                "open": o, "high": h, "low": l, "close": c, "volume": v, **emas,
+                "bias": bias, "zone_low": zlow, "zone_high": zhigh, "invalidation": stop,
+                "in_zone": in_zone, "trigger_long": trigger_long, "trigger_short": trigger_short,
+                "trigger": trigger, "accepted": setup,
+                "dist_ema21": (c - ema21) / c, "zone_pos": zone_pos, "risk": abs(c - stop) / c,
+            }
+
+    def _manage_position(self, state: _SymbolState, ts: int, bar_time, o: float, h: float, l: float) -> None:
+        """Paper trading com as regras do backtest: entrada no open, stop primeiro se bater ambos."""
+        pos = state.position
+        if pos is not None and ts > state.position_ts:
+            is_long = pos.side == "long"
+            hit_stop = l <= pos.stop if is_long else h >= pos.stop
+            hit_tp = h >= pos.tp if is_long else l <= pos.tp
+
+            if hit_stop or hit_tp:
+                pos.exit_time = str(bar_time)
+                if hit_stop:
+                    pos.exit, pos.result, pos.r = pos.stop, "loss", -1.0
+                    state.cooldown_until = ts + (self.policy.cooldown_bars_after_loss + 1) * self._tf_ms["15m"]
+                else:
+                    pos.exit, pos.result, pos.r = pos.tp, "win", self.rr
+                self.trades.append(pos)
+                self.trade_log.add(pos)
+                instrumentation.count("trades_closed")
+                state.position = None
+
+        if state.pending is not None:
+            side, stop = state.pending["side"], state.pending["stop"]
+            state.pending = None
+
+            if _valid_entry(side, stop, o):
+                risk = abs(o - stop)
+                tp = o + self.rr * risk if side == "long" else o - self.rr * risk
+                state.position = Trade(side=side, entry_time=str(bar_time), entry=o, stop=stop, tp=tp)
+                state.position_ts = ts
+                # só entradas executadas contam no limite diário
+                state.trades_by_day[_day(ts)] = state.trades_by_day.get(_day(ts), 0) + 1
+                instrumentation.count("trades_opened")
+
+    # --- saída ---
+
+    def flush_signals(self) -> None:
+        if self.signals is None or not self._signal_rows:
+            return
+        frame = pd.DataFrame(self._signal_rows).set_index("timestamp")
+        self._signal_rows = []
+        self.signals.append(frame)
+
+    def stats(self) -> dict:
+        lat = np.asarray(self.latencies_ms, dtype="float64")
+        actions: dict[str, int] = {}
+        for d in self.decisions:
+            actions[d["action"]] = actions.get(d["action"], 0) + 1
+        return {
+            "mode": self.mode,
+            "steps": self.steps,
+            "decisions": len(self.decisions),
+            "actions": actions,
+            "trades": len(self.trades),
+            "equity_r": float(sum(t.r for t in self.trades)),
+            "latency_ms_p50": float(np.percentile(lat, 50)) if len(lat) else None,
+            "latency_ms_p95": float(np.percentile(lat, 95)) if len(lat) else None,
+            "latency_ms_max": float(lat.max()) if len(lat) else None,
+        }
+
+
+def _simulated(symbols: List[str], days: int, delay_ms: float):
+    """Exchange + relógio fake com OHLCV sintético (warmup + `days` dias)."""
+    from benchmarks.synthetic import generate_ohlcv
+    from live.fake import FakeClock, FakeExchange, resampled_frames
+
+    bars = (days + 120) * 96  # 120 dias de histórico para o warmup do 1D
+    frames = {}
+    for k, symbol in enumerate(symbols):
+        base = generate_ohlcv(bars, seed=42 + k)
+        frames.update(resampled_frames(base, symbol, "15m", TIMEFRAMES))
+
+    start = frames[(symbols[0], "15m")].index[-days * 96]
+    clock = FakeClock(int(start.value // 1_000_000))
+    end = clock.now_ms() + days * 86_400_000
+    return FakeExchange(frames, clock, delay_ms=delay_ms), clock, int(end)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Runner ao vivo (collect / trade).")
+    parser.add_argument("--mode", choices=LIVE_MODES, default="collect")
+    parser.add_argument("--symbols", default="BTC/USDT", help="lista separada por vírgula")
+    parser.add_argument("--rr", type=float, default=2.0)
+    parser.add_argument("--max-trades-per-day", type=int, default=2)
+    parser.add_argument("--cooldown-bars", type=int, default=8)
+    parser.add_argument("--no-half-zone", action="store_true")
+    parser.add_argument("--signals-path", default="logs/signals")
+    parser.add_argument("--trades-path", default="logs/trades_live.csv")
+    parser.add_argument("--simulate-days", type=int, default=0,
+                        help="> 0: roda offline com exchange/relógio fake e dados sintéticos")
+    parser.add_argument("--simulate-delay-ms", type=float, default=20.0, help="latência fake da exchange")
+    args = parser.parse_args(argv)
+
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    policy = TradePolicy(args.max_trades_per_day, args.cooldown_bars, not args.no_half_zone)
+
+    until = None
+    if args.simulate_days > 0:
+        exchange, clock, until = _simulated(symbols, args.simulate_days, args.simulate_delay_ms)
+    else:
+        import ccxt.async_support as ccxt_async
+
+        exchange, clock = ccxt_async.binance(), SystemClock()
+
+    runner = LiveRunner(
+        exchange, symbols, mode=args.mode, clock=clock, policy=policy, rr=args.rr,
+        signals_path=args.signals_path, trades_path=args.trades_path,
+    )
+
+    async def _run():
+        try:
+            await runner.run(until_ms=until)
+        finally:
+            if hasattr(exchange, "close") and inspect.iscoroutinefunction(exchange.close):
+                await exchange.close()
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+
+    print(runner.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
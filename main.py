@@ -1,13 +1,41 @@
 import pandas as pd
 
-from backtest.engine import run_backtest_15m
+from backtest.drilldown import market_loader, resolve_ambiguous
+from backtest.engine import run_backtest_15m, run_backtest_walkforward
+from backtest.metrics import monte_carlo, trade_metrics
+from backtest.signal_log import SignalDataset, signal_frame
+from data.frame_cache import FrameCache
 from data.market_data import MarketData
-from indicators.ema import EMAIndicator
-from indicators.market_structure import MarketStructure
-from indicators.price_action import PriceAction
-from strategy.context import MarketContext
+from data.store import OHLCVStore
+from indicators.pipeline import IndicatorPipeline
 from strategy.entry import EntrySignal
 from strategy.positioning import Positioning
+from strategy.signals import parse_signal
+from utils import instrumentation
+
+# True = usa só os candles já guardados em data/cache (sem rede)
+OFFLINE = False
+
+# custos para o R líquido (fração do preço): taxa por lado e slippage por execução
+FEE_RATE = 0.001
+SLIPPAGE = 0.0005
+
+# candles 15m que batem stop E TP: reavaliar com candles menores (vazio = assume stop)
+DRILLDOWN_TIMEFRAMES = ("1m",)
+
+# candles com gaps/regras violadas (data/validation.py): "none" só reporta,
+# "mark" (coluna invalid), "ffill" (completa a grade) ou "refetch" (busca de novo)
+DATA_REPAIR = "none"
+
+# contexto walk-forward alinhado no 15m guardado em disco (None = sem cache)
+CONTEXT_CACHE_DIR = "data/cache/frames"
+
+# gatilho de entrada 15m (expressão de strategy.signals), ex.:
+# "ema21_rejection & within(engulfing, 3)" ou "wick_rejection(span=50) | bos"
+ENTRY_SIGNAL = "ema21_rejection"
+
+# True = mede tempo/contadores por estágio e grava logs/run_report.json + .prom
+INSTRUMENT = False
 
 
 def main():
@@ -15,28 +43,37 @@ def main():
     pd.set_option("display.width", 160)
     pd.set_option("display.float_format", "{:,.2f}".format)
 
-    market = MarketData()
+    if INSTRUMENT:
+        instrumentation.enable()
+
+    entry_mask = parse_signal(ENTRY_SIGNAL)
+
+    market = MarketData(store=OHLCVStore("data/cache/ohlcv.sqlite"), offline=OFFLINE)
 
-    btc_1d = market.get_ohlcv(symbol="BTC/USDT", timeframe="1d", limit=200)
-    btc_4h = market.get_ohlcv(symbol="BTC/USDT", timeframe="4h", limit=200)
+    def load(timeframe: str, limit: int) -> pd.DataFrame:
+        df, report = market.get_validated(symbol="BTC/USDT", timeframe=timeframe, limit=limit, repair=DATA_REPAIR)
+        if not report.ok:
+            print(f"Validação {timeframe}:", report.summary())
+        return df
 
-    # --- 1D pipeline ---
-    btc_1d = PriceAction(btc_1d).detect_swings()
-    btc_1d = EMAIndicator(btc_1d).calculate()
-    btc_1d = MarketStructure(btc_1d).add_structure()
+    btc_1d = load("1d", 200)
+    btc_4h = load("4h", 200)
 
-    trend_1d = MarketStructure(btc_1d).get_trend(lookback=6)
-    ctx_1d = MarketContext(btc_1d).summary()
+    # --- 1D pipeline (um frame, sem cópias entre indicadores) ---
+    pipe_1d = IndicatorPipeline(btc_1d)
+    btc_1d = pipe_1d.run("swings", "emas", "structure")
+
+    trend_1d = pipe_1d.trend(lookback=6)
+    ctx_1d = pipe_1d.context()
 
     # --- 4H pipeline ---
-    btc_4h = PriceAction(btc_4h).detect_swings()
-    btc_4h = EMAIndicator(btc_4h).calculate()
-    btc_4h = MarketStructure(btc_4h).add_structure()
+    pipe_4h = IndicatorPipeline(btc_4h)
+    btc_4h = pipe_4h.run("swings", "emas", "structure")
 
-    trend_4h = MarketStructure(btc_4h).get_trend(lookback=6)
-    ctx_4h = MarketContext(btc_4h).summary()
+    trend_4h = pipe_4h.trend(lookback=6)
+    ctx_4h = pipe_4h.context()
 
-    pos = Positioning(btc_1d, btc_4h).summary()
+    pos = Positioning(btc_1d, btc_4h, copy=False).summary()
 
     print("===BTC 1D=== (COM SWINGS + EMA + STRUCTURE)")
     print(btc_1d[["close", "ema_9", "ema_21", "ema_50", "swing_high", "swing_low", "structure"]].tail(20).to_string())
@@ -52,8 +89,8 @@ def main():
     print(pos)
 
     # --- 15m para backtest base ---
-    btc_15m = market.get_ohlcv(symbol="BTC/USDT", timeframe="15m", limit=1000)
-    btc_15m = EMAIndicator(btc_15m).calculate()  # precisa de ema_21 no 15m
+    btc_15m = load("15m", 1000)
+    btc_15m = IndicatorPipeline(btc_15m, copy=False).run("emas")  # precisa de ema_21 no 15m
 
     side = pos["bias_final"]
     zone = pos["buy_zone_4h"] if side == "long" else pos["sell_zone_4h"]
@@ -68,13 +105,56 @@ def main():
             stop_level=stop_level,
             rr=2.0,
             trades_csv_path="logs/trades.csv",
-            entry_signal_fn=EntrySignal.ema21_rejection
+            entry_signal_fn=EntrySignal.ema21_rejection,
+            mode="vectorized",
+            entry_mask_fn=entry_mask
         )
         print("Stats:", stats)
         print("Trades salvos em:", stats["csv"])
     else:
         print("Sem setup para backtest agora (bias neutral ou zona/stop ausentes).")
 
+    # --- Walk-forward: bias/zona/stop recalculados a cada 1D/4H fechado ---
+    print("\n=== BACKTEST WALK-FORWARD (15m, sem lookahead) ===")
+    cache = FrameCache(CONTEXT_CACHE_DIR) if CONTEXT_CACHE_DIR else None
+    ctx_wf = Positioning(btc_1d, btc_4h, copy=False).walk_forward(btc_15m, cache=cache)
+    stats_wf = run_backtest_walkforward(
+        df_15m=btc_15m,
+        context=ctx_wf,
+        rr=2.0,
+        trades_csv_path="logs/trades_walkforward.csv",
+        entry_mask_fn=entry_mask,
+        return_trades=True
+    )
+    trades_wf = stats_wf.pop("trades_df")
+    print("Stats:", stats_wf)
+    print("Trades salvos em:", stats_wf["csv"])
+
+    if len(trades_wf) and DRILLDOWN_TIMEFRAMES:
+        trades_wf, drill = resolve_ambiguous(
+            trades_wf, btc_15m, market_loader(market, "BTC/USDT"), timeframes=DRILLDOWN_TIMEFRAMES
+        )
+        print(f"Drill-down {'/'.join(DRILLDOWN_TIMEFRAMES)}: {drill['ambiguous']} candles ambíguos, "
+              f"{drill['changed']} trades mudaram para win, {drill['unresolved']} sem resolução "
+              f"(equity {drill['equity_r_before']:.2f}R -> {drill['equity_r_after']:.2f}R)")
+
+    if len(trades_wf):
+        net = trade_metrics(trades_wf, fee_rate=FEE_RATE, slippage=SLIPPAGE)
+        print(f"Líquido (fee {FEE_RATE:.2%}, slippage {SLIPPAGE:.2%}):", net)
+
+        mc = monte_carlo(trades_wf["r"].to_numpy(), n_sims=10_000, seed=42)
+        print("Monte Carlo (ordem dos trades) — max drawdown R [p5, p50, p95]:", mc["max_drawdown_r"])
+
+    # --- Signals log (Fase 2.9): features/flags de todo candle, Parquet por símbolo/mês ---
+    signals = signal_frame(btc_15m, ctx_wf, symbol="BTC/USDT", entry_mask_fn=entry_mask)
+    written = SignalDataset("logs/signals").append(signals)
+    print(f"\nSinais gravados: {written} candles novos em logs/signals")
+
+    if INSTRUMENT:
+        instrumentation.export_json("logs/run_report.json")
+        instrumentation.export_prometheus("logs/run_report.prom")
+        print("\nRelatório de instrumentação salvo em: logs/run_report.json")
+
 
 if __name__ == "__main__":
     main()
@@ -1,25 +1,32 @@
+from typing import Optional
+
 import pandas as pd
 
+from strategy.levels import SwingLevelIndex
+from utils import instrumentation
+
 
 class MarketContext:
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    """Níveis e bias de um frame já com swings/EMAs (só leitura; copy=False dispensa a cópia)."""
+
+    def __init__(self, df: pd.DataFrame, copy: bool = True):
+        self.df = df.copy() if copy else df
+        self._levels: Optional[SwingLevelIndex] = None
+
+    @property
+    def levels(self) -> SwingLevelIndex:
+        """Índice de swings (calculado uma vez; consultas seguintes são O(1)/O(log n))."""
+        if self._levels is None:
+            self._levels = SwingLevelIndex(self.df)
+        return self._levels
 
-    def get_levels(self) -> dict:
+    def get_levels(self, bar: int = -1) -> dict:
         """
-        Pega níveis essenciais:
+        Pega níveis essenciais (no último candle, ou no candle `bar`):
         - último swing low (suporte)
         - último swing high (resistência)
         """
-        df = self.df
-
-        last_low = df[df["swing_low"]].tail(1)
-        last_high = df[df["swing_high"]].tail(1)
-
-        support = float(last_low["low"].iloc[0]) if len(last_low) else None
-        resistance = float(last_high["high"].iloc[0]) if len(last_high) else None
-
-        return {"support": support, "resistance": resistance}
+        return self.levels.levels_at(bar)
 
     def get_bias(self) -> str:
         """
@@ -59,6 +66,7 @@ class MarketContext:
 
         return {"buy_zone": buy_zone, "sell_zone": sell_zone}
 
+    @instrumentation.timed("context", rows=None)
     def summary(self) -> dict:
         levels = self.get_levels()
         bias = self.get_bias()
@@ -1,17 +1,19 @@
+import numpy as np
 import pandas as pd
 
 
 class EntrySignal:
     @staticmethod
-    def ema21_rejection(df_15m: pd.DataFrame, side: str) -> bool:
+    def ema21_rejection(df_15m: pd.DataFrame, side: str, ema_column: str = "ema_21") -> bool:
         """
         Gatilho base (bem simples):
         - SHORT: o candle toca/ultrapassa EMA21 e fecha abaixo dela (rejeição)
         - LONG:  o candle toca/ultrapassa EMA21 e fecha acima dela (rejeição)
         Usa o ÚLTIMO candle fechado (df_15m.iloc[-1]).
+        ema_column: coluna da EMA média (ex.: "ema_34" num sweep de spans).
         """
         last = df_15m.iloc[-1]
-        ema21 = float(last["ema_21"])
+        ema21 = float(last[ema_column])
 
         o = float(last["open"])
         h = float(last["high"])
@@ -29,3 +31,22 @@ class EntrySignal:
             return touched and rejected
 
         return False
+
+    @staticmethod
+    def ema21_rejection_mask(df_15m: pd.DataFrame, side: str, ema_column: str = "ema_21") -> np.ndarray:
+        """
+        Mesma regra de `ema21_rejection`, mas avaliada em TODOS os candles de uma vez.
+        Retorna array booleano: mask[i] == ema21_rejection(df_15m.iloc[:i + 1], side, ema_column).
+        """
+        ema21 = df_15m[ema_column].to_numpy(dtype="float64")
+        h = df_15m["high"].to_numpy(dtype="float64")
+        l = df_15m["low"].to_numpy(dtype="float64")
+        c = df_15m["close"].to_numpy(dtype="float64")
+
+        if side == "short":
+            return (h >= ema21) & (c < ema21)
+
+        if side == "long":
+            return (l <= ema21) & (c > ema21)
+
+        return np.zeros(len(df_15m), dtype=bool)
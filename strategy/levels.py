@@ -0,0 +1,269 @@
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+LEVEL_SOURCES = ("low", "high", "all")
+
+
+def _last_bars(mask: np.ndarray, confirm_bars: int) -> np.ndarray:
+    """out[t] = posição do último True em mask até t - confirm_bars (-1 se nenhum)."""
+    n = len(mask)
+    last = np.maximum.accumulate(np.where(mask, np.arange(n), -1)) if n else np.empty(0, dtype="int64")
+    shift = min(confirm_bars, n)
+    if shift:
+        last = np.r_[np.full(shift, -1, dtype=last.dtype), last[:n - shift]]
+    return last
+
+
+def _price_at(price: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """price[last], com NaN onde last == -1 (nenhum swing ainda)."""
+    return np.where(last >= 0, price[np.maximum(last, 0)], np.nan) if len(last) else np.empty(0)
+
+
+def ffill_levels(price: np.ndarray, mask: np.ndarray, confirm_bars: int) -> np.ndarray:
+    """out[t] = preço do último swing em mask até t - confirm_bars (NaN se nenhum)."""
+    return _price_at(price, _last_bars(mask, confirm_bars))
+
+
+class SortedLevels:
+    """
+    Níveis de swing ordenados por preço (listas + bisect).
+    bars[i] = candle a partir do qual o nível i vale (swing + confirmação).
+    touches[i] = quantos swings o nível reúne (1, ou o tamanho do cluster em clustered()).
+
+    Consultas as-of usam uma árvore de Fenwick sobre os níveis em ordem de candle:
+    cada nó guarda os preços de um bloco já ordenados, e o prefixo "níveis com
+    bar <= as_of" vira O(log n) blocos com uma busca binária em cada (O(log² n)).
+    """
+
+    def __init__(self, prices=(), bars=(), touches=None):
+        prices = np.asarray(prices, dtype="float64")
+        order = np.argsort(prices, kind="stable")
+        self.prices: list[float] = prices[order].tolist()
+        self.bars: list[int] = np.asarray(bars, dtype="int64")[order].tolist()
+        if touches is None:
+            self.touches: list[int] = [1] * len(self.prices)
+        else:
+            self.touches = np.asarray(touches, dtype="int64")[order].tolist()
+        self._clusters: dict = {}
+        self._tree: Optional[tuple[list[int], list[float], list[list[float]]]] = None
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def add(self, price: float, bar: int) -> None:
+        """Novo swing (uso live): inserção ordenada."""
+        k = bisect_right(self.prices, price)
+        self.prices.insert(k, float(price))
+        self.bars.insert(k, int(bar))
+        self.touches.insert(k, 1)
+        self._clusters.clear()
+
+        # swing mais novo que todos (caso live): só acrescenta um nó na árvore as-of
+        if self._tree is not None:
+            tree_bars, tree_prices, nodes = self._tree
+            if tree_bars and bar < tree_bars[-1]:
+                self._tree = None
+            else:
+                tree_bars.append(int(bar))
+                tree_prices.append(float(price))
+                i = len(tree_bars)
+                nodes.append(sorted(tree_prices[i - (i & -i):i]))
+
+    def _asof_tree(self) -> tuple[list[int], list[float], list[list[float]]]:
+        """(bars em ordem, preços na mesma ordem, nós da Fenwick; nó i cobre (i - lowbit(i), i])."""
+        if self._tree is None:
+            order = np.argsort(np.asarray(self.bars, dtype="int64"), kind="stable")
+            tree_bars = np.asarray(self.bars, dtype="int64")[order].tolist()
+            ordered = np.asarray(self.prices, dtype="float64")[order]
+            n = len(ordered)
+
+            # nós de lowbit 2^j cobrem blocos alternados de tamanho 2^j: um np.sort por nível
+            nodes: list = [None] * (n + 1)
+            nodes[0] = []
+            size = 1
+            while size <= n:
+                count = n // size
+                blocks = np.sort(ordered[:count * size].reshape(count, size), axis=1)[::2]
+                for m, block in enumerate(blocks.tolist()):
+                    nodes[(2 * m + 1) * size] = block
+                size *= 2
+            self._tree = (tree_bars, ordered.tolist(), nodes)
+        return self._tree
+
+    def at_or_below(self, price: float, as_of: Optional[int] = None) -> Optional[float]:
+        """Maior nível <= price; com as_of, só entre os níveis que já existiam no candle as_of."""
+        if as_of is None:
+            k = bisect_right(self.prices, price) - 1
+            return self.prices[k] if k >= 0 else None
+
+        tree_bars, _, nodes = self._asof_tree()
+        best = None
+        i = bisect_right(tree_bars, as_of)
+        while i > 0:
+            node = nodes[i]
+            k = bisect_right(node, price) - 1
+            if k >= 0 and (best is None or node[k] > best):
+                best = node[k]
+            i -= i & -i
+        return best
+
+    def at_or_above(self, price: float, as_of: Optional[int] = None) -> Optional[float]:
+        """Menor nível >= price (mesma regra de as_of)."""
+        if as_of is None:
+            k = bisect_left(self.prices, price)
+            return self.prices[k] if k < len(self.prices) else None
+
+        tree_bars, _, nodes = self._asof_tree()
+        best = None
+        i = bisect_right(tree_bars, as_of)
+        while i > 0:
+            node = nodes[i]
+            k = bisect_left(node, price)
+            if k < len(node) and (best is None or node[k] < best):
+                best = node[k]
+            i -= i & -i
+        return best
+
+    def clustered(self, tolerance: float) -> "SortedLevels":
+        """
+        Agrupa níveis próximos: cada cluster começa no menor nível ainda livre e reúne
+        os níveis até tolerance acima dele (ex.: 0.002 = 0.2%), sem encadear vizinhos.
+        Preço do cluster = média dos níveis; `touches` = quantos swings ele reúne.
+        Usa todos os níveis do índice (não é as-of).
+        """
+        if tolerance not in self._clusters:
+            prices = np.asarray(self.prices, dtype="float64")
+            bars = np.asarray(self.bars, dtype="int64")
+            touches = np.asarray(self.touches, dtype="int64")
+
+            starts = []
+            k = 0
+            while k < len(prices):
+                starts.append(k)
+                k = int(np.searchsorted(prices, prices[k] + tolerance * abs(prices[k]), side="right"))
+
+            if starts:
+                starts = np.asarray(starts)
+                counts = np.add.reduceat(touches, starts)
+                means = np.add.reduceat(prices, starts) / np.diff(np.r_[starts, len(prices)])
+                last_bar = np.maximum.reduceat(bars, starts)
+            else:
+                means, last_bar, counts = prices, bars, touches
+
+            self._clusters[tolerance] = SortedLevels(means, last_bar, counts)
+        return self._clusters[tolerance]
+
+
+class SwingLevelIndex:
+    """
+    Índice de suporte/resistência pré-calculado a partir dos swings de um frame.
+
+    - last_low[t] / last_high[t]: último swing low/high válido no candle t
+      (forward-fill, com `confirm_bars` de atraso) -> levels_at(t) é O(1)
+    - níveis históricos ordenados por preço -> nearest_support/resistance(price) é O(log n),
+      opcionalmente sobre clusters de níveis próximos (tolerance)
+    """
+
+    def __init__(self, df: pd.DataFrame, confirm_bars: int = 0):
+        if confirm_bars < 0:
+            raise ValueError("confirm_bars precisa ser >= 0.")
+
+        self.index = df.index
+        self.confirm_bars = confirm_bars
+
+        high = df["high"].to_numpy(dtype="float64")
+        low = df["low"].to_numpy(dtype="float64")
+        swing_high = df["swing_high"].to_numpy(dtype=bool)
+        swing_low = df["swing_low"].to_numpy(dtype=bool)
+
+        # posição do último swing válido em cada candle (-1 = nenhum ainda)
+        self.last_high_bar = _last_bars(swing_high, confirm_bars)
+        self.last_low_bar = _last_bars(swing_low, confirm_bars)
+        self.last_high = _price_at(high, self.last_high_bar)
+        self.last_low = _price_at(low, self.last_low_bar)
+
+        high_bars = np.flatnonzero(swing_high)
+        low_bars = np.flatnonzero(swing_low)
+        self.highs = SortedLevels(high[high_bars], high_bars + confirm_bars)
+        self.lows = SortedLevels(low[low_bars], low_bars + confirm_bars)
+        self._all: Optional[SortedLevels] = None
+
+    def __len__(self) -> int:
+        return len(self.last_low)
+
+    # --- as-of ---
+
+    def levels_at(self, bar: int = -1) -> dict:
+        """
+        Suporte (último swing low) e resistência (último swing high) no candle `bar`.
+        None = ainda não há swing; um swing com preço NaN continua NaN.
+        """
+        if len(self) == 0:
+            return {"support": None, "resistance": None}
+        return {
+            "support": None if self.last_low_bar[bar] < 0 else float(self.last_low[bar]),
+            "resistance": None if self.last_high_bar[bar] < 0 else float(self.last_high[bar]),
+        }
+
+    def bar_asof(self, when) -> int:
+        """Posição do último candle com índice <= when (-1 se nenhum)."""
+        return int(self.index.searchsorted(pd.Timestamp(when), side="right")) - 1
+
+    def levels_asof(self, when) -> dict:
+        bar = self.bar_asof(when)
+        if bar < 0:
+            return {"support": None, "resistance": None}
+        return self.levels_at(bar)
+
+    # --- níveis históricos ---
+
+    def _levels(self, source: str) -> SortedLevels:
+        if source == "low":
+            return self.lows
+        if source == "high":
+            return self.highs
+        if source == "all":
+            if self._all is None:
+                self._all = SortedLevels(
+                    self.lows.prices + self.highs.prices,
+                    self.lows.bars + self.highs.bars,
+                    self.lows.touches + self.highs.touches,
+                )
+            return self._all
+        raise ValueError(f"source inválido: {source!r} (use {', '.join(LEVEL_SOURCES)}).")
+
+    def _query_levels(self, source: str, as_of: Optional[int], tolerance: Optional[float]) -> SortedLevels:
+        levels = self._levels(source)
+        if tolerance is None:
+            return levels
+        if as_of is not None:
+            raise ValueError("Clusters usam todos os níveis do índice: não combine tolerance com as_of.")
+        return levels.clustered(tolerance)
+
+    def nearest_support(
+            self,
+            price: float,
+            as_of: Optional[int] = None,
+            source: str = "low",
+            tolerance: Optional[float] = None
+    ) -> Optional[float]:
+        """Nível mais próximo <= price (swing lows por padrão; source="all" usa highs também)."""
+        return self._query_levels(source, as_of, tolerance).at_or_below(price, as_of)
+
+    def nearest_resistance(
+            self,
+            price: float,
+            as_of: Optional[int] = None,
+            source: str = "high",
+            tolerance: Optional[float] = None
+    ) -> Optional[float]:
+        """Nível mais próximo >= price (swing highs por padrão)."""
+        return self._query_levels(source, as_of, tolerance).at_or_above(price, as_of)
+
+    def clusters(self, tolerance: float, source: str = "all") -> pd.DataFrame:
+        """Tabela de clusters (preço médio, toques, último candle) para inspeção/gráfico."""
+        clustered = self._levels(source).clustered(tolerance)
+        return pd.DataFrame({"price": clustered.prices, "touches": clustered.touches, "last_bar": clustered.bars})
@@ -1,17 +1,61 @@
+import math
+from typing import Optional
+
+import numpy as np
 import pandas as pd
 
+from data.frame_cache import FrameCache, cache_key, frame_fingerprint
+from data.timeframes import epoch_ms, timeframe_to_ms
+from indicators.ema import EMA_SPANS, IncrementalEMA
+from indicators.price_action import IncrementalSwings
+from strategy.levels import SwingLevelIndex
+from utils import instrumentation
+
+BIAS_LABELS = np.array(["neutral", "long", "short"], dtype=object)
+
+# EMAs (média, lenta) usadas no bias e na zona
+EMA_COLUMNS = ("ema_21", "ema_50")
+
+# colunas de cada frame que o walk_forward lê além das EMAs (entram no fingerprint do cache)
+WALK_FORWARD_COLUMNS_1D = ("close",)
+WALK_FORWARD_COLUMNS_4H = ("high", "low", "swing_high", "swing_low")
+
+
+def _asof_rows(available_at: np.ndarray, when: np.ndarray) -> np.ndarray:
+    """
+    Join "as-of": para cada instante em `when`, a última linha com available_at <= instante
+    (-1 se nenhuma ainda estava disponível).
+    """
+    return np.searchsorted(available_at, when, side="right") - 1
+
 
 class Positioning:
-    def __init__(self, df_1d: pd.DataFrame, df_4h: pd.DataFrame):
-        self.df_1d = df_1d.copy()
-        self.df_4h = df_4h.copy()
+    """
+    Bias 1D + zona 4H. Nada aqui altera df_1d/df_4h, então copy=False
+    (frames vindos de um IndicatorPipeline) é seguro.
+
+    ema_columns: colunas (média, lenta) lidas nos dois frames, ex.: ("ema_34", "ema_89")
+    quando as EMAs foram calculadas com outros spans.
+    """
+
+    def __init__(
+            self,
+            df_1d: pd.DataFrame,
+            df_4h: pd.DataFrame,
+            copy: bool = True,
+            ema_columns: tuple[str, str] = EMA_COLUMNS
+    ):
+        self.df_1d = df_1d.copy() if copy else df_1d
+        self.df_4h = df_4h.copy() if copy else df_4h
+        self.ema_columns = tuple(ema_columns)
+        self._levels_4h: Optional[SwingLevelIndex] = None
 
     @staticmethod
-    def _bias_from_ema(df: pd.DataFrame) -> str:
+    def _bias_from_ema(df: pd.DataFrame, ema_columns: tuple[str, str] = EMA_COLUMNS) -> str:
         last = df.iloc[-1]
         close = float(last["close"])
-        ema21 = float(last["ema_21"])
-        ema50 = float(last["ema_50"])
+        ema21 = float(last[ema_columns[0]])
+        ema50 = float(last[ema_columns[1]])
 
         if close > ema21 and ema21 > ema50:
             return "long"
@@ -21,22 +65,30 @@ class Positioning:
 
     @staticmethod
     def _key_levels(df: pd.DataFrame) -> dict:
-        last_low = df[df["swing_low"]].tail(1)
-        last_high = df[df["swing_high"]].tail(1)
+        return SwingLevelIndex(df).levels_at(-1)
 
-        support = float(last_low["low"].iloc[0]) if len(last_low) else None
-        resistance = float(last_high["high"].iloc[0]) if len(last_high) else None
-        return {"support": support, "resistance": resistance}
+    @property
+    def levels_4h(self) -> SwingLevelIndex:
+        """Índice de swings do 4H (calculado uma vez por instância)."""
+        if self._levels_4h is None:
+            self._levels_4h = SwingLevelIndex(self.df_4h)
+        return self._levels_4h
 
     @staticmethod
-    def _interest_zone(df: pd.DataFrame, bias: str, levels: dict, padding: float = 0.015) -> dict:
+    def _interest_zone(
+            df: pd.DataFrame,
+            bias: str,
+            levels: dict,
+            padding: float = 0.015,
+            ema_columns: tuple[str, str] = EMA_COLUMNS
+    ) -> dict:
         """
         Zona de interesse = confluência EMA (21-50) + proximidade de suporte/resistência.
         padding = tolerância (1.5%) em torno do suporte/resistência.
         """
         last = df.iloc[-1]
-        ema21 = float(last["ema_21"])
-        ema50 = float(last["ema_50"])
+        ema21 = float(last[ema_columns[0]])
+        ema50 = float(last[ema_columns[1]])
 
         ema_low, ema_high = (min(ema21, ema50), max(ema21, ema50))
 
@@ -51,15 +103,18 @@ class Positioning:
 
         return {"buy_zone": None, "sell_zone": None}
 
+    @instrumentation.timed("positioning", rows=None)
     def summary(self) -> dict:
         """
         Bias final vem do 1D.
         Zona e níveis vêm do 4H (setup).
         """
-        bias_1d = self._bias_from_ema(self.df_1d)
+        bias_1d = self._bias_from_ema(self.df_1d, self.ema_columns)
 
-        levels_4h = self._key_levels(self.df_4h)
-        zones_4h = self._interest_zone(self.df_4h, bias_1d, levels_4h)
+        levels_4h = self.levels_4h.levels_at(-1)
+        zones_4h = self._interest_zone(
+            self.df_4h, bias_1d, levels_4h, ema_columns=self.ema_columns
+        )
 
         invalidation = None
 
@@ -85,3 +140,220 @@ class Positioning:
             "sell_zone_4h": zones_4h["sell_zone"],
             "invalidation": invalidation,
         }
+
+    @instrumentation.timed("positioning_walk_forward")
+    def walk_forward(
+            self,
+            df_15m: pd.DataFrame,
+            timeframe_1d: str = "1d",
+            timeframe_4h: str = "4h",
+            timeframe_15m: str = "15m",
+            swing_confirm_bars: int = 1,
+            cache: Optional[FrameCache] = None
+    ) -> pd.DataFrame:
+        """
+        Fase 3.0: mesmo raciocínio do summary(), mas como série temporal (sem lookahead).
+
+        - bias 1D, zona 4H e suporte/resistência 4H são calculados em CADA candle 1D/4H
+        - um candle 1D/4H só vale depois de fechado (abertura + timeframe)
+        - um swing só vale depois de confirmado (swing_confirm_bars candles depois, = `right`)
+        - cada candle 15m recebe o contexto disponível no fechamento dele (join as-of único)
+
+        Retorna DataFrame no índice do 15m com:
+        bias_final, support_4h, resistance_4h, zone_low, zone_high, invalidation
+        (zona/invalidação NaN quando o bias é neutral).
+
+        cache: FrameCache opcional; com os mesmos candles/indicadores e parâmetros,
+        devolve o frame salvo em disco em vez de refazer o join.
+        """
+        params = (timeframe_1d, timeframe_4h, timeframe_15m, swing_confirm_bars)
+        if cache is None:
+            return self._walk_forward(df_15m, *params)
+
+        # hash de todas as linhas: correção no meio do histórico (ou do índice 15m) invalida
+        key = cache_key(
+            "walk_forward",
+            frame_fingerprint(self.df_1d, WALK_FORWARD_COLUMNS_1D + self.ema_columns, full=True),
+            frame_fingerprint(self.df_4h, WALK_FORWARD_COLUMNS_4H + self.ema_columns, full=True),
+            frame_fingerprint(df_15m, columns=(), full=True),
+            params,
+        )
+        return cache.get_or_compute(key, lambda: self._walk_forward(df_15m, *params))
+
+    def _walk_forward(
+            self,
+            df_15m: pd.DataFrame,
+            timeframe_1d: str,
+            timeframe_4h: str,
+            timeframe_15m: str,
+            swing_confirm_bars: int
+    ) -> pd.DataFrame:
+        df_1d, df_4h = self.df_1d, self.df_4h
+        mid, slow = self.ema_columns
+
+        # --- 1D: bias por candle ---
+        close = df_1d["close"].to_numpy(dtype="float64")
+        ema21 = df_1d[mid].to_numpy(dtype="float64")
+        ema50 = df_1d[slow].to_numpy(dtype="float64")
+        bias_code = np.where((close > ema21) & (ema21 > ema50), 1,
+                             np.where((close < ema21) & (ema21 < ema50), 2, 0))
+        ready_1d = epoch_ms(df_1d.index) + timeframe_to_ms(timeframe_1d)
+
+        # --- 4H: níveis (último swing confirmado) e zona EMA por candle ---
+        levels = SwingLevelIndex(df_4h, confirm_bars=swing_confirm_bars)
+        support, resistance = levels.last_low, levels.last_high
+        ema21_4h = df_4h[mid].to_numpy(dtype="float64")
+        ema50_4h = df_4h[slow].to_numpy(dtype="float64")
+        zone_low_4h = np.minimum(ema21_4h, ema50_4h)
+        zone_high_4h = np.maximum(ema21_4h, ema50_4h)
+        ready_4h = epoch_ms(df_4h.index) + timeframe_to_ms(timeframe_4h)
+
+        # --- join as-of no fechamento de cada candle 15m ---
+        decided_at = epoch_ms(df_15m.index) + timeframe_to_ms(timeframe_15m)
+        row_1d = _asof_rows(ready_1d, decided_at)
+        row_4h = _asof_rows(ready_4h, decided_at)
+        has_1d = row_1d >= 0
+        has_4h = row_4h >= 0
+
+        def pick(values: np.ndarray, rows: np.ndarray, ok: np.ndarray) -> np.ndarray:
+            out = np.full(len(rows), np.nan)
+            out[ok] = values[rows[ok]]
+            return out
+
+        bias = np.zeros(len(df_15m), dtype="int64")
+        bias[has_1d] = bias_code[row_1d[has_1d]]
+        # sem contexto 4H não há setup
+        bias[~has_4h] = 0
+
+        sup = pick(support, row_4h, has_4h)
+        res = pick(resistance, row_4h, has_4h)
+        zlow = pick(zone_low_4h, row_4h, has_4h)
+        zhigh = pick(zone_high_4h, row_4h, has_4h)
+
+        is_long = bias == 1
+        is_short = bias == 2
+
+        # invalidação: long = min(suporte, base da zona); short = max(resistência, topo da zona)
+        # (sem suporte/resistência -> sem invalidação, como no summary())
+        invalidation = np.full(len(df_15m), np.nan)
+        invalidation[is_long] = np.where(np.isnan(sup), np.nan, np.minimum(sup, zlow))[is_long]
+        invalidation[is_short] = np.where(np.isnan(res), np.nan, np.maximum(res, zhigh))[is_short]
+
+        neutral = ~(is_long | is_short)
+        zlow[neutral] = np.nan
+        zhigh[neutral] = np.nan
+
+        return pd.DataFrame(
+            {
+                "bias_final": BIAS_LABELS[bias],
+                "support_4h": sup,
+                "resistance_4h": res,
+                "zone_low": zlow,
+                "zone_high": zhigh,
+                "invalidation": invalidation,
+            },
+            index=df_15m.index,
+        )
+
+
+class IncrementalPositioning:
+    """
+    Contexto do walk_forward() atualizado candle a candle (modo live).
+
+    Recebe cada candle 1D/4H FECHADO (em ordem) e mantém só o estado necessário:
+    EMAs, janela de swings do 4H e último suporte/resistência confirmados.
+    state() devolve a mesma linha que walk_forward() daria para um candle 15m
+    decidido depois desses fechamentos (swing_confirm_bars = swing_right).
+
+    ema_columns: colunas (média, lenta) entre as EMAs de `spans`, como em Positioning;
+    None = as duas de maior span (ema_21/ema_50 com os spans padrão).
+    """
+
+    def __init__(
+            self,
+            swing_left: int = 1,
+            swing_right: int = 1,
+            spans: tuple[int, ...] = EMA_SPANS,
+            ema_columns: Optional[tuple[str, str]] = None
+    ):
+        self._ema_1d = IncrementalEMA(spans)
+        self._ema_4h = IncrementalEMA(spans)
+
+        available = list(self._ema_1d.values)
+        if ema_columns is None:
+            if len(set(spans)) < 2:
+                raise ValueError("spans precisa de pelo menos duas EMAs (média e lenta).")
+            ema_columns = tuple(f"ema_{span}" for span in sorted(set(spans))[-2:])
+        missing = [col for col in ema_columns if col not in available]
+        if missing:
+            raise ValueError(f"ema_columns {missing} não estão entre as EMAs calculadas: {available}")
+        self.ema_columns = tuple(ema_columns)
+        self._swings_4h = IncrementalSwings(swing_left, swing_right)
+
+        self.bias = "neutral"
+        self.support = math.nan
+        self.resistance = math.nan
+        self.zone_low = math.nan
+        self.zone_high = math.nan
+        self._has_4h = False
+
+    def update_1d(self, close: float) -> None:
+        emas = self._ema_1d.update(close)
+        mid, slow = self.ema_columns
+        close, ema21, ema50 = float(close), emas[mid], emas[slow]
+
+        if close > ema21 and ema21 > ema50:
+            self.bias = "long"
+        elif close < ema21 and ema21 < ema50:
+            self.bias = "short"
+        else:
+            self.bias = "neutral"
+
+    def update_4h(self, high: float, low: float, close: float) -> None:
+        emas = self._ema_4h.update(close)
+
+        # swing do candle confirmado agora (right candles atrás) passa a valer
+        confirmed = self._swings_4h.update(high, low)
+        if confirmed is not None:
+            _, swing_high, swing_low, h, l = confirmed
+            if swing_low:
+                self.support = l
+            if swing_high:
+                self.resistance = h
+
+        mid, slow = self.ema_columns
+        self.zone_low = float(np.minimum(emas[mid], emas[slow]))
+        self.zone_high = float(np.maximum(emas[mid], emas[slow]))
+        self._has_4h = True
+
+    def state(self) -> dict:
+        """Mesmas chaves de uma linha do walk_forward()."""
+        if not self._has_4h:
+            return {
+                "bias_final": "neutral",
+                "support_4h": math.nan,
+                "resistance_4h": math.nan,
+                "zone_low": math.nan,
+                "zone_high": math.nan,
+                "invalidation": math.nan,
+            }
+
+        bias = self.bias
+        invalidation = math.nan
+        zone_low, zone_high = self.zone_low, self.zone_high
+
+        if bias == "long":
+            invalidation = float(np.minimum(self.support, zone_low))
+        elif bias == "short":
+            invalidation = float(np.maximum(self.resistance, zone_high))
+        else:
+            zone_low = zone_high = math.nan
+
+        return {
+            "bias_final": bias,
+            "support_4h": self.support,
+            "resistance_4h": self.resistance,
+            "zone_low": zone_low,
+            "zone_high": zone_high,
+            "invalidation": invalidation,
+        }
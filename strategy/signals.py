@@ -0,0 +1,295 @@
+"""
+Sinais de entrada vetorizados e combináveis.
+
+Um Signal avalia a série INTEIRA de uma vez: signal(df_15m, side) -> array booleano
+com mask[i] == "gatilho no candle i" (só usa candles <= i, sem lookahead). Como é
+chamável com essa assinatura, qualquer Signal serve direto como entry_mask_fn.
+
+Composição (avaliada coluna a coluna, cada folha calculada uma vez por avaliação):
+
+    sig = get_signal("ema21_rejection") & within(get_signal("engulfing"), 3) & ~get_signal("bos")
+    sig = parse_signal("ema21_rejection & within(engulfing, 3) & ~bos")   # mesmo sinal
+
+Funções antigas "por candle" (fn(df[:i+1], side) -> bool) entram via BarSignal.
+"""
+import ast
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators.price_action import swing_masks
+from strategy.entry import EntrySignal
+from strategy.levels import ffill_levels
+
+SIDES = ("long", "short")
+
+# nome -> fábrica que recebe parâmetros (kwargs) e devolve o Signal
+SIGNALS: Dict[str, Callable[..., "Signal"]] = {}
+
+
+class Signal(ABC):
+    """Base dos sinais: subclasses implementam _evaluate(df, side, cache)."""
+
+    name = "signal"
+
+    def __call__(self, df_15m: pd.DataFrame, side: str) -> np.ndarray:
+        return self.evaluate(df_15m, side)
+
+    def evaluate(self, df_15m: pd.DataFrame, side: str, cache: Optional[dict] = None) -> np.ndarray:
+        if side not in SIDES:
+            return np.zeros(len(df_15m), dtype=bool)
+        cache = {} if cache is None else cache
+        key = (self._cache_key(), side)
+        if key not in cache:
+            cache[key] = np.asarray(self._evaluate(df_15m, side, cache), dtype=bool)
+        return cache[key]
+
+    @abstractmethod
+    def _evaluate(self, df_15m: pd.DataFrame, side: str, cache: dict) -> np.ndarray:
+        """Máscara booleana do sinal em todos os candles (sem cache)."""
+
+    def _cache_key(self):
+        # folhas iguais (mesmo nome e parâmetros) dividem o resultado dentro de uma avaliação
+        return repr(self)
+
+    def last(self, df_15m: pd.DataFrame, side: str) -> bool:
+        """Adaptador inverso: valor no último candle (assinatura antiga por candle)."""
+        return bool(len(df_15m)) and bool(self.evaluate(df_15m, side)[-1])
+
+    def within(self, k: int) -> "Signal":
+        return Within(self, k)
+
+    def __and__(self, other: "Signal") -> "Signal":
+        return And(self, other)
+
+    def __or__(self, other: "Signal") -> "Signal":
+        return Or(self, other)
+
+    def __invert__(self) -> "Signal":
+        return Not(self)
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+class MaskSignal(Signal):
+    """Folha: função vetorizada fn(df_15m, side, **params) -> array booleano."""
+
+    def __init__(self, name: str, fn: Callable[..., np.ndarray], **params):
+        self.name = name
+        self.fn = fn
+        self.params = params
+
+    def _evaluate(self, df_15m, side, cache):
+        mask = np.asarray(self.fn(df_15m, side, **self.params), dtype=bool)
+        if mask.shape != (len(df_15m),):
+            raise ValueError(f"Sinal {self.name!r} devolveu shape {mask.shape}, esperado ({len(df_15m)},).")
+        return mask
+
+    def _cache_key(self):
+        # mesmo nome com outra função (MaskSignal criado à mão) não divide o resultado
+        return "mask", repr(self), id(self.fn)
+
+    def __repr__(self):
+        if not self.params:
+            return self.name
+        args = ", ".join(f"{k}={v!r}" for k, v in sorted(self.params.items()))
+        return f"{self.name}({args})"
+
+
+class BarSignal(Signal):
+    """
+    Adaptador para funções antigas por candle: fn(df_15m.iloc[:i + 1], side) -> bool.
+    Avalia uma vez por candle (lento; serve para comparar/migrar sinais antigos).
+    """
+
+    def __init__(self, fn: Callable[[pd.DataFrame, str], bool], name: Optional[str] = None):
+        self.fn = fn
+        self.name = name or getattr(fn, "__name__", "bar_signal")
+
+    def _evaluate(self, df_15m, side, cache):
+        mask = np.zeros(len(df_15m), dtype=bool)
+        for i in range(len(df_15m)):
+            mask[i] = bool(self.fn(df_15m.iloc[:i + 1], side))
+        return mask
+
+    def _cache_key(self):
+        return "bar", id(self.fn)
+
+    def __repr__(self):
+        return f"bar({self.name})"
+
+
+class And(Signal):
+    def __init__(self, left: Signal, right: Signal):
+        self.left, self.right = left, right
+
+    def _evaluate(self, df_15m, side, cache):
+        return self.left.evaluate(df_15m, side, cache) & self.right.evaluate(df_15m, side, cache)
+
+    def __repr__(self):
+        return f"({self.left!r} & {self.right!r})"
+
+
+class Or(Signal):
+    def __init__(self, left: Signal, right: Signal):
+        self.left, self.right = left, right
+
+    def _evaluate(self, df_15m, side, cache):
+        return self.left.evaluate(df_15m, side, cache) | self.right.evaluate(df_15m, side, cache)
+
+    def __repr__(self):
+        return f"({self.left!r} | {self.right!r})"
+
+
+class Not(Signal):
+    def __init__(self, inner: Signal):
+        self.inner = inner
+
+    def _evaluate(self, df_15m, side, cache):
+        return ~self.inner.evaluate(df_15m, side, cache)
+
+    def __repr__(self):
+        return f"~{self.inner!r}"
+
+
+class Within(Signal):
+    """True no candle i se `inner` deu True em algum candle de i - k até i."""
+
+    def __init__(self, inner: Signal, k: int):
+        if int(k) != k or k < 0:
+            raise ValueError("k precisa ser inteiro >= 0.")
+        self.inner = inner
+        self.k = int(k)
+
+    def _evaluate(self, df_15m, side, cache):
+        mask = self.inner.evaluate(df_15m, side, cache)
+        # soma acumulada: houve True em (i-k-1, i] se csum[i] - csum[i-k-1] > 0
+        csum = np.cumsum(mask, dtype="int64")
+        before = np.r_[np.zeros(self.k + 1, dtype="int64"), csum[:len(csum) - self.k - 1]]
+        return (csum - before[:len(csum)]) > 0
+
+    def __repr__(self):
+        return f"within({self.inner!r}, {self.k})"
+
+
+def within(signal: Signal, k: int) -> Signal:
+    return Within(signal, k)
+
+
+# --- registro ---
+
+def register_signal(name: str):
+    """
+    Decorator: registra fn(df_15m, side, **params) -> array booleano com o nome dado.
+    get_signal(name, **params) devolve o Signal correspondente.
+    """
+
+    def decorator(fn):
+        if name in SIGNALS:
+            raise ValueError(f"Sinal já registrado: {name!r}")
+        SIGNALS[name] = lambda **params: MaskSignal(name, fn, **params)
+        return fn
+
+    return decorator
+
+
+def get_signal(name: str, **params) -> Signal:
+    if name not in SIGNALS:
+        raise ValueError(f"Sinal desconhecido: {name!r} (disponíveis: {', '.join(sorted(SIGNALS))}).")
+    return SIGNALS[name](**params)
+
+
+def parse_signal(text: str) -> Signal:
+    """
+    Monta um Signal a partir de uma expressão (útil em CLI/config):
+        "ema21_rejection & within(engulfing, 3) | ~bos"
+        "wick_rejection(span=50, wick_ratio=0.6)"
+    Só aceita nomes registrados, &, |, ~, within(sinal, k) e parâmetros literais.
+    """
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"Expressão de sinal inválida: {text!r}") from exc
+    return _build(tree.body, text)
+
+
+def _build(node: ast.AST, text: str) -> Signal:
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+        left, right = _build(node.left, text), _build(node.right, text)
+        return left & right if isinstance(node.op, ast.BitAnd) else left | right
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Invert):
+        return ~_build(node.operand, text)
+    if isinstance(node, ast.Name):
+        return get_signal(node.id)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        if node.func.id == "within":
+            if len(node.args) != 2 or node.keywords:
+                raise ValueError(f"Use within(sinal, k) em {text!r}")
+            return Within(_build(node.args[0], text), ast.literal_eval(node.args[1]))
+        if node.args:
+            raise ValueError(f"Parâmetros de {node.func.id!r} precisam ser nomeados em {text!r}")
+        return get_signal(node.func.id, **{kw.arg: ast.literal_eval(kw.value) for kw in node.keywords})
+    raise ValueError(f"Trecho não suportado em {text!r}: {ast.unparse(node)!r}")
+
+
+# --- sinais embutidos ---
+
+def _ohlc(df_15m: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    return tuple(df_15m[col].to_numpy(dtype="float64") for col in ("open", "high", "low", "close"))
+
+
+@register_signal("ema21_rejection")
+def _ema21_rejection(df_15m: pd.DataFrame, side: str) -> np.ndarray:
+    return EntrySignal.ema21_rejection_mask(df_15m, side)
+
+
+@register_signal("wick_rejection")
+def _wick_rejection(df_15m: pd.DataFrame, side: str, span: int = 9, wick_ratio: float = 0.5) -> np.ndarray:
+    """
+    Pavio rejeitando a EMA `span` (9/21/50): o candle toca a EMA, fecha do lado do trade
+    e o pavio do lado da EMA ocupa pelo menos `wick_ratio` do range do candle.
+    """
+    column = f"ema_{span}"
+    if column not in df_15m.columns:
+        raise ValueError(f"Coluna {column!r} ausente: calcule as EMAs antes do sinal.")
+    ema = df_15m[column].to_numpy(dtype="float64")
+    o, h, l, c = _ohlc(df_15m)
+    rng = h - l
+
+    if side == "long":
+        wick = np.minimum(o, c) - l
+        return (l <= ema) & (c > ema) & (wick >= wick_ratio * rng) & (rng > 0)
+    wick = h - np.maximum(o, c)
+    return (h >= ema) & (c < ema) & (wick >= wick_ratio * rng) & (rng > 0)
+
+
+@register_signal("engulfing")
+def _engulfing(df_15m: pd.DataFrame, side: str) -> np.ndarray:
+    """Engolfo: corpo do candle atual (na direção do trade) cobre o corpo do anterior (contrário)."""
+    o, _, _, c = _ohlc(df_15m)
+    po, pc = np.r_[np.nan, o[:-1]], np.r_[np.nan, c[:-1]]
+
+    if side == "long":
+        return (pc < po) & (c > o) & (o <= pc) & (c >= po)
+    return (pc > po) & (c < o) & (o >= pc) & (c <= po)
+
+
+@register_signal("bos")
+def _break_of_structure(df_15m: pd.DataFrame, side: str, left: int = 1, right: int = 1) -> np.ndarray:
+    """
+    Quebra de estrutura: o fechamento cruza o último swing high (long) / swing low (short)
+    já CONFIRMADO no candle anterior (swing de i só vale em i + right). Só o candle do cruzamento.
+    """
+    _, h, l, c = _ohlc(df_15m)
+    swing_high, swing_low = swing_masks(h, l, left, right)
+
+    if side == "long":
+        level = ffill_levels(h, swing_high, right + 1)
+        prev_c = np.r_[np.nan, c[:-1]]
+        return (c > level) & ~(prev_c > level)
+    level = ffill_levels(l, swing_low, right + 1)
+    prev_c = np.r_[np.nan, c[:-1]]
+    return (c < level) & ~(prev_c < level)
@@ -0,0 +1,79 @@
+import threading
+import time
+from typing import Dict, Optional
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+from data.timeframes import timeframe_to_ms
+
+
+class FakeExchange:
+    """
+    Exchange local com a API síncrona do ccxt (fetch_ohlcv/milliseconds/rateLimit),
+    servindo candles de frames em memória até `now_ms` (o último candle servido
+    ainda está em formação, como numa exchange real).
+
+    - rate_limit_ms: chamadas mais próximas que isso levantam ccxt.RateLimitExceeded
+    - fail_every:    toda N-ésima chamada levanta ccxt.RateLimitExceeded (throttling forçado)
+    - duplicate:     repete o 1º candle de cada página (exchanges às vezes devolvem repetido)
+    """
+
+    def __init__(
+            self,
+            frames: Dict[tuple, pd.DataFrame],
+            now_ms: Optional[int] = None,
+            rate_limit_ms: float = 0.0,
+            fail_every: int = 0,
+            duplicate: bool = False
+    ):
+        self.rateLimit = rate_limit_ms
+        self.fail_every = fail_every
+        self.duplicate = duplicate
+        self.calls: list[dict] = []
+        self.throttled = 0
+
+        self._lock = threading.Lock()
+        self._last_call = -np.inf
+        self._data = {}
+        for key, df in frames.items():
+            ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+            rows = df[["open", "high", "low", "close", "volume"]].to_numpy(dtype="float64")
+            self._data[key] = (ts, rows)
+
+        if now_ms is None:
+            # padrão: no meio do último candle do maior frame
+            now_ms = max(int(ts[-1]) + timeframe_to_ms(tf) // 2 for (_, tf), (ts, _) in self._data.items())
+        self.now_ms = now_ms
+
+    def milliseconds(self) -> int:
+        return self.now_ms
+
+    def fetch_ohlcv(
+            self,
+            symbol: str,
+            timeframe: str = "1m",
+            since: Optional[int] = None,
+            limit: Optional[int] = None
+    ) -> list:
+        with self._lock:
+            now = time.monotonic() * 1000
+            too_fast = now - self._last_call < self.rateLimit
+            self._last_call = now
+            self.calls.append({"symbol": symbol, "timeframe": timeframe, "since": since, "limit": limit})
+            forced = self.fail_every and len(self.calls) % self.fail_every == 0
+            if too_fast or forced:
+                self.throttled += 1
+                raise ccxt.RateLimitExceeded("fake: too many requests")
+
+        ts, rows = self._data[(symbol, timeframe)]
+        end = int(np.searchsorted(ts, self.now_ms, side="right"))
+        limit = limit or 500
+        start = max(0, end - limit) if since is None else int(np.searchsorted(ts, since, side="left"))
+        end = min(end, start + limit)
+
+        page = [[int(t), *r] for t, r in zip(ts[start:end].tolist(), rows[start:end].tolist())]
+        if self.duplicate and page:
+            page.insert(1, list(page[0]))
+        return page
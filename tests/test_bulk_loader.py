@@ -0,0 +1,155 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_ohlcv
+from data.bulk_loader import BulkLoader, LoadJob
+from data.market_data import MarketData
+from data.store import OHLCVStore
+from tests.fakes import FakeExchange
+
+SYMBOLS = ("BTC/USDT", "ETH/USDT")
+
+
+def _frames(n=600, timeframe="15m"):
+    return {(s, timeframe): generate_ohlcv(n, seed=i, timeframe=timeframe) for i, s in enumerate(SYMBOLS)}
+
+
+def _ms(df, i):
+    return int(df.index[i].value // 1_000_000)
+
+
+def _market(exchange):
+    return MarketData(store=OHLCVStore(":memory:"), exchange=exchange)
+
+
+def _stored(market, symbol, timeframe="15m"):
+    return market._to_frame(market.store.load(market.exchange_name, symbol, timeframe))
+
+
+def test_load_pages_all_closed_candles_concurrently():
+    frames = _frames()
+    exchange = FakeExchange(frames)
+    market = _market(exchange)
+
+    since = _ms(frames[(SYMBOLS[0], "15m")], 0)
+    written = BulkLoader(market, max_workers=2, page_limit=100, rate_limit_ms=0).load(list(SYMBOLS), ["15m"], since)
+
+    for symbol in SYMBOLS:
+        source = frames[(symbol, "15m")]
+        # o último candle está em formação no relógio da exchange
+        assert written[(symbol, "15m")] == len(source) - 1
+        pd.testing.assert_frame_equal(_stored(market, symbol), source.iloc[:-1], check_freq=False)
+
+
+def test_pacing_respects_exchange_rate_limit():
+    frames = _frames(n=300)
+    exchange = FakeExchange(frames, rate_limit_ms=10)
+    market = _market(exchange)
+
+    # sem rate_limit_ms o loader usa exchange.rateLimit
+    assert BulkLoader(market).limiter.interval == 0.01
+
+    # folga para o jitter do sleep entre threads; se ainda assim algo for barrado, o retry cobre
+    loader = BulkLoader(market, max_workers=4, page_limit=50, rate_limit_ms=20, backoff_ms=1)
+    start = time.monotonic()
+    written = loader.load(list(SYMBOLS), ["15m"], _ms(frames[(SYMBOLS[0], "15m")], 0))
+    elapsed = time.monotonic() - start
+
+    # as 4 threads dividem um único relógio de requisições
+    assert elapsed >= (len(exchange.calls) - 1) * 0.02
+    assert exchange.throttled <= len(exchange.calls) // 4
+    assert all(count == 299 for count in written.values())
+
+
+def test_retries_throttled_requests():
+    frames = _frames(n=300)
+    exchange = FakeExchange(frames, fail_every=3)
+    market = _market(exchange)
+
+    loader = BulkLoader(market, max_workers=2, page_limit=50, rate_limit_ms=0, backoff_ms=1)
+    written = loader.load(list(SYMBOLS), ["15m"], _ms(frames[(SYMBOLS[0], "15m")], 0))
+
+    assert exchange.throttled > 0
+    assert all(count == 299 for count in written.values())
+
+
+def test_duplicate_rows_do_not_stop_paging():
+    frames = _frames(n=400)
+    exchange = FakeExchange(frames, duplicate=True)
+    market = _market(exchange)
+
+    symbol = SYMBOLS[0]
+    BulkLoader(market, page_limit=100, rate_limit_ms=0).load([symbol], ["15m"], _ms(frames[(symbol, "15m")], 0))
+    assert len(_stored(market, symbol)) == 399
+
+
+def test_recent_candles_in_store_do_not_skip_older_history():
+    frames = _frames()
+    exchange = FakeExchange(frames)
+    market = _market(exchange)
+    symbol = SYMBOLS[0]
+    source = frames[(symbol, "15m")]
+
+    # como depois de um get_ohlcv: só os últimos candles no store
+    market.store.upsert(market.exchange_name, symbol, "15m", source.iloc[-201:-1])
+
+    BulkLoader(market, page_limit=100, rate_limit_ms=0).load([symbol], ["15m"], _ms(source, 0))
+    pd.testing.assert_frame_equal(_stored(market, symbol), source.iloc[:-1], check_freq=False)
+    assert exchange.calls[0]["since"] == _ms(source, 0)
+
+
+def test_resume_from_first_missing_candle():
+    frames = _frames()
+    exchange = FakeExchange(frames)
+    market = _market(exchange)
+    symbol = SYMBOLS[0]
+    source = frames[(symbol, "15m")]
+
+    market.store.upsert(market.exchange_name, symbol, "15m", source.iloc[:250])
+    BulkLoader(market, page_limit=100, rate_limit_ms=0).load([symbol], ["15m"], _ms(source, 0))
+
+    assert exchange.calls[0]["since"] == _ms(source, 250)
+    assert len(_stored(market, symbol)) == len(source) - 1
+
+
+def test_resume_from_progress_file(tmp_path):
+    frames = _frames()
+    symbol = SYMBOLS[0]
+    source = frames[(symbol, "15m")]
+    progress = tmp_path / "progress.json"
+    market = _market(FakeExchange(frames))
+
+    # 1ª carga até o candle 300 e um buraco "real" da exchange no meio (candles 100..149)
+    market.store.upsert(market.exchange_name, symbol, "15m", source.iloc[:100])
+    market.store.upsert(market.exchange_name, symbol, "15m", source.iloc[150:300])
+    saved = {f"{symbol}|15m": {"since": _ms(source, 0), "last_ts": _ms(source, 299), "done": True}}
+    progress.write_text(json.dumps(saved))
+
+    exchange = FakeExchange(frames)
+    market.exchange = exchange
+    loader = BulkLoader(market, page_limit=100, rate_limit_ms=0, progress_path=str(progress))
+    loader.run([LoadJob(symbol, "15m", _ms(source, 0))])
+
+    # não volta para o buraco: continua depois do último candle percorrido
+    assert exchange.calls[0]["since"] == _ms(source, 299) + 1
+    entry = json.loads(progress.read_text())[f"{symbol}|15m"]
+    assert entry == {"since": _ms(source, 0), "last_ts": _ms(source, len(source) - 2), "done": True}
+
+
+def test_until_bounds_the_load():
+    frames = _frames()
+    exchange = FakeExchange(frames)
+    market = _market(exchange)
+    symbol = SYMBOLS[0]
+    source = frames[(symbol, "15m")]
+
+    loader = BulkLoader(market, page_limit=64, rate_limit_ms=0)
+    written = loader.run([LoadJob(symbol, "15m", _ms(source, 10), _ms(source, 210))])
+
+    assert written[(symbol, "15m")] == 200
+    stored = _stored(market, symbol)
+    assert stored.index[0] == source.index[10] and stored.index[-1] == source.index[209]
+    assert np.all(np.diff(stored.index.to_numpy()) > np.timedelta64(0))
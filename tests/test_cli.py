@@ -0,0 +1,13 @@
+from cli import IMPORT_BUDGET_MS, build_parser, importtime_report
+
+
+def test_offline_startup_within_budget_and_without_ccxt():
+    report = importtime_report()
+
+    assert report["network_modules"] == []
+    assert report["total_ms"] <= IMPORT_BUDGET_MS, report["top"]
+
+
+def test_sweep_passes_arguments_through():
+    args, extra = build_parser().parse_known_args(["sweep", "--param", "rr=1.5,2", "-h"])
+    assert args.command == "sweep" and extra == ["--param", "rr=1.5,2", "-h"]
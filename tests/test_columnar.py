@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_ohlcv
+from cli import main
+from data.columnar import CompactOHLCV
+from data.market_data import MarketData
+from data.store import OHLCVStore
+from indicators.pipeline import IndicatorPipeline
+
+
+def test_round_trip_matches_frame(tmp_path):
+    df = IndicatorPipeline(generate_ohlcv(5000)).run("swings", "structure")
+    cols = ["open", "high", "low", "close", "volume", "swing_high", "swing_low",
+            "structure_high", "structure_low", "structure"]
+
+    CompactOHLCV.from_frame(df, float32=False).save(str(tmp_path))
+    data = CompactOHLCV.open(str(tmp_path))
+    assert isinstance(data.columns["close"], np.memmap)
+
+    out = data.to_frame()
+    pd.testing.assert_frame_equal(out[cols], df[cols], check_freq=False)
+
+    # janela por tempo e últimos n: só as linhas pedidas
+    start, end = df.index[1000], df.index[1200]
+    pd.testing.assert_frame_equal(data.slice(start, end).to_frame()[cols], df.loc[start:end].iloc[:-1][cols],
+                                  check_freq=False)
+    pd.testing.assert_frame_equal(data.tail(300).to_frame()[cols], df.iloc[-300:][cols], check_freq=False)
+
+    small = CompactOHLCV.from_frame(df, float32=True).to_frame()
+    np.testing.assert_allclose(small["close"], df["close"], rtol=1e-6)
+
+
+def test_market_data_and_cli_read_the_compact_layout(tmp_path):
+    store = OHLCVStore(str(tmp_path / "ohlcv.sqlite"))
+    source = generate_ohlcv(40_000, timeframe="15m")
+    market = MarketData(offline=False, exchange=object())
+    for tf in ("1d", "4h"):
+        store.upsert("binance", "BTC/USDT", tf, market.resample(source, tf, "15m"))
+    store.upsert("binance", "BTC/USDT", "15m", source)
+
+    root = str(tmp_path / "compact")
+    assert main(["compact", "--db", store.path, "--out", root]) == 0
+
+    offline = MarketData(store=store, offline=True)
+    for tf in ("1d", "4h", "15m"):
+        pd.testing.assert_frame_equal(
+            offline.get_compact("BTC/USDT", tf, root, limit=500),
+            offline.get_ohlcv("BTC/USDT", tf, limit=500),
+            check_freq=False,
+        )
+
+    args = ["backtest", "--db", store.path, "--compact", root, "--cache-dir", "",
+            "--trades-csv", str(tmp_path / "trades.csv")]
+    assert main(args) == 0
@@ -0,0 +1,19 @@
+import json
+
+import numpy as np
+
+from benchmarks.synthetic import generate_ohlcv
+from dashboard.server import ChartDataServer, build_pyramid
+
+
+def test_chart_payload_with_nan_is_strict_json():
+    df = generate_ohlcv(3000, timeframe="1m")
+    df.iloc[10:20, df.columns.get_loc("close")] = np.nan
+    df.iloc[500, df.columns.get_loc("high")] = np.nan
+
+    server = ChartDataServer({"BTC/USDT 1m": build_pyramid(df, "1m")})
+    for points in (10, 20_000):
+        status, body = server.handle(f"/api/chart?points={points}")
+        assert status == 200
+        text = json.dumps(body, allow_nan=False)
+        assert "null" in text
@@ -0,0 +1,70 @@
+import pandas as pd
+
+from backtest.drilldown import ambiguous_trades, resolve_ambiguous
+
+T0 = pd.Timestamp("2024-01-01")
+MIN = pd.Timedelta(minutes=1)
+
+
+def _bar(i, high, low):
+    return {"timestamp": T0 + 15 * i * MIN, "open": 100.0, "high": high, "low": low, "close": 100.0, "volume": 1.0}
+
+
+def _frame(rows):
+    return pd.DataFrame(rows).set_index("timestamp")
+
+
+def _fixture():
+    # candles 2, 5 e 8 batem stop (99) E TP (102) de um long; o candle 11 só bate o stop
+    df_15m = _frame([_bar(i, 103.0 if i in (2, 5, 8) else 100.5, 98.0) for i in range(12)])
+    trades = pd.DataFrame([
+        {"side": "long", "entry_time": str(T0 + 15 * (i - 1) * MIN), "entry": 100.0, "stop": 99.0, "tp": 102.0,
+         "exit_time": str(T0 + 15 * i * MIN), "exit": 99.0, "result": "loss", "r": -1.0}
+        for i in (2, 5, 8, 11)
+    ])
+
+    # 1m: candle 2 bate TP antes do stop, candle 5 bate o stop antes; candle 8 sem dados de 1m
+    minutes = []
+    for bar, path in ((2, [(100.5, 99.5), (102.5, 100.0), (100.0, 98.0)]),
+                      (5, [(100.5, 99.5), (100.0, 98.5), (103.0, 100.0)])):
+        for m, (high, low) in enumerate(path):
+            minutes.append({"timestamp": T0 + (15 * bar + m) * MIN, "open": 100.0, "high": high, "low": low,
+                            "close": 100.0, "volume": 1.0})
+    return df_15m, trades, _frame(minutes)
+
+
+def test_ambiguous_exit_bars_resolved_with_1m():
+    df_15m, trades, minutes = _fixture()
+    calls = []
+
+    def loader(timeframe, since, until):
+        calls.append((timeframe, since, until))
+        ts = minutes.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+        return minutes[(ts >= since) & (ts < until)]
+
+    assert ambiguous_trades(trades, df_15m).tolist() == [0, 1, 2]
+    resolved, report = resolve_ambiguous(trades, df_15m, loader)
+
+    assert report["ambiguous"] == 3
+    assert report["changed"] == 1
+    assert report["confirmed_loss"] == 1
+    assert report["unresolved"] == 1
+    assert report["per_timeframe"]["1m"] == {"tp": 1, "stop": 1, "both": 0, "none": 1}
+    assert report["requests"] == len(calls) == 1 and calls[0][0] == "1m"
+    assert report["equity_r_before"] == -4.0 and report["equity_r_after"] == -1.0
+
+    # só o trade do candle 2 vira win no TP; os demais (e o original) ficam como estavam
+    assert resolved.iloc[0][["exit", "result", "r"]].tolist() == [102.0, "win", 2.0]
+    pd.testing.assert_frame_equal(resolved.iloc[1:], trades.iloc[1:])
+    assert trades.iloc[0]["result"] == "loss"
+
+
+def test_nothing_loaded_without_ambiguous_bars():
+    df_15m, trades, _ = _fixture()
+
+    def loader(timeframe, since, until):
+        raise AssertionError("não deveria buscar candles")
+
+    resolved, report = resolve_ambiguous(trades.iloc[[3]], df_15m, loader)
+    assert report["ambiguous"] == 0 and report["requests"] == 0
+    pd.testing.assert_frame_equal(resolved, trades.iloc[[3]])
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_ohlcv
+from data.frame_cache import TAIL_ROWS, FrameCache, frame_fingerprint
+
+
+@pytest.mark.parametrize("payload", [b"", b"not a pickle", b"\x80\x04\x95\xff\xff\x00\x00"])
+def test_corrupt_entry_is_a_miss_and_is_removed(tmp_path, payload):
+    cache = FrameCache(str(tmp_path))
+    cache.put("k", pd.DataFrame({"a": [1.0, 2.0]}))
+    path = tmp_path / "k.pkl"
+    path.write_bytes(payload)
+
+    assert cache.get("k") is None
+    assert not path.exists()
+
+    df = cache.get_or_compute("k", lambda: pd.DataFrame({"a": [3.0]}))
+    assert df["a"].tolist() == [3.0]
+    assert cache.get("k")["a"].tolist() == [3.0]
+
+
+def test_full_fingerprint_sees_edits_before_the_tail():
+    df = generate_ohlcv(TAIL_ROWS * 4, timeframe="1d")
+    edited = df.copy()
+    edited.iloc[0, edited.columns.get_loc("close")] += 1.0
+
+    assert frame_fingerprint(df) == frame_fingerprint(edited)
+    assert frame_fingerprint(df, full=True) != frame_fingerprint(edited, full=True)
+
+
+def _context_frames():
+    from data.market_data import MarketData
+    from indicators.pipeline import IndicatorPipeline
+
+    df_15m = generate_ohlcv(20_000, timeframe="15m")
+    market = MarketData(offline=False, exchange=object())
+    d1 = IndicatorPipeline(market.resample(df_15m, "1d", "15m")).run("swings", "emas")
+    h4 = IndicatorPipeline(market.resample(df_15m, "4h", "15m")).run("swings", "emas")
+    return d1, h4, df_15m
+
+
+def test_walk_forward_cache_sees_mid_history_edits(tmp_path):
+    from strategy.positioning import Positioning
+
+    cache = FrameCache(str(tmp_path))
+    d1, h4, df_15m = _context_frames()
+    # mesmo tamanho e mesmas pontas, buraco em lugares diferentes
+    gap_a, gap_b = df_15m.drop(df_15m.index[3000]), df_15m.drop(df_15m.index[15000])
+    Positioning(d1, h4).walk_forward(gap_a, cache=cache)
+
+    context = Positioning(d1, h4).walk_forward(gap_b, cache=cache)
+    assert context.index.equals(gap_b.index)
+
+    # swing corrigido no meio do 4H
+    h4 = h4.copy()
+    bar = int(h4["swing_low"].to_numpy().nonzero()[0][len(h4) // 20])
+    h4.iloc[bar, h4.columns.get_loc("low")] *= 0.9
+    expected = Positioning(d1, h4).walk_forward(gap_a)
+    pd.testing.assert_frame_equal(Positioning(d1, h4).walk_forward(gap_a, cache=cache), expected)
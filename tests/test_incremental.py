@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_ohlcv
+from indicators.ema import EMA_SPANS, EMAIndicator, IncrementalEMA
+from indicators.market_structure import IncrementalStructure, MarketStructure
+from indicators.price_action import IncrementalSwings, PriceAction
+
+
+def _history(n=3000, seed=11):
+    df = generate_ohlcv(n, seed=seed)
+    # preços arredondados geram empates (exercita ties) e alguns closes NaN (warm-up/buracos)
+    df[["high", "low"]] = df[["high", "low"]].round(-1)
+    df.iloc[[0, 1, 500, 501, 2000], df.columns.get_loc("close")] = np.nan
+    return df
+
+
+def test_ema_replay_matches_batch():
+    df = _history()
+    batch = EMAIndicator(df).calculate()
+
+    ema = IncrementalEMA()
+    replay = np.array([list(ema.update(c).values()) for c in df["close"]])
+
+    for j, span in enumerate(EMA_SPANS):
+        np.testing.assert_array_equal(replay[:, j], batch[f"ema_{span}"].to_numpy())
+
+
+@pytest.mark.parametrize("left,right,ties", [(1, 1, "strict"), (2, 3, "strict"), (2, 2, "first"), (3, 1, "last")])
+def test_swings_and_structure_replay_match_batch(left, right, ties):
+    df = _history()
+    batch = MarketStructure(PriceAction(df).detect_swings(left, right, ties)).add_structure()
+
+    swings = IncrementalSwings(left, right, ties)
+    structure = IncrementalStructure()
+    n = len(df)
+    swing_high = np.zeros(n, dtype=bool)
+    swing_low = np.zeros(n, dtype=bool)
+    labels = [[None] * n for _ in range(3)]
+
+    for i, (h, l) in enumerate(zip(df["high"], df["low"])):
+        out = swings.update(h, l)
+        if out is None:
+            continue
+        bar, is_high, is_low, bar_high, bar_low = out
+        # atraso de confirmação: o candle decidido é sempre o de `right` candles atrás
+        assert bar == i - right
+        swing_high[bar], swing_low[bar] = is_high, is_low
+        for k, label in enumerate(structure.update(is_high, bar_high, is_low, bar_low)):
+            labels[k][bar] = label
+
+    np.testing.assert_array_equal(swing_high, batch["swing_high"].to_numpy())
+    np.testing.assert_array_equal(swing_low, batch["swing_low"].to_numpy())
+    for k, col in enumerate(("structure_high", "structure_low", "structure")):
+        expected = batch[col].astype(object).where(batch[col].notna(), None).tolist()
+        assert labels[k] == expected
+
+
+@pytest.mark.parametrize("spans,ema_columns", [((9, 21, 50), None), ((34, 89), None), ((13, 34, 89), ("ema_13", "ema_89"))])
+def test_incremental_positioning_matches_walk_forward(spans, ema_columns):
+    import pandas as pd
+
+    from data.market_data import MarketData
+    from indicators.pipeline import IndicatorPipeline
+    from strategy.positioning import IncrementalPositioning, Positioning
+
+    df_15m = generate_ohlcv(12_000, seed=4)
+    market = MarketData(offline=False, exchange=object())
+    d1 = IndicatorPipeline(market.resample(df_15m, "1d", "15m")).swings().emas(spans).df
+    h4 = IndicatorPipeline(market.resample(df_15m, "4h", "15m")).swings().emas(spans).df
+
+    live = IncrementalPositioning(spans=spans, ema_columns=ema_columns)
+    columns = live.ema_columns
+    assert columns == (ema_columns or tuple(f"ema_{s}" for s in sorted(spans)[-2:]))
+    expected = Positioning(d1, h4, ema_columns=columns).walk_forward(df_15m)
+
+    closes_1d = d1.index + pd.Timedelta("1D")
+    closes_4h = h4.index + pd.Timedelta("4h")
+    i1 = i4 = 0
+    for bar in range(0, len(df_15m), 97):
+        decided = df_15m.index[bar] + pd.Timedelta("15min")
+        while i1 < len(d1) and closes_1d[i1] <= decided:
+            live.update_1d(d1["close"].iloc[i1])
+            i1 += 1
+        while i4 < len(h4) and closes_4h[i4] <= decided:
+            live.update_4h(h4["high"].iloc[i4], h4["low"].iloc[i4], h4["close"].iloc[i4])
+            i4 += 1
+        state = live.state()
+        row = expected.iloc[bar]
+        assert state["bias_final"] == row["bias_final"]
+        for key in ("support_4h", "resistance_4h", "zone_low", "zone_high", "invalidation"):
+            np.testing.assert_allclose(state[key], row[key], equal_nan=True)
+
+
+def test_incremental_positioning_rejects_unknown_columns():
+    from strategy.positioning import IncrementalPositioning
+
+    with pytest.raises(ValueError):
+        IncrementalPositioning(spans=(34, 89), ema_columns=("ema_21", "ema_50"))
+    with pytest.raises(ValueError):
+        IncrementalPositioning(spans=(21,))
@@ -0,0 +1,47 @@
+import pytest
+
+from backtest.engine import run_backtest_15m
+from benchmarks.synthetic import generate_ohlcv
+from indicators.ema import EMAIndicator
+from strategy.entry import EntrySignal
+from utils import instrumentation
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def _evaluations(df, side, zone, stop, mode) -> tuple[int, float]:
+    kwargs = {"entry_mask_fn": EntrySignal.ema21_rejection_mask} if mode == "vectorized" \
+        else {"entry_signal_fn": EntrySignal.ema21_rejection}
+    instrumentation.reset()
+    stats = run_backtest_15m(df, side, zone, stop, trades_csv_path=None, mode=mode, **kwargs)
+    return stats["trades"], instrumentation.report()["counters"].get("signal_evaluations", 0)
+
+
+@pytest.mark.parametrize("side", ["long", "short"])
+def test_signal_evaluations_match_between_modes(enabled, side):
+    df = EMAIndicator(generate_ohlcv(3000, seed=3)).calculate()
+    m = float(df["close"].median())
+    zone = (m * 0.97, m * 1.03)
+    stop = m * 0.9 if side == "long" else m * 1.1
+
+    loop = _evaluations(df, side, zone, stop, "loop")
+    vectorized = _evaluations(df, side, zone, stop, "vectorized")
+
+    assert loop[0] > 0
+    assert loop == vectorized
+
+
+def test_null_stage_ignores_writes():
+    instrumentation.disable()
+    with instrumentation.stage("a") as st:
+        st.rows = 10
+    with instrumentation.stage("b") as other:
+        assert other.rows is None
+    assert instrumentation.report()["stages"] == {}
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_ohlcv
+from indicators.price_action import PriceAction
+from strategy.context import MarketContext
+from strategy.levels import SortedLevels, SwingLevelIndex, ffill_levels
+
+
+def _brute(prices, bars, price, as_of, below):
+    ok = bars <= as_of
+    if below:
+        cand = prices[ok & (prices <= price)]
+        return float(cand.max()) if len(cand) else None
+    cand = prices[ok & (prices >= price)]
+    return float(cand.min()) if len(cand) else None
+
+
+def test_asof_queries_match_brute_force():
+    rng = np.random.default_rng(7)
+    prices = rng.normal(100, 10, 3000)
+    bars = rng.integers(0, 10_000, 3000)
+    levels = SortedLevels(prices, bars)
+
+    for price, as_of in zip(rng.normal(100, 15, 2000), rng.integers(-10, 10_100, 2000)):
+        assert levels.at_or_below(price, int(as_of)) == _brute(prices, bars, price, as_of, True)
+        assert levels.at_or_above(price, int(as_of)) == _brute(prices, bars, price, as_of, False)
+
+
+def test_live_add_keeps_asof_index():
+    rng = np.random.default_rng(3)
+    prices, bars = rng.normal(100, 10, 200), np.arange(200)
+    levels = SortedLevels(prices[:100], bars[:100])
+    levels.at_or_below(100.0, 50)  # monta a árvore as-of
+
+    for p, b in zip(prices[100:], bars[100:]):
+        levels.add(p, b)
+    levels.add(150.0, 10)  # fora de ordem: árvore é refeita na próxima consulta
+
+    all_prices, all_bars = np.r_[prices, 150.0], np.r_[bars, 10]
+    for as_of in (0, 10, 99, 150, 199):
+        for price in (80.0, 100.0, 149.0, 151.0):
+            assert levels.at_or_below(price, as_of) == _brute(all_prices, all_bars, price, as_of, True)
+            assert levels.at_or_above(price, as_of) == _brute(all_prices, all_bars, price, as_of, False)
+
+
+def test_clusters_carry_touches():
+    levels = SortedLevels([100.0, 100.1, 100.15, 105.0, 105.2], [1, 2, 3, 4, 5])
+    clusters = levels.clustered(0.002)
+
+    assert clusters.touches == [3, 2]
+    assert np.allclose(clusters.prices, [100.0833333, 105.1])
+    assert clusters.clustered(0.1).touches == [5]
+
+
+def test_confirm_bars_longer_than_frame():
+    price = np.array([1.0, 2.0, 3.0])
+    mask = np.array([True, False, True])
+    assert len(ffill_levels(price, mask, 5)) == 3
+    assert np.isnan(ffill_levels(price, mask, 5)).all()
+
+    df = PriceAction(generate_ohlcv(4)).detect_swings()
+    assert len(SwingLevelIndex(df, confirm_bars=10)) == 4
+
+
+def test_get_levels_keeps_nan_price():
+    df = PriceAction(generate_ohlcv(50)).detect_swings()
+    first_low = int(np.flatnonzero(df["swing_low"])[0])
+    df.iloc[first_low, df.columns.get_loc("low")] = np.nan
+
+    levels = MarketContext(df).get_levels(bar=first_low)
+    assert levels["support"] is not None and np.isnan(levels["support"])
+    assert MarketContext(df.iloc[:1]).get_levels() == {"support": None, "resistance": None}
@@ -0,0 +1,82 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from backtest.signal_log import SignalDataset
+from live.runner import LiveRunner, TradePolicy, _simulated, _valid_entry
+
+SYMBOL = "BTC/USDT"
+DAYS = 20
+
+
+def _always(bar, side):
+    return True
+
+
+def _replay(tmp_path, mode, **kwargs):
+    """Roda o runner sobre DAYS dias sintéticos com exchange e relógio fake."""
+    exchange, clock, end = _simulated([SYMBOL], DAYS, delay_ms=0.0)
+    runner = LiveRunner(
+        exchange, [SYMBOL], mode=mode, clock=clock, entry_signal_fn=_always,
+        signals_path=str(tmp_path / "signals"), trades_path=str(tmp_path / "trades_live.csv"),
+        **kwargs,
+    )
+    asyncio.run(runner.run(until_ms=end))
+    return runner, exchange
+
+
+def test_collect_replay_decides_every_closed_candle(tmp_path):
+    runner, exchange = _replay(tmp_path, "collect")
+    ts, rows = exchange._data[(SYMBOL, "15m")]
+
+    assert runner.steps == DAYS * 96
+    times = [d["time"] for d in runner.decisions]
+    assert times == list(pd.to_datetime(ts[-DAYS * 96:], unit="ms"))
+    assert any(d["setup"] for d in runner.decisions)
+    assert runner.stats()["latency_ms_p50"] < 100
+
+
+def test_collect_accepted_needs_a_valid_stop_at_the_next_open(tmp_path):
+    runner, exchange = _replay(tmp_path, "collect")
+    ts, rows = exchange._data[(SYMBOL, "15m")]
+    opens = dict(zip(pd.to_datetime(ts, unit="ms"), rows[:, 0]))
+
+    stored = SignalDataset(str(tmp_path / "signals")).load(SYMBOL)
+    decisions = list(runner.decisions)
+
+    # o último candle espera o open seguinte (mesma regra do signal_frame)
+    assert len(stored) == len(decisions) - 1
+    expected = [
+        d["setup"] and _valid_entry(d["bias"], d["invalidation"], opens[nxt["time"]])
+        for d, nxt in zip(decisions, decisions[1:])
+    ]
+    assert stored["accepted"].tolist() == expected
+    assert any(expected)
+
+
+def test_trades_per_day_count_only_opened_trades(tmp_path):
+    policy = TradePolicy(max_trades_per_day=1, cooldown_bars_after_loss=0, half_zone=False)
+    runner, _ = _replay(tmp_path, "trade", policy=policy)
+    state = runner._states[SYMBOL]
+
+    opened = len(runner.trades) + (state.position is not None)
+    assert opened > 0
+    assert sum(state.trades_by_day.values()) == opened
+    assert max(state.trades_by_day.values()) <= 1
+
+    # entrada decidida mas inválida no open seguinte: não consome o limite do dia
+    state.position, state.trades_by_day = None, {}
+    state.pending = {"side": "long", "stop": 101.0}
+    runner._manage_position(state, 0, pd.Timestamp(0, unit="ms"), 100.0, 102.0, 99.0)
+    assert state.position is None and state.trades_by_day == {}
+
+
+def test_trade_log_survives_restarts(tmp_path):
+    first, _ = _replay(tmp_path, "trade")
+    second, _ = _replay(tmp_path, "trade")
+
+    log = pd.read_csv(tmp_path / "trades_live.csv")
+    assert len(first.trades) > 0
+    assert len(log) == len(first.trades) + len(second.trades)
+    assert np.isfinite(log["r"].to_numpy()).all()
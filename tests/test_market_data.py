@@ -0,0 +1,105 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_ohlcv
+from data.market_data import MarketData
+from data.store import OHLCVStore
+from tests.fakes import FakeExchange
+
+SYMBOL = "BTC/USDT"
+
+
+def _setup(n=1000):
+    source = generate_ohlcv(n, timeframe="15m")
+    exchange = FakeExchange({(SYMBOL, "15m"): source})
+    return source, exchange, MarketData(store=OHLCVStore(":memory:"), exchange=exchange)
+
+
+def test_first_fetch_stores_only_closed_candles():
+    source, exchange, market = _setup()
+    df = market.get_ohlcv(SYMBOL, "15m", limit=200)
+
+    # a exchange devolve os últimos 200 com o último em formação: o que falta vem para trás
+    pd.testing.assert_frame_equal(df, source.iloc[-201:-1], check_freq=False)
+    assert market.store.last_timestamp("binance", SYMBOL, "15m") == int(source.index[-2].value // 1_000_000)
+
+
+def test_top_up_fetches_only_newer_candles():
+    source, exchange, market = _setup()
+    exchange.now_ms -= 50 * 15 * 60_000  # exchange "50 candles atrás"
+    market.get_ohlcv(SYMBOL, "15m", limit=200)
+    last = market.store.last_timestamp("binance", SYMBOL, "15m")
+
+    exchange.now_ms += 50 * 15 * 60_000
+    exchange.calls.clear()
+    df = market.get_ohlcv(SYMBOL, "15m", limit=200)
+
+    assert exchange.calls[0]["since"] == last + 1
+    pd.testing.assert_frame_equal(df, source.iloc[-201:-1], check_freq=False)
+
+
+def test_larger_limit_backfills_older_candles():
+    source, exchange, market = _setup()
+    market.get_ohlcv(SYMBOL, "15m", limit=100)
+
+    df = market.get_ohlcv(SYMBOL, "15m", limit=600)
+    pd.testing.assert_frame_equal(df, source.iloc[-601:-1], check_freq=False)
+
+    # sem histórico suficiente na exchange: devolve o que existe, sem erro
+    df = market.get_ohlcv(SYMBOL, "15m", limit=5000)
+    pd.testing.assert_frame_equal(df, source.iloc[:-1], check_freq=False)
+
+
+def test_offline_never_touches_the_exchange():
+    source, exchange, market = _setup()
+    market.get_ohlcv(SYMBOL, "15m", limit=300)
+    exchange.calls.clear()
+
+    offline = MarketData(store=market.store, offline=True, exchange=exchange)
+    df = offline.get_ohlcv(SYMBOL, "15m", limit=1000)
+
+    assert exchange.calls == []
+    pd.testing.assert_frame_equal(df, source.iloc[-301:-1], check_freq=False)
+
+
+def test_offline_requires_store():
+    with pytest.raises(ValueError):
+        MarketData(offline=True)
+
+
+def test_get_window_never_stores_the_open_candle():
+    source, exchange, market = _setup()
+    ts = source.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+    tf_ms = 15 * 60_000
+
+    df = market.get_window(SYMBOL, "15m", int(ts[-10]), int(ts[-1]) + tf_ms)
+
+    # o último candle servido ainda está em formação (now_ms no meio dele)
+    pd.testing.assert_frame_equal(df, source.iloc[-10:-1], check_freq=False)
+    assert market.store.last_timestamp("binance", SYMBOL, "15m") == int(ts[-2])
+
+
+def test_resample_cache_tells_apart_gaps_in_different_places():
+    source = generate_ohlcv(200, timeframe="1h")
+    extra = generate_ohlcv(201, timeframe="1h", seed=7).iloc[[-1]]
+    # mesmo tamanho e mesmas pontas, buraco no candle 10 vs no candle 50
+    a = pd.concat([source.drop(source.index[10]), extra]).sort_index()
+    b = pd.concat([source.drop(source.index[50]), extra]).sort_index()
+    assert len(a) == len(b) and a.index[0] == b.index[0] and a.index[-1] == b.index[-1]
+
+    cold = MarketData(offline=False, exchange=object())
+    expected = cold.resample(b, "4h", "1h")
+
+    warm = MarketData(offline=False, exchange=object())
+    warm.resample(a, "4h", "1h")
+    pd.testing.assert_frame_equal(warm.resample(b, "4h", "1h"), expected)
+
+
+def test_resample_cache_is_bounded():
+    from data.market_data import BUCKET_CACHE_SIZE
+
+    market = MarketData(offline=False, exchange=object())
+    df = generate_ohlcv(400, timeframe="1h")
+    for k in range(BUCKET_CACHE_SIZE + 10):
+        market.resample(df.iloc[k:], "4h", "1h")
+    assert len(market._bucket_cache) == BUCKET_CACHE_SIZE
@@ -0,0 +1,29 @@
+from benchmarks.synthetic import generate_ohlcv
+from indicators.market_structure import MarketStructure
+from indicators.pipeline import IndicatorPipeline
+from indicators.price_action import PriceAction
+
+
+def test_context_reuses_swing_parameters():
+    df = generate_ohlcv(2000)
+    pipeline = IndicatorPipeline(df).swings(left=2, right=2).structure()
+    before = pipeline.df[["swing_high", "swing_low", "structure_high", "structure_low"]].copy()
+
+    pipeline.context()
+
+    assert pipeline._done["swings"] == (2, 2, "strict")
+    assert "structure" in pipeline._done
+    assert pipeline.df[before.columns].equals(before)
+
+    expected = MarketStructure(PriceAction(df).detect_swings(2, 2)).add_structure()
+    assert before["swing_high"].equals(expected["swing_high"])
+    assert before["structure_high"].equals(expected["structure_high"])
+
+
+def test_context_on_fresh_pipeline_uses_defaults():
+    pipeline = IndicatorPipeline(generate_ohlcv(500))
+    summary = pipeline.context()
+
+    assert pipeline._done["swings"] == (1, 1, "strict")
+    assert {"ema_9", "ema_21", "ema_50"} <= set(pipeline.df.columns)
+    assert isinstance(summary, dict)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from backtest.portfolio import allocate_candidates, run_portfolio_backtest
+from benchmarks.synthetic import generate_ohlcv
+from data.market_data import MarketData
+
+
+def _prepared(symbol, entries, exits, r):
+    return {
+        "symbol": symbol,
+        "entry_ts": np.asarray(entries, dtype="int64"),
+        "exit_ts": np.asarray(exits, dtype="int64"),
+        "r": np.asarray(r, dtype="float64"),
+    }
+
+
+def test_one_open_position_per_symbol():
+    # 2ª candidata entra antes da 1ª sair; a 3ª entra no candle da saída (ainda aberta)
+    # e a 4ª depois dela
+    prepared = [_prepared("A", [0, 5, 10, 11], [10, 20, 30, 40], [2.0, -1.0, -1.0, 2.0])]
+    taken, closed, skipped = allocate_candidates(prepared, max_open_risk=10.0)
+
+    assert taken == [(0, 0), (0, 3)]
+    assert closed == [(10, 2.0), (40, 2.0)]
+    assert skipped == 0
+
+
+def test_shared_risk_cap():
+    prepared = [
+        _prepared("A", [0], [100], [2.0]),
+        _prepared("B", [1, 150], [100, 160], [-1.0, 2.0]),
+        _prepared("C", [2], [50], [2.0]),
+    ]
+    taken, closed, skipped = allocate_candidates(prepared, risk_per_trade=0.5, max_open_risk=1.0)
+
+    # A e B ocupam o orçamento; C fica de fora; B volta depois que tudo fechou
+    assert taken == [(0, 0), (1, 0), (1, 1)]
+    assert skipped == 1
+    assert closed == [(100, 1.0), (100, -0.5), (160, 1.0)]
+
+
+def test_merge_orders_candidates_across_symbols():
+    prepared = [
+        _prepared("A", [10, 40], [20, 50], [2.0, 2.0]),
+        _prepared("B", [5, 30], [8, 35], [-1.0, -1.0]),
+        _prepared("C", [10, 60], [15, 70], [2.0, 2.0]),
+    ]
+    taken, closed, _ = allocate_candidates(prepared, max_open_risk=10.0)
+
+    # ordem de entrada; empate (A e C em 10) segue a ordem dos símbolos
+    assert taken == [(1, 0), (0, 0), (2, 0), (1, 1), (0, 1), (2, 1)]
+    assert [ts for ts, _ in closed] == [8, 15, 20, 35, 50, 70]
+
+
+def test_portfolio_backtest_respects_limits():
+    market = MarketData(offline=False, exchange=object())
+    data = {}
+    for seed, symbol in enumerate(("AAA/USDT", "BBB/USDT", "CCC/USDT")):
+        df_15m = generate_ohlcv(20_000, seed=seed, timeframe="15m")
+        data[symbol] = (market.resample(df_15m, "1d", "15m"), market.resample(df_15m, "4h", "15m"), df_15m)
+
+    stats = run_portfolio_backtest(data, max_open_risk=2.0, workers=1)
+    trades = stats["trades_df"]
+    assert stats["trades"] == len(trades) > 0
+    assert trades["entry_time"].is_monotonic_increasing
+
+    events = pd.concat([
+        pd.DataFrame({"t": trades["entry_time"], "d": 1, "symbol": trades["symbol"]}),
+        pd.DataFrame({"t": trades["exit_time"], "d": -1, "symbol": trades["symbol"]}),
+    ])
+    # no mesmo instante a saída ainda conta como aberta: entradas primeiro
+    events = events.sort_values(["t", "d"], ascending=[True, False], kind="stable")
+    assert events["d"].cumsum().max() <= 2
+    assert events.groupby("symbol")["d"].cumsum().max() == 1
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from indicators.price_action import IncrementalSwings, swing_masks
+
+
+def _replay(high, low, left, right, ties):
+    swings = IncrementalSwings(left, right, ties)
+    out_high = np.zeros(len(high), dtype=bool)
+    for h, l in zip(high, low):
+        confirmed = swings.update(h, l)
+        if confirmed is not None:
+            out_high[confirmed[0]] = confirmed[1]
+    return out_high
+
+
+@pytest.mark.parametrize("ties,expected", [
+    ("strict", [0, 0, 0, 0]),
+    # limitação documentada: o platô [5, 5] é mais largo que a janela (right=1)
+    ("first", [0, 1, 0, 0]),
+    ("last", [0, 0, 0, 0]),
+])
+def test_plateau_wider_than_the_window(ties, expected):
+    high = np.array([1.0, 5.0, 5.0, 6.0])
+    low = high - 1
+    swing_high, _ = swing_masks(high, low, 1, 1, ties)
+    np.testing.assert_array_equal(swing_high, expected)
+    np.testing.assert_array_equal(_replay(high, low, 1, 1, ties), expected)
+
+
+def test_wider_window_covers_the_plateau():
+    high = np.array([1.0, 5.0, 5.0, 6.0, 2.0, 1.0])
+    swing_high, _ = swing_masks(high, high - 1, 1, 2, "first")
+    assert not swing_high[1]
+
+
+@pytest.mark.parametrize("left,right,ties,bar", [(1, 2, "first", 2), (2, 1, "last", 3)])
+def test_plateau_inside_the_window_marks_one_bar(left, right, ties, bar):
+    high = np.array([1.0, 2.0, 5.0, 5.0, 3.0, 1.0])
+    swing_high, _ = swing_masks(high, high - 1, left, right, ties)
+    assert np.flatnonzero(swing_high).tolist() == [bar]
+
+
+def test_swing_at_i_only_uses_bars_up_to_i_plus_right():
+    rng = np.random.default_rng(0)
+    high = np.round(rng.normal(100, 1, 400), 0)
+    low = high - 1
+    for ties in ("strict", "first", "last"):
+        full, _ = swing_masks(high, low, 2, 3, ties)
+        for end in (50, 123, 300):
+            part, _ = swing_masks(high[:end], low[:end], 2, 3, ties)
+            np.testing.assert_array_equal(part[:end - 3], full[:end - 3])
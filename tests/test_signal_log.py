@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtest.signal_log import SignalDataset, signal_frame
+from benchmarks.synthetic import generate_ohlcv
+
+
+def _context(df):
+    """Contexto fixo: bias long com zona larga em volta do preço e stop abaixo."""
+    c = df["close"].to_numpy()
+    return pd.DataFrame({
+        "bias_final": "long",
+        "zone_low": c.min() * 0.99,
+        "zone_high": c.max() * 1.01,
+        "invalidation": c.min() * 0.9,
+    }, index=df.index)
+
+
+class CountingMask:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, df, side):
+        self.calls.append(side)
+        return (np.arange(len(df)) % 7 == 0) if side == "long" else np.zeros(len(df), dtype=bool)
+
+
+def test_entry_mask_runs_once_per_side():
+    df = generate_ohlcv(200)
+    mask = CountingMask()
+    out = signal_frame(df, _context(df), "BTC/USDT", entry_mask_fn=mask)
+
+    assert sorted(mask.calls) == ["long", "short"]
+    assert out["trigger_long"].to_numpy().tolist() == (np.arange(199) % 7 == 0).tolist()
+
+
+def test_last_candle_is_left_for_the_next_append(tmp_path):
+    df = generate_ohlcv(300)
+    dataset = SignalDataset(str(tmp_path / "signals"))
+
+    # 1ª rodada termina num candle com gatilho: accepted dele só sai com o open seguinte
+    first = df.iloc[:211]
+    assert dataset.append(signal_frame(first, _context(df).iloc[:211], "BTC/USDT", CountingMask())) == 210
+    full = signal_frame(df, _context(df), "BTC/USDT", CountingMask())
+    assert dataset.append(full) == len(full) - 210
+
+    stored = dataset.load("BTC/USDT")
+    assert stored.index.equals(full.index)
+    assert stored["accepted"].to_numpy().tolist() == full["accepted"].to_numpy().tolist()
+    assert bool(stored.loc[df.index[210], "accepted"])
+
+
+def _dataset_with_parts(tmp_path):
+    df = generate_ohlcv(300)
+    dataset = SignalDataset(str(tmp_path / "signals"))
+    full = signal_frame(df, _context(df), "BTC/USDT", CountingMask())
+    for end in (101, 201):
+        dataset.append(signal_frame(df.iloc[:end], _context(df).iloc[:end], "BTC/USDT", CountingMask()))
+    dataset.append(full)
+    return dataset, full
+
+
+def test_compact_keeps_content_in_one_part(tmp_path):
+    dataset, full = _dataset_with_parts(tmp_path)
+    (month,) = dataset.months("BTC/USDT")
+    assert len(dataset._parts("BTC/USDT", month)) == 3
+
+    dataset.compact("BTC/USDT", month)
+
+    assert len(dataset._parts("BTC/USDT", month)) == 1
+    pd.testing.assert_frame_equal(dataset.load("BTC/USDT"), full, check_freq=False)
+
+
+def test_interrupted_compact_loses_nothing(tmp_path, monkeypatch):
+    dataset, full = _dataset_with_parts(tmp_path)
+    (month,) = dataset.months("BTC/USDT")
+
+    # queda no meio da limpeza: só a primeira parte antiga chega a ser apagada
+    removed = []
+
+    def crash(path):
+        if removed:
+            raise KeyboardInterrupt
+        removed.append(path)
+        remove(path)
+
+    remove = os.remove
+    with monkeypatch.context() as m:
+        m.setattr("backtest.signal_log.os.remove", crash)
+        try:
+            dataset.compact("BTC/USDT", month)
+        except KeyboardInterrupt:
+            pass
+
+    pd.testing.assert_frame_equal(dataset.load("BTC/USDT"), full, check_freq=False)
+    assert dataset.last_timestamp("BTC/USDT") == int(full.index[-1].value // 1_000_000)
+
+    dataset.compact("BTC/USDT", month)
+    directory = dataset._partition_dir("BTC/USDT", month)
+    assert len(os.listdir(directory)) == 1
+    pd.testing.assert_frame_equal(dataset.load("BTC/USDT"), full, check_freq=False)
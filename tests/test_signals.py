@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_ohlcv
+from indicators.ema import EMAIndicator
+from strategy.entry import EntrySignal
+from strategy.signals import (
+    SIGNALS, BarSignal, MaskSignal, Signal, Within, get_signal, parse_signal, register_signal, within,
+)
+
+
+@pytest.fixture(scope="module")
+def df():
+    return EMAIndicator(generate_ohlcv(600, seed=5)).calculate()
+
+
+def _const(mask):
+    return MaskSignal("const", lambda df_15m, side: np.asarray(mask, dtype=bool))
+
+
+@pytest.mark.parametrize("side", ["long", "short"])
+def test_bar_adapter_matches_vectorized_signal(df, side):
+    expected = get_signal("ema21_rejection")(df, side)
+    assert expected.any()
+    np.testing.assert_array_equal(BarSignal(EntrySignal.ema21_rejection)(df, side), expected)
+
+
+def test_combinators(df):
+    a = _const([1, 1, 0, 0, 0, 0])
+    b = _const([1, 0, 1, 0, 0, 0])
+    small = df.iloc[:6]
+
+    np.testing.assert_array_equal((a & b)(small, "long"), [1, 0, 0, 0, 0, 0])
+    np.testing.assert_array_equal((a | b)(small, "long"), [1, 1, 1, 0, 0, 0])
+    np.testing.assert_array_equal((~a)(small, "long"), [0, 0, 1, 1, 1, 1])
+    np.testing.assert_array_equal(within(b, 2)(small, "long"), [1, 1, 1, 1, 1, 0])
+    # lado desconhecido nunca dispara
+    assert not (~a)(small, "flat").any()
+
+
+def test_within_window_edges(df):
+    mask = np.zeros(6, dtype=bool)
+    mask[[1, 4]] = True
+    inner = _const(mask)
+    small = df.iloc[:6]
+
+    np.testing.assert_array_equal(Within(inner, 0)(small, "long"), mask)
+    for k in (5, 6, 100):
+        np.testing.assert_array_equal(Within(inner, k)(small, "long"), [0, 1, 1, 1, 1, 1])
+    np.testing.assert_array_equal(Within(_const([]), 3)(small.iloc[:0], "long"), [])
+    with pytest.raises(ValueError):
+        Within(inner, -1)
+    with pytest.raises(ValueError):
+        Within(inner, 1.5)
+
+
+def test_parse_signal_builds_the_same_masks(df):
+    parsed = parse_signal("ema21_rejection & within(engulfing, 3) | ~bos(left=2, right=2)")
+    built = (get_signal("ema21_rejection") & within(get_signal("engulfing"), 3)) \
+        | ~get_signal("bos", left=2, right=2)
+    for side in ("long", "short"):
+        np.testing.assert_array_equal(parsed(df, side), built(df, side))
+    assert repr(parsed) == repr(built)
+
+
+@pytest.mark.parametrize("text", [
+    "nao_existe",
+    "ema21_rejection & nao_existe",
+    "wick_rejection(50)",
+    "within(engulfing)",
+    "within(engulfing, k=3)",
+    "ema21_rejection + bos",
+    "ema21_rejection &",
+])
+def test_parse_signal_rejects_bad_expressions(text):
+    with pytest.raises(ValueError):
+        parse_signal(text)
+
+
+def test_registry():
+    @register_signal("_test_always")
+    def _always(df_15m, side, value=True):
+        return np.full(len(df_15m), value)
+
+    try:
+        assert repr(get_signal("_test_always", value=False)) == "_test_always(value=False)"
+        with pytest.raises(ValueError):
+            register_signal("_test_always")(_always)
+    finally:
+        SIGNALS.pop("_test_always")
+
+    with pytest.raises(ValueError):
+        get_signal("_test_always")
+    with pytest.raises(TypeError):
+        Signal()
+
+
+def test_mask_shape_is_checked(df):
+    with pytest.raises(ValueError):
+        _const([True])(df, "long")
+
+
+@pytest.mark.parametrize("name", ["bos", "engulfing", "wick_rejection"])
+@pytest.mark.parametrize("side", ["long", "short"])
+def test_builtin_signals_have_no_lookahead(df, name, side):
+    full = get_signal(name)(df, side)
+    assert full.any()
+    for end in (50, 200, 401, len(df) - 1):
+        np.testing.assert_array_equal(get_signal(name)(df.iloc[:end], side), full[:end])
+
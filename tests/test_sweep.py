@@ -0,0 +1,53 @@
+from functools import partial
+
+import pytest
+
+from backtest.engine import run_backtest_15m
+from backtest.sweep import expand_grid, run_sweep
+from benchmarks.synthetic import generate_ohlcv
+from data.market_data import MarketData
+from indicators.pipeline import IndicatorPipeline
+from strategy.entry import EntrySignal
+from strategy.positioning import Positioning
+
+
+def _frames():
+    df_15m = generate_ohlcv(30_000, timeframe="15m")
+    market = MarketData(offline=False, exchange=object())
+    return market.resample(df_15m, "1d", "15m"), market.resample(df_15m, "4h", "15m"), df_15m
+
+
+@pytest.mark.parametrize("name", ["padding", "ema_fast"])
+def test_unused_parameters_are_not_grid_axes(name):
+    with pytest.raises(ValueError):
+        expand_grid({name: [1, 2]})
+
+
+def test_sweep_reads_the_swept_ema_columns():
+    df_1d, df_4h, df_15m = _frames()
+    table = run_sweep(df_1d, df_4h, df_15m, {"ema_mid": [21, 34], "ema_slow": [50, 89]}, workers=1)
+    assert len(table) == 4
+    row = table[(table["ema_mid"] == 34) & (table["ema_slow"] == 89)].iloc[0]
+
+    spans = (34, 89)
+    d1 = IndicatorPipeline(df_1d).swings().emas(spans).df
+    h4 = IndicatorPipeline(df_4h).swings().emas(spans).df
+    pos = Positioning(d1, h4, ema_columns=("ema_34", "ema_89")).summary()
+    assert row["side"] == pos["bias_final"]
+
+    zone = pos["buy_zone_4h"] if pos["bias_final"] == "long" else pos["sell_zone_4h"]
+    if zone is None or pos["invalidation"] is None:
+        assert row["trades"] == 0
+        return
+
+    stats = run_backtest_15m(
+        IndicatorPipeline(df_15m).emas(spans).df,
+        side=pos["bias_final"],
+        zone=zone,
+        stop_level=pos["invalidation"],
+        trades_csv_path=None,
+        mode="vectorized",
+        entry_mask_fn=partial(EntrySignal.ema21_rejection_mask, ema_column="ema_34"),
+    )
+    assert row["trades"] == stats["trades"]
+    assert row["equity_r"] == stats["equity_r"]
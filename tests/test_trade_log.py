@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from backtest.engine import run_backtest_15m
+from backtest.trade_log import TRADE_FIELDS, TradeLog
+from benchmarks.synthetic import generate_ohlcv
+from indicators.ema import EMAIndicator
+from strategy.entry import EntrySignal
+
+
+def _trade(i):
+    return {
+        "side": "long", "entry_time": f"t{i}", "entry": 100.0 + i, "stop": 99.0, "tp": 102.0 + i,
+        "exit_time": f"t{i + 1}", "exit": 102.0 + i, "result": "win", "r": 2.0,
+    }
+
+
+def _run(df, trade_log, mode):
+    m = float(df["close"].median())
+    kwargs = {"entry_mask_fn": EntrySignal.ema21_rejection_mask} if mode == "vectorized" \
+        else {"entry_signal_fn": EntrySignal.ema21_rejection}
+    return run_backtest_15m(
+        df, "long", (m * 0.97, m * 1.03), m * 0.9, mode=mode, trade_log=trade_log, return_trades=True, **kwargs
+    )
+
+
+@pytest.mark.parametrize("mode", ["loop", "vectorized"])
+def test_caller_log_stays_open_across_runs(tmp_path, mode):
+    df = EMAIndicator(generate_ohlcv(3000, seed=3)).calculate()
+    path = tmp_path / "trades.csv"
+
+    with TradeLog(str(path)) as log:
+        first = _run(df, log, mode)
+        second = _run(df.iloc[:1500], log, mode)
+
+    assert first["trades"] > 0 and second["trades"] > 0
+    # trades_df de cada run só tem os trades dele; o log acumula os dois
+    assert len(first["trades_df"]) == first["trades"]
+    assert len(second["trades_df"]) == second["trades"]
+    assert len(pd.read_csv(path)) == first["trades"] + second["trades"]
+
+
+def test_add_after_close_raises(tmp_path):
+    log = TradeLog(str(tmp_path / "trades.csv"))
+    log.add(_trade(0))
+    log.close()
+    with pytest.raises(ValueError):
+        log.add(_trade(1))
+
+
+def test_parquet_chunks_match_frame(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "trades.parquet"
+
+    with TradeLog(str(path), chunk_size=3) as log:
+        for i in range(10):
+            log.add(_trade(i))
+
+    stored = pd.read_parquet(path)
+    pd.testing.assert_frame_equal(stored, log.to_frame())
+    assert list(stored.columns) == TRADE_FIELDS
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_ohlcv
+from data.validation import RULES, repair_ohlcv, validate_ohlcv
+
+
+def test_weekly_candles_aligned_on_monday():
+    # 2024-01-01 é segunda-feira (abertura dos candles 1w da Binance)
+    df = generate_ohlcv(10, timeframe="1w", start="2024-01-01")
+    report = validate_ohlcv(df, "1w")
+    assert report.ok and not report.masks["misaligned"].any()
+
+    out, _ = repair_ohlcv(df, "1w", mode="ffill")
+    assert len(out) == 10 and not out["filled"].any()
+
+    shifted = df.set_axis(df.index + pd.Timedelta(days=1))
+    assert validate_ohlcv(shifted, "1w").masks["misaligned"].all()
+
+
+def test_spike_is_report_only_by_default():
+    df = generate_ohlcv(500)
+    df.iloc[250, df.columns.get_loc("low")] *= 0.5  # pavio de crash
+
+    report = validate_ohlcv(df, "15m")
+    assert report.masks["spike"][250] and not report.invalid.any()
+
+    out, _ = repair_ohlcv(df, "15m", mode="ffill", report=report)
+    assert not out["filled"].any() and len(out) == len(df)
+
+    out, _ = repair_ohlcv(df, "15m", mode="ffill", report=report, rules=RULES)
+    assert out["filled"].sum() == 1
+
+
+def test_refetch_drops_unreplaced_invalid_rows_consistently():
+    df = generate_ohlcv(100)
+    df.iloc[[10, 60], df.columns.get_loc("high")] = -1.0
+    ts = df.index.to_numpy(dtype="datetime64[ms]").astype("int64")
+
+    # nenhuma busca devolve nada: mesmo resultado de quando só parte é reposta
+    nothing, _ = repair_ohlcv(df, "15m", mode="refetch", refetch=lambda since, until: None)
+    assert len(nothing) == 98 and not nothing.index.isin(df.index[[10, 60]]).any()
+
+    good = generate_ohlcv(100)
+    partial, report = repair_ohlcv(
+        df, "15m", mode="refetch",
+        refetch=lambda since, until: good[(ts >= since) & (ts < until)] if since == ts[10] else None,
+    )
+    assert len(partial) == 99 and df.index[10] in partial.index
+    assert not partial.index.isin(df.index[[60]]).any()
+    assert np.isclose(partial.loc[df.index[10], "high"], good["high"].iloc[10])
+    assert not report.invalid.any() and len(report.gaps) == 1
@@ -0,0 +1,167 @@
+"""
+Instrumentação leve do pipeline (tempo por estágio + contadores).
+
+Desligada por padrão: stage()/count() viram no-op (uma checagem de flag).
+Uso:
+    from utils import instrumentation
+    instrumentation.enable()
+    ...  # roda o pipeline
+    instrumentation.export_json("logs/run_report.json")
+"""
+import functools
+import json
+import os
+import time
+from typing import Optional
+
+METRIC_PREFIX = "btc_analyzer"
+
+_enabled = False
+_stages: dict[str, dict] = {}
+_counters: dict[str, float] = {}
+
+
+class _NullStage:
+    """Estágio no-op compartilhado: escrever em `.rows` não guarda nada."""
+
+    __slots__ = ()
+
+    @property
+    def rows(self) -> None:
+        return None
+
+    @rows.setter
+    def rows(self, value) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("name", "rows", "_t0")
+
+    def __init__(self, name: str, rows: Optional[int]):
+        self.name = name
+        self.rows = rows
+        self._t0 = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._t0
+        stats = _stages.get(self.name)
+        if stats is None:
+            stats = _stages[self.name] = {"calls": 0, "seconds": 0.0, "rows": 0}
+        stats["calls"] += 1
+        stats["seconds"] += elapsed
+        if self.rows is not None:
+            stats["rows"] += int(self.rows)
+        return False
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    _stages.clear()
+    _counters.clear()
+
+
+def stage(name: str, rows: Optional[int] = None):
+    """
+    Context manager que mede o tempo de parede de um estágio (acumula por nome).
+    `rows` (opcional) = linhas processadas; pode ser ajustado depois via `.rows`.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, rows)
+
+
+def timed(name: str, rows=len):
+    """
+    Decorator: mede a função como estágio `name`.
+    `rows(resultado)` dá as linhas processadas (padrão: len do retorno; None = não conta).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Stage(name, None) as st:
+                result = fn(*args, **kwargs)
+                if rows is not None:
+                    st.rows = rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def count(name: str, n: float = 1) -> None:
+    """Incrementa um contador (ex.: trades_opened, bytes_written)."""
+    if not _enabled:
+        return
+    _counters[name] = _counters.get(name, 0) + n
+
+
+def report() -> dict:
+    return {
+        "stages": {name: dict(stats) for name, stats in _stages.items()},
+        "counters": dict(_counters),
+    }
+
+
+def _ensure_dir(path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def export_json(path: str) -> None:
+    _ensure_dir(path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report(), f, indent=2)
+
+
+def export_prometheus(path: str) -> None:
+    """Formato texto do Prometheus (ex.: para o textfile collector do node_exporter)."""
+    lines = []
+
+    for metric, key, help_text in (
+            ("stage_seconds_total", "seconds", "Tempo de parede acumulado por estágio."),
+            ("stage_calls_total", "calls", "Execuções por estágio."),
+            ("stage_rows_total", "rows", "Linhas processadas por estágio."),
+    ):
+        name = f"{METRIC_PREFIX}_{metric}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for stage_name, stats in sorted(_stages.items()):
+            lines.append(f'{name}{{stage="{stage_name}"}} {stats[key]}')
+
+    for counter, value in sorted(_counters.items()):
+        name = f"{METRIC_PREFIX}_{counter}_total"
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+
+    _ensure_dir(path)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")